@@ -0,0 +1,79 @@
+"""
+Run the driver benchmarks against a local stand-in server:
+
+python -m benchmarks --output results.json
+python -m benchmarks --compare results.json
+
+Exits with 1 if --compare finds a benchmark regressed by more than
+--threshold.
+"""
+import argparse
+import json
+import sys
+
+from benchmarks.server import StandInServer
+from benchmarks.suite import Suite, compare
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks")
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--columns", type=int, default=6)
+    parser.add_argument(
+        "--latency-ms",
+        type=float,
+        default=0.0,
+        help="added by the server to every response",
+    )
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument(
+        "--concurrency",
+        default="1,2,4,8",
+        help="thread counts of the scaling benchmark",
+    )
+    parser.add_argument("--only", help="comma separated benchmark names")
+    parser.add_argument("--output", help="json file to store results in")
+    parser.add_argument("--compare", help="json file of an earlier run")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.1,
+        help="relative change counted as a regression, default 0.1",
+    )
+    args = parser.parse_args(argv)
+
+    with StandInServer(
+        columns=args.columns, latency_sec=args.latency_ms / 1000
+    ) as server:
+        suite = Suite(
+            server,
+            rows=args.rows,
+            repeat=args.repeat,
+            concurrency=[int(n) for n in args.concurrency.split(",")],
+        )
+        run = suite.run(args.only.split(",") if args.only else None)
+
+    for name, result in run["results"].items():
+        print(f"{name:<24} {result['value']:>14.3f} {result['unit']}")
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(run, f, indent=2)
+
+    if not args.compare:
+        return 0
+    with open(args.compare) as f:
+        baseline = json.load(f)
+    regressed = False
+    for name, before, after, change, worse in compare(
+        baseline, run, args.threshold
+    ):
+        regressed = regressed or worse
+        flag = "REGRESSED" if worse else ""
+        print(
+            f"{name:<24} {before:>14.3f} {after:>14.3f} {change:+8.1%} {flag}"
+        )
+    return 1 if regressed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,195 @@
+"""
+A local stand-in for radio-duck serving synthetic results, fast enough
+to measure the driver rather than the server.
+
+Every query is answered with a synthetic table of ints, doubles and
+strings. The number of rows is the query's LIMIT, else the server's
+default. Results are json, or arrow when the client accepts it, and are
+encoded once per size so that serving them costs next to nothing.
+PRAGMA table_info and duckdb_columns() queries are answered with the
+synthetic columns, for reflection. duckdb_columns() lists them as the
+columns of a table named ducks.
+"""
+import functools
+import io
+import json
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+
+from radio_duck.results import arrow_stream_content_type, json_content_type
+
+_limit = re.compile(r"\blimit\s+(\d+)", re.IGNORECASE)
+_table_info = re.compile(r"\bpragma\s+table_info\b", re.IGNORECASE)
+_schema_columns = re.compile(r"\bduckdb_columns\b", re.IGNORECASE)
+
+
+class StandInServer(object):
+    """
+    Serves POST /v1/sql/ on a background thread. Use as a context manager.
+    """
+
+    def __init__(
+        self,
+        host: str = "localhost",
+        port: int = 0,
+        rows: int = 1000,
+        columns: int = 6,
+        latency_sec: float = 0.0,
+    ):
+        """
+        :param port: 0 picks a free port, see self.port
+        :param rows: rows of queries without LIMIT
+        :param columns: columns of every result, a multiple of 3 types
+        :param latency_sec: added to every response, as the server's
+        query time
+        """
+        self.rows = rows
+        self.columns = columns
+        self.latency_sec = latency_sec
+        self.requests = 0
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), _handler(self))
+        self._server.daemon_threads = True
+        self.host, self.port = self._server.server_address[:2]
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(
+            target=self._server.serve_forever, daemon=True
+        )
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+        if self._thread is not None:
+            self._thread.join()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+
+    def answer(self, query: str, accept: str):
+        """
+        :return: content type and body of the response to a query
+        """
+        with self._lock:
+            self.requests = self.requests + 1
+        if _table_info.search(query):
+            return json_content_type, _table_info_payload(self.columns)
+        if _schema_columns.search(query):
+            return json_content_type, _table_info_payload(
+                self.columns, "ducks"
+            )
+        match = _limit.search(query)
+        rows = int(match.group(1)) if match else self.rows
+        if arrow_stream_content_type in accept:
+            return arrow_stream_content_type, _arrow_payload(
+                rows, self.columns
+            )
+        return json_content_type, _json_payload(rows, self.columns)
+
+
+def _handler(server: StandInServer):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        # headers and body are separate writes, with nagle the body
+        # waits for the client's delayed ack
+        disable_nagle_algorithm = True
+
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length", 0))
+            request = json.loads(self.rfile.read(length))
+            if server.latency_sec:
+                time.sleep(server.latency_sec)
+            content_type, body = server.answer(
+                request.get("sql", ""), self.headers.get("Accept", "")
+            )
+            self.send_response(200)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            # one line per request would dominate the benchmark
+            pass
+
+    return Handler
+
+
+def _column_names(columns: int):
+    return [f"c{index}" for index in range(columns)]
+
+
+def _value(row: int, column: int):
+    kind = column % 3
+    if kind == 0:
+        return row
+    if kind == 1:
+        return row * 0.5
+    return f"duck_{row}"
+
+
+_schema = ("NUMBER", "DOUBLE", "STRING")
+
+
+@functools.lru_cache(maxsize=32)
+def _json_payload(rows: int, columns: int) -> bytes:
+    return json.dumps(
+        {
+            "schema": [_schema[column % 3] for column in range(columns)],
+            "columns": _column_names(columns),
+            "rows": [
+                [_value(row, column) for column in range(columns)]
+                for row in range(rows)
+            ],
+        }
+    ).encode()
+
+
+@functools.lru_cache(maxsize=32)
+def _arrow_payload(rows: int, columns: int) -> bytes:
+    import pyarrow as pa
+
+    table = pa.table(
+        {
+            name: [_value(row, column) for row in range(rows)]
+            for column, name in enumerate(_column_names(columns))
+        }
+    )
+    sink = io.BytesIO()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue()
+
+
+@functools.lru_cache(maxsize=8)
+def _table_info_payload(columns: int, table: Optional[str] = None) -> bytes:
+    schema = ["NUMBER", "STRING", "STRING", "bool", "STRING", "bool"]
+    names = ["cid", "name", "type", "notnull", "dflt_value", "pk"]
+    rows = [
+        [
+            column,
+            name,
+            ("BIGINT", "DOUBLE", "VARCHAR")[column % 3],
+            column == 0,
+            None,
+            column == 0,
+        ]
+        for column, name in enumerate(_column_names(columns))
+    ]
+    if table is not None:
+        # a schema wide query has the table name first
+        schema = ["STRING"] + schema
+        names = ["table_name"] + names
+        rows = [[table] + row for row in rows]
+    return json.dumps(
+        {"schema": schema, "columns": names, "rows": rows}
+    ).encode()
@@ -0,0 +1,273 @@
+"""
+Driver benchmarks against the local stand-in server.
+
+Each benchmark returns a dict with the measured "value", its "unit",
+whether higher is better and the statistics it was derived from, so
+that runs stored as json can be compared, see compare().
+"""
+import functools
+import platform
+import statistics
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+import radio_duck
+from benchmarks.server import StandInServer
+
+
+def _latency(samples: List[float]) -> Dict:
+    samples = sorted(samples)
+    p95 = samples[min(len(samples) - 1, int(len(samples) * 0.95))]
+    return {
+        "value": statistics.median(samples) * 1000,
+        "unit": "ms",
+        "higher_is_better": False,
+        "mean_ms": statistics.mean(samples) * 1000,
+        "p95_ms": p95 * 1000,
+        "min_ms": samples[0] * 1000,
+        "samples": len(samples),
+    }
+
+
+def _throughput(count: int, elapsed_sec: float, unit: str) -> Dict:
+    return {
+        "value": count / elapsed_sec,
+        "unit": unit,
+        "higher_is_better": True,
+        "count": count,
+        "elapsed_sec": elapsed_sec,
+    }
+
+
+def _time(fn: Callable, repeat: int, warmup: int = 2) -> List[float]:
+    for _ in range(warmup):
+        fn()
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - started)
+    return samples
+
+
+class Suite(object):
+    """
+    Runs the benchmarks against one stand-in server.
+    """
+
+    def __init__(
+        self,
+        server: StandInServer,
+        rows: int = 10000,
+        repeat: int = 50,
+        concurrency=(1, 2, 4, 8),
+    ):
+        """
+        :param rows: rows fetched by the fetch benchmarks
+        :param repeat: timed iterations of every benchmark
+        :param concurrency: thread counts of the scaling benchmark
+        """
+        self.server = server
+        self.rows = rows
+        self.repeat = repeat
+        self.concurrency = tuple(concurrency)
+
+    def connect(self, **kwargs):
+        return radio_duck.connect(
+            host=self.server.host,
+            port=self.server.port,
+            api="/v1/sql/",
+            scheme="http",
+            **kwargs,
+        )
+
+    def engine(self):
+        from sqlalchemy import create_engine
+        from sqlalchemy.dialects import registry
+
+        registry.register(
+            "radio_duck.district5", "radio_duck.sqlalchemy", "RadioDuckDialect"
+        )
+        return create_engine(
+            f"radio_duck+district5://user:pass@{self.server.host}:"
+            f"{self.server.port}/?api=/v1/sql/&scheme=http"
+        )
+
+    def benchmarks(self) -> Dict[str, Callable[[], Dict]]:
+        names = {"execute_latency": self.execute_latency}
+        for result_format in ("json", "arrow"):
+            for method in ("fetchone", "fetchmany", "fetchall"):
+                names[f"{method}_{result_format}"] = functools.partial(
+                    self.fetch, method, result_format
+                )
+        names["sqlalchemy_overhead"] = self.sqlalchemy_overhead
+        names["reflection"] = self.reflection
+        for threads in self.concurrency:
+            names[f"concurrency_{threads}"] = functools.partial(
+                self.concurrent, threads
+            )
+        return names
+
+    def run(self, only: Optional[List[str]] = None) -> Dict:
+        """
+        :param only: names of the benchmarks to run, default all
+        :return: results per benchmark name and what they ran on
+        """
+        results = {}
+        for name, benchmark in self.benchmarks().items():
+            if only and name not in only:
+                continue
+            results[name] = benchmark()
+        return {
+            "meta": {
+                "time": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "rows": self.rows,
+                "repeat": self.repeat,
+                "columns": self.server.columns,
+                "latency_sec": self.server.latency_sec,
+            },
+            "results": results,
+        }
+
+    def execute_latency(self) -> Dict:
+        """
+        Round trip of a one row query, execute and fetchall.
+        """
+        with self.connect() as conn:
+            cursor = conn.cursor()
+
+            def query():
+                cursor.execute("select * from ducks limit 1")
+                cursor.fetchall()
+
+            return _latency(_time(query, self.repeat))
+
+    def fetch(self, method: str, result_format: str) -> Dict:
+        """
+        Rows per second of executing and fetching self.rows rows.
+        """
+        query = f"select * from ducks limit {self.rows}"
+        with self.connect(result_format=result_format) as conn:
+            cursor = conn.cursor()
+
+            def fetch():
+                cursor.execute(query)
+                if method == "fetchone":
+                    while cursor.fetchone() is not None:
+                        pass
+                elif method == "fetchmany":
+                    while cursor.fetchmany(1000):
+                        pass
+                else:
+                    cursor.fetchall()
+
+            samples = _time(fetch, max(1, self.repeat // 10))
+        result = _throughput(self.rows * len(samples), sum(samples), "rows/s")
+        result["median_ms"] = _latency(samples)["value"]
+        return result
+
+    def sqlalchemy_overhead(self) -> Dict:
+        """
+        Latency added by sqlalchemy over the dbapi, for a 100 row query.
+        """
+        from sqlalchemy import text
+
+        query = "select * from ducks limit 100"
+        with self.connect() as conn:
+            cursor = conn.cursor()
+
+            def dbapi():
+                cursor.execute(query)
+                cursor.fetchall()
+
+            raw = _latency(_time(dbapi, self.repeat))
+        engine = self.engine()
+        try:
+            with engine.connect() as conn:
+
+                def orm():
+                    conn.execute(text(query)).fetchall()
+
+                wrapped = _latency(_time(orm, self.repeat))
+        finally:
+            engine.dispose()
+        return {
+            "value": wrapped["value"] - raw["value"],
+            "unit": "ms",
+            "higher_is_better": False,
+            "dbapi_median_ms": raw["value"],
+            "sqlalchemy_median_ms": wrapped["value"],
+        }
+
+    def reflection(self) -> Dict:
+        """
+        Reflecting a table's columns with a fresh inspector each time.
+        """
+        from sqlalchemy import inspect
+
+        engine = self.engine()
+        try:
+
+            def reflect():
+                inspect(engine).get_columns("ducks")
+
+            return _latency(_time(reflect, self.repeat))
+        finally:
+            engine.dispose()
+
+    def concurrent(self, threads: int) -> Dict:
+        """
+        Queries per second of threads sharing one connection.
+        """
+        query = "select * from ducks limit 100"
+        errors = []
+        with self.connect(pool_size=threads) as conn:
+
+            def work():
+                try:
+                    cursor = conn.cursor()
+                    for _ in range(self.repeat):
+                        cursor.execute(query)
+                        cursor.fetchall()
+                except Exception as e:
+                    errors.append(e)
+
+            workers = [threading.Thread(target=work) for _ in range(threads)]
+            started = time.perf_counter()
+            for worker in workers:
+                worker.start()
+            for worker in workers:
+                worker.join()
+            elapsed_sec = time.perf_counter() - started
+        if errors:
+            raise errors[0]
+        return _throughput(threads * self.repeat, elapsed_sec, "queries/s")
+
+
+def compare(baseline: Dict, current: Dict, threshold: float = 0.1):
+    """
+    :param threshold: relative change counted as a regression
+    :return: (name, baseline value, current value, relative change,
+    regressed) of every benchmark in both runs, change > 0 is better
+    """
+    rows = []
+    for name, result in current["results"].items():
+        before = baseline["results"].get(name)
+        if before is None or not before["value"]:
+            continue
+        change = (result["value"] - before["value"]) / abs(before["value"])
+        if not result["higher_is_better"]:
+            change = -change
+        rows.append(
+            (
+                name,
+                before["value"],
+                result["value"],
+                change,
+                change < -threshold,
+            )
+        )
+    return rows
@@ -0,0 +1,60 @@
+import json
+
+from benchmarks.__main__ import main
+from benchmarks.server import StandInServer
+from benchmarks.suite import Suite, compare
+
+
+def test_suite_runs_every_benchmark():
+    with StandInServer(rows=10) as server:
+        run = Suite(server, rows=50, repeat=2, concurrency=(1, 2)).run()
+        assert server.requests > 0
+    assert {
+        "execute_latency",
+        "fetchone_json",
+        "fetchmany_json",
+        "fetchall_json",
+        "fetchone_arrow",
+        "fetchmany_arrow",
+        "fetchall_arrow",
+        "sqlalchemy_overhead",
+        "reflection",
+        "concurrency_1",
+        "concurrency_2",
+    } == set(run["results"])
+    for result in run["results"].values():
+        assert {"value", "unit", "higher_is_better"} <= set(result)
+    # stored runs are json
+    assert run == json.loads(json.dumps(run))
+
+
+def test_compare():
+    baseline = {
+        "results": {
+            "latency": {"value": 10.0, "higher_is_better": False},
+            "throughput": {"value": 100.0, "higher_is_better": True},
+            "new": {"value": 0.0, "higher_is_better": True},
+        }
+    }
+    current = {
+        "results": {
+            "latency": {"value": 12.0, "higher_is_better": False},
+            "throughput": {"value": 105.0, "higher_is_better": True},
+        }
+    }
+    assert [
+        ("latency", 10.0, 12.0, -0.2, True),
+        ("throughput", 100.0, 105.0, 0.05, False),
+    ] == compare(baseline, current, threshold=0.1)
+
+
+def test_main_flags_regressions(tmp_path):
+    output = str(tmp_path / "run.json")
+    args = ["--rows", "20", "--repeat", "2", "--only", "execute_latency"]
+    assert 0 == main(args + ["--output", output])
+    with open(output) as f:
+        run = json.load(f)
+    run["results"]["execute_latency"]["value"] = 1e-9
+    with open(output, "w") as f:
+        json.dump(run, f)
+    assert 1 == main(args + ["--compare", output])
@@ -0,0 +1,992 @@
+"""
+asyncio DB-API style driver for radio_duck.
+
+Same semantics as radio_duck.db, but every network operation is a
+coroutine on asyncio streams, so one event loop can keep many queries
+in flight. Results are fully read before execute() returns.
+"""
+import asyncio
+import collections
+import logging
+import time
+from typing import Any, List, Optional, Tuple, Union
+
+from radio_duck.balancer import Balancer, Endpoint, parse_endpoints
+from radio_duck.codec import get_codec
+from radio_duck.compression import check_encoding
+from radio_duck.converters import parse_columns_option
+from radio_duck.db import (
+    _accept_header,
+    _answered,
+    _as_bool,
+    _check_result_format,
+    _hedge_delay,
+    _hedger,
+    _result_cache,
+    _slow_query_log,
+    _to_result,
+    _traced_execute,
+    _tracer,
+    cancel_status,
+    check_status,
+    connect_close_resource_msg,
+    connect_stale_socket_msg,
+    decode_response,
+    disconnect_errors,
+    encode_request,
+    executemany_batches,
+    get_description,
+    new_query_id,
+    query_id_header,
+    query_timeout_msg,
+    request_json,
+    result_cache_key,
+    unavailable_statuses,
+)
+from radio_duck.exceptions import (
+    InterfaceError,
+    NotSupportedError,
+    OperationalError,
+    ProgrammingError,
+)
+from radio_duck.hedging import Hedger
+from radio_duck.metrics import QueryMetrics, notify
+from radio_duck.results import Result, json_content_type
+from radio_duck.statements import changes_data, is_read_only
+
+# a peer closing mid response shows up as an incomplete read
+async_disconnect_errors = disconnect_errors + (asyncio.IncompleteReadError,)
+
+
+def _check_closed(obj):
+    if obj.closed:
+        raise InterfaceError(
+            msg=f"[{connect_close_resource_msg}]: {obj.__class__.__name__} already closed"  # noqa: E501,B950
+        )
+
+
+# responses that never have a body, whatever their headers say
+_bodiless_statuses = {204, 304}
+
+
+class _AsyncHttpConnection(object):
+    """
+    Minimal keep-alive HTTP/1.1 client connection on asyncio streams.
+    """
+
+    def __init__(self, host: str, port: int):
+        self.host = host
+        self.port = port
+        self.reusable = False
+        self._reader: Optional[asyncio.StreamReader] = None
+        self._writer: Optional[asyncio.StreamWriter] = None
+
+    async def connect(self):
+        self._reader, self._writer = await asyncio.open_connection(
+            self.host, self.port
+        )
+        self.reusable = True
+
+    def is_dropped(self) -> bool:
+        return (
+            self._writer is None
+            or self._writer.is_closing()  # noqa: W503
+            or self._reader.at_eof()  # noqa: W503
+        )
+
+    async def request(
+        self, path: str, body: bytes, headers: dict, method: str = "POST"
+    ) -> Tuple[int, dict, bytes]:
+        """
+        Send body to path.
+        :param method: POST by default
+        :return: tuple of status, lower cased response headers and body
+        """
+        lines = [
+            f"{method} {path} HTTP/1.1",
+            f"Host: {self.host}:{self.port}",
+            f"Content-Length: {len(body)}",
+        ] + [f"{name}: {value}" for name, value in headers.items()]
+        self._writer.write(
+            ("\r\n".join(lines) + "\r\n\r\n").encode("latin-1") + body
+        )
+        await self._writer.drain()
+
+        status_line = await self._reader.readline()
+        if not status_line:
+            raise ConnectionResetError(
+                "remote end closed connection without response"
+            )
+        version, status = status_line.decode("latin-1").split(" ", 2)[:2]
+        response_headers = {}
+        while True:
+            line = await self._reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            response_headers[name.strip().lower()] = value.strip()
+
+        keep_alive = (
+            version == "HTTP/1.1"
+            and response_headers.get("connection", "").lower()  # noqa: W503
+            != "close"  # noqa: W503
+        )
+        transfer_encoding = response_headers.get("transfer-encoding", "")
+        if method == "HEAD" or int(status) in _bodiless_statuses:
+            payload = b""
+        elif "chunked" in transfer_encoding.lower():
+            payload = await self._read_chunked()
+        elif "content-length" in response_headers:
+            payload = await self._reader.readexactly(
+                int(response_headers["content-length"])
+            )
+        else:
+            # body is delimited by the server closing the connection
+            payload = await self._reader.read()
+            keep_alive = False
+        self.reusable = keep_alive
+        return int(status), response_headers, payload
+
+    async def _read_chunked(self) -> bytes:
+        chunks = []
+        while True:
+            size_line = await self._reader.readline()
+            size = int(size_line.split(b";")[0].strip(), 16)
+            if size == 0:
+                # skip trailers
+                while (await self._reader.readline()) not in (
+                    b"\r\n",
+                    b"\n",
+                    b"",
+                ):
+                    pass
+                return b"".join(chunks)
+            chunks.append(await self._reader.readexactly(size))
+            await self._reader.readexactly(2)  # chunk's crlf
+
+    def close(self):
+        self.reusable = False
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+
+class AsyncConnectionPool(object):
+    """
+    Bounded pool of keep-alive connections for one event loop.
+    Counterpart of radio_duck.pool.HttpConnectionPool.
+    """
+
+    def __init__(
+        self,
+        host: str,
+        port: int,
+        timeout_sec: float = 10,
+        max_size: int = 8,
+        idle_timeout_sec: float = 60,
+    ):
+        if max_size < 1:
+            raise InterfaceError(msg="pool size must be at least 1")
+        self.host = host
+        self.port = port
+        self.timeout_sec = timeout_sec
+        self.max_size = max_size
+        self.idle_timeout_sec = idle_timeout_sec
+        self.closed = False
+        self._idle = collections.deque()
+        # created on first use, it must belong to the running loop
+        self._slots: Optional[asyncio.Semaphore] = None
+
+    @property
+    def idle_count(self) -> int:
+        return len(self._idle)
+
+    async def acquire(self, fresh=False) -> _AsyncHttpConnection:
+        if self.closed:
+            raise InterfaceError(msg="connection pool already closed")
+        try:
+            await asyncio.wait_for(
+                self._semaphore().acquire(), self.timeout_sec
+            )
+        except asyncio.TimeoutError:
+            raise OperationalError(
+                msg=(
+                    "timed out waiting for a free connection in pool of size"
+                    f" {self.max_size}"
+                )
+            ) from None
+        try:
+            expiry = time.monotonic() - self.idle_timeout_sec
+            while not fresh and self._idle:
+                http_connection, last_used = self._idle.pop()
+                if last_used < expiry or http_connection.is_dropped():
+                    http_connection.close()
+                    continue
+                return http_connection
+            http_connection = _AsyncHttpConnection(self.host, self.port)
+            try:
+                await asyncio.wait_for(
+                    http_connection.connect(), self.timeout_sec
+                )
+            except Exception as e:
+                http_connection.close()
+                raise OperationalError(
+                    msg=f"unable to connect to database: {e!r}"
+                ) from e
+            return http_connection
+        except BaseException:
+            self._semaphore().release()
+            raise
+
+    def release(self, http_connection: _AsyncHttpConnection, discard=False):
+        if discard or self.closed or not http_connection.reusable:
+            http_connection.close()
+        else:
+            self._idle.append((http_connection, time.monotonic()))
+        self._semaphore().release()
+
+    def close(self):
+        self.closed = True
+        while self._idle:
+            http_connection, _ = self._idle.pop()
+            http_connection.close()
+
+    def _semaphore(self) -> asyncio.Semaphore:
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_size)
+        return self._slots
+
+
+class AsyncConnection(object):
+    """
+    An asyncio counterpart of radio_duck.db.Connection.
+
+    Do not create this object directly; use radio_duck.aio.connect().
+    """
+
+    def __init__(self, *args, **kwargs):
+        self.host = kwargs.get("host", "specify_host")
+        self.port = kwargs.get("port", 8000)
+        self.scheme = kwargs.get("scheme", "http")
+        self.timeout_sec = float(kwargs.get("timeout_sec", 10))
+        self.query_timeout_sec = float(
+            kwargs.get("query_timeout_sec", self.timeout_sec)
+        )
+        self.cancel_api = kwargs.get("cancel_api", "/v1/cancel/")
+        self._running = {}
+        # tasks nobody awaits, ex: the losing request of a hedged read
+        # and its cancel. the event loop only keeps weak references.
+        self._background = set()
+        self.api = kwargs.get("api", "/v1/sql/")
+        self.result_format = _check_result_format(
+            kwargs.get("result_format", "json")
+        )
+        self.executemany_batch_size = int(
+            kwargs.get("executemany_batch_size", 1000)
+        )
+        self.codec = get_codec(kwargs.get("json_codec", "auto"))
+        self.decode_types = parse_columns_option(
+            kwargs.get("decode_types", False)
+        )
+        self.compression = _as_bool(kwargs.get("compression", True))
+        self.compress_request = check_encoding(kwargs.get("compress_request"))
+        self.compress_request_min_bytes = int(
+            kwargs.get("compress_request_min_bytes", 16 * 1024)
+        )
+        self.result_cache = _result_cache(kwargs)
+        self.hedger = _hedger(kwargs)
+        self.tracer = _tracer(kwargs)
+        self.listeners = list(kwargs.get("listeners") or [])
+        self.slow_log = _slow_query_log(kwargs)
+        if self.slow_log is not None:
+            self.listeners.append(self.slow_log)
+        self.closed = False
+        if self.scheme != "http":
+            raise InterfaceError(
+                msg="driver only supports http scheme for now"
+            )  # noqa: E501
+        hosts = kwargs.get("hosts")
+        addresses = parse_endpoints(
+            kwargs.get("host", None if hosts else self.host), self.port, hosts
+        )
+        self.host, self.port = addresses[0]
+        self.balancer = Balancer(
+            [
+                Endpoint(
+                    host,
+                    port,
+                    AsyncConnectionPool(
+                        host,
+                        port,
+                        timeout_sec=self.timeout_sec,
+                        max_size=int(kwargs.get("pool_size", 8)),
+                        idle_timeout_sec=float(
+                            kwargs.get("pool_idle_timeout_sec", 60)
+                        ),
+                    ),
+                )
+                for host, port in addresses
+            ],
+            policy=kwargs.get("balance", "round_robin"),
+            eject_after=int(kwargs.get("eject_after", 3)),
+            eject_sec=float(kwargs.get("eject_sec", 30)),
+        )
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, exc_traceback):
+        await self.close()
+
+    async def _open(self):
+        # open one connection to every endpoint upfront so bad host/port
+        # fail fast. see radio_duck.db.Connection._open
+        endpoints = self.balancer.endpoints
+        reachable = False
+        for endpoint in endpoints:
+            logging.info(
+                "connecting to radio_duck... {}://{}{}".format(
+                    self.scheme, endpoint.address, self.api
+                )
+            )
+            try:
+                endpoint.pool.release(await endpoint.pool.acquire())
+            except OperationalError as e:
+                if len(endpoints) == 1 or (
+                    endpoint is endpoints[-1] and not reachable
+                ):
+                    raise
+                logging.warning(
+                    "radio_duck endpoint {} unreachable: {}".format(
+                        endpoint.address, e
+                    )
+                )
+                self.balancer.eject(endpoint)
+                continue
+            reachable = True
+            logging.info("connected to radio_duck")
+
+    async def close(self):
+        for endpoint in self.balancer.endpoints:
+            endpoint.pool.close()
+        if self.slow_log is not None:
+            self.slow_log.close()
+        self.closed = True
+        logging.info("closed connection to radio_duck")
+
+    def _in_background(self, awaitable) -> asyncio.Future:
+        """
+        Run a coroutine or future nobody awaits until it is done.
+        """
+        task = asyncio.ensure_future(awaitable)
+        self._background.add(task)
+        task.add_done_callback(self._background.discard)
+        return task
+
+    async def commit(self):
+        _check_closed(self)
+        raise NotSupportedError(
+            msg="do everything in a single cursor execute. 'begin;......;commit();'"  # noqa: E501
+        )
+
+    async def rollback(self):
+        raise NotSupportedError(
+            msg="do everything in a single cursor execute. 'begin;......;commit();'"  # noqa: E501
+        )
+
+    async def cancel(self, query_id: Optional[str] = None) -> bool:
+        """
+        See radio_duck.db.Connection.cancel
+        :raise NotSupportedError if the server has no cancel_api
+        :raise OperationalError if unable to reach the server
+        """
+        _check_closed(self)
+        if query_id is None:
+            cancelled = [
+                await self.cancel(query_id) for query_id in list(self._running)
+            ]
+            return any(cancelled)
+        endpoint = self._running.get(query_id)
+        if endpoint is not None:
+            return await self._cancel(endpoint, query_id)
+        endpoints = self.balancer.endpoints
+        if len(endpoints) == 1:
+            return await self._cancel(endpoints[0], query_id)
+        cancelled, error = False, None
+        for endpoint in endpoints:
+            try:
+                cancelled = await self._cancel(endpoint, query_id) or cancelled
+            except OperationalError as e:
+                error = e
+        if not cancelled and error is not None:
+            raise error
+        return cancelled
+
+    async def _cancel(self, endpoint: Endpoint, query_id: str) -> bool:
+        http_connection = _AsyncHttpConnection(endpoint.host, endpoint.port)
+        try:
+            status, _, payload = await asyncio.wait_for(
+                self._send_cancel(http_connection, query_id),
+                self.timeout_sec,
+            )
+        except Exception as e:
+            raise OperationalError(
+                msg=f"failed to cancel query {query_id}: {e!r}"
+            ) from e
+        finally:
+            http_connection.close()
+        return cancel_status(query_id, status, payload)
+
+    async def _send_cancel(
+        self, http_connection: _AsyncHttpConnection, query_id: str
+    ):
+        await http_connection.connect()
+        return await http_connection.request(
+            self.cancel_api,
+            self.codec.dumps({"query_id": query_id}),
+            {"Content-Type": json_content_type},
+        )
+
+    def add_listener(self, listener):
+        """
+        See radio_duck.db.Connection.add_listener. The round_trip phase
+        includes reading the response and response_bytes are counted
+        after decompression.
+        """
+        self.listeners.append(listener)
+
+    def remove_listener(self, listener):
+        self.listeners.remove(listener)
+
+    def cursor(self, *args, **kwargs) -> "AsyncCursor":
+        _check_closed(self)
+        return AsyncCursor(self, **kwargs)
+
+    @property
+    def pool(self) -> AsyncConnectionPool:
+        # of the first endpoint, see balancer.endpoints
+        return self.balancer.endpoints[0].pool
+
+
+class AsyncCursor(object):
+    """
+    An asyncio counterpart of radio_duck.db.Cursor.
+
+    Do not create this object directly; use AsyncConnection.cursor().
+    """
+
+    def __init__(self, connection: AsyncConnection, **kwargs):
+        self.closed = False
+        self._connection = connection
+        self._result: Optional[Result] = None
+        self._rowcount = -1
+        self.arraysize = 1
+        self.result_format = _check_result_format(
+            kwargs.get("result_format", connection.result_format)
+        )
+        self.decode_types = parse_columns_option(
+            kwargs.get("decode_types", connection.decode_types)
+        )
+        self._query_id: Optional[str] = None
+        self._next_query_id: Optional[str] = None
+        self._metrics: Optional[QueryMetrics] = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, exc_traceback):
+        await self.close()
+
+    @property
+    def connection(self) -> AsyncConnection:
+        return self._connection
+
+    @property
+    def query_id(self) -> Optional[str]:
+        return self._query_id
+
+    def reserve_query_id(self) -> str:
+        if self._next_query_id is None:
+            self._next_query_id = new_query_id()
+        return self._next_query_id
+
+    async def cancel(self) -> bool:
+        """
+        See radio_duck.db.Cursor.cancel
+        """
+        query_id = self._query_id or self._next_query_id
+        if query_id is None:
+            return False
+        return await self._connection.cancel(query_id)
+
+    @property
+    def rowcount(self) -> int:
+        if self._rowcount >= 0:
+            return self._rowcount
+        if self._result is None:
+            return -1
+        return self._result.rowcount
+
+    @property
+    def description(self):
+        if self.closed or self._result is None:
+            return None
+        return get_description(self._result.schema, self._result.columns)
+
+    async def close(self):
+        self._close_result()
+        self.closed = True
+
+    async def execute(
+        self,
+        query: Union[bytes, str],
+        parameters=None,
+        cache: bool = True,
+        timeout_sec: Optional[float] = None,
+        submit: Optional[bool] = None,
+    ):
+        """
+        Execute a query. See radio_duck.db.Cursor.execute
+        :param submit: queries are never submitted, the event loop is
+        free while they run
+        :raise NotSupportedError if submit is True
+        :raise OperationalError if unable to execute query or on timeout
+        :raise ProgrammingError if query is empty or invalid
+        """
+        _check_closed(self)
+        if submit:
+            raise NotSupportedError(
+                msg="the asyncio cursor cannot submit queries"
+            )
+        connection = self._connection
+        listeners = connection.listeners
+        if not listeners and connection.tracer is None:
+            return await self._execute(query, parameters, cache, timeout_sec)
+        metrics = self._metrics = QueryMetrics(query, parameters)
+        started = time.monotonic()
+        with _traced_execute(connection, metrics):
+            try:
+                await self._execute(query, parameters, cache, timeout_sec)
+            except Exception as e:
+                metrics.error = type(e).__name__
+                raise
+            finally:
+                metrics.total_sec = time.monotonic() - started
+                self._metrics = None
+                metrics.query_id = self._query_id
+                if self._result is not None:
+                    metrics.rows = self._result.rowcount
+                notify(listeners, metrics)
+
+    async def _execute(
+        self,
+        query: Union[bytes, str],
+        parameters,
+        cache: bool,
+        timeout_sec: Optional[float],
+    ):
+        if query is None or "" == query.strip():
+            raise ProgrammingError(msg="query is empty")
+        if timeout_sec is None:
+            timeout_sec = self._connection.query_timeout_sec
+        query_id = self._next_query_id or new_query_id()
+        self._next_query_id = None
+        self._query_id = query_id
+        self._close_result()
+        self._rowcount = -1
+
+        # a cached result costs no request, not even encoding one
+        read_only = is_read_only(query)
+        result_cache = self._connection.result_cache
+        key = result_cache_key(
+            result_cache,
+            query,
+            parameters,
+            read_only,
+            cache,
+            self.result_format,
+        )
+        if key is not None:
+            cached = result_cache.get(key)
+            if cached is not None:
+                self._set_result(*cached, cached=True)
+                return
+
+        request_payload, headers = self._encode(
+            query, parameters, timeout_sec, query_id
+        )
+        balancer = self._connection.balancer
+        hedger = self._connection.hedger if read_only else None
+        hedge_delay_sec = _hedge_delay(hedger)
+        attempts = max(2, len(balancer.endpoints)) if read_only else 1
+        running = self._connection._running
+        tried = []
+        for attempt in range(1, attempts + 1):
+            endpoint = balancer.choose(exclude=tried)
+            fresh = endpoint in tried
+            tried.append(endpoint)
+            can_fail_over = attempt < attempts and len(tried) < len(
+                balancer.endpoints
+            )
+            running[query_id] = endpoint
+            try:
+                endpoint, (status, content_type, payload) = await self._send(
+                    endpoint,
+                    request_payload,
+                    headers,
+                    timeout_sec,
+                    fresh,
+                    hedger,
+                    None if fresh else hedge_delay_sec,
+                    retry=attempt > 1,
+                )
+                if status not in unavailable_statuses or not can_fail_over:
+                    break
+                logging.warning(
+                    "radio_duck endpoint {} unavailable ({}), failing over"
+                    .format(endpoint.address, status)
+                )
+            except asyncio.TimeoutError as e:
+                await self._cancel_timed_out(endpoint, query_id)
+                raise OperationalError(
+                    msg=f"[{query_timeout_msg}]: query {query_id} did not finish within {timeout_sec} seconds and was cancelled"  # noqa: E501,B950
+                ) from e
+            except OperationalError as e:
+                if not can_fail_over:
+                    raise
+                logging.warning(
+                    "radio_duck endpoint {} failed ({}), failing over".format(
+                        endpoint.address, e
+                    )
+                )
+            except async_disconnect_errors as e:
+                if attempt < attempts:
+                    logging.warning(
+                        "stale connection to radio_duck ({}), retrying".format(
+                            repr(e)
+                        )
+                    )
+                    continue
+                raise OperationalError(
+                    msg=f"[{connect_stale_socket_msg}]: failed to execute query. connection dropped by server: {e!r}"  # noqa: E501,B950
+                ) from e
+            finally:
+                running.pop(query_id, None)
+
+        check_status(status, payload)
+        self._set_result(content_type, payload)
+        if key is not None:
+            result_cache.put(key, (content_type, payload))
+        elif not read_only and result_cache is not None:
+            if changes_data(query):
+                result_cache.invalidate()
+
+    async def executemany(self, query: Union[bytes, str], seq_of_parameters):
+        """
+        See radio_duck.db.Cursor.executemany
+        """
+        _check_closed(self)
+        seq_of_parameters = list(seq_of_parameters)
+        for batch_query, batch_parameters in executemany_batches(
+            query, seq_of_parameters, self._connection.executemany_batch_size
+        ):
+            await self.execute(batch_query, batch_parameters)
+        self._close_result()
+        self._rowcount = len(seq_of_parameters)
+
+    async def fetchone(self) -> Optional[tuple]:
+        rows = self._fetch("fetchone", 1)
+        return rows[0] if rows else None
+
+    async def fetchmany(self, size: Optional[int] = None) -> List[tuple]:
+        if size is None or size <= 0:
+            size = self.arraysize
+        return self._fetch("fetchmany", size)
+
+    async def fetchall(self) -> List[tuple]:
+        return self._fetch("fetchall", None)
+
+    async def fetch_arrow_table(self):
+        _check_closed(self)
+        if self._result is None:
+            raise ProgrammingError(
+                msg="cannot fetch_arrow_table before execute()"
+            )
+        return self._result.fetch_arrow_table()
+
+    async def fetch_numpy(self) -> dict:
+        _check_closed(self)
+        if self._result is None:
+            raise ProgrammingError(msg="cannot fetch_numpy before execute()")
+        return self._result.fetch_numpy()
+
+    async def fetch_df(self):
+        _check_closed(self)
+        if self._result is None:
+            raise ProgrammingError(msg="cannot fetch_df before execute()")
+        return self._result.fetch_df()
+
+    def setinputsizes(self, sizes):
+        pass
+
+    def setoutputsize(self, size, column=None):
+        pass
+
+    def _fetch(self, name: str, size: Optional[int]) -> List[Any]:
+        _check_closed(self)
+        if self._result is None:
+            raise ProgrammingError(msg=f"cannot {name} before execute()")
+        return self._result.fetch(size)
+
+    async def _cancel_timed_out(self, endpoint: Endpoint, query_id: str):
+        try:
+            await self._connection._cancel(endpoint, query_id)
+        except Exception as e:
+            logging.warning(
+                "could not cancel timed out query {}: {}".format(query_id, e)
+            )
+
+    def _encode(
+        self, query, parameters, timeout_sec: float, query_id: str
+    ) -> Tuple[bytes, dict]:
+        """
+        :return: body and headers of the query's request
+        """
+        started = time.monotonic()
+        request_payload = request_json(
+            query,
+            parameters,
+            timeout_sec,
+            self._connection.codec,
+        )
+        headers = {
+            "Content-Type": json_content_type,
+            "Accept": _accept_header(self.result_format, False),
+            query_id_header: query_id,
+        }
+        if self._connection.tracer is not None:
+            self._connection.tracer.inject(headers)
+        request_payload = encode_request(
+            self._connection, request_payload, headers
+        )
+        if self._metrics is not None:
+            self._metrics.add("encode", time.monotonic() - started)
+            self._metrics.request_bytes = len(request_payload)
+        return request_payload, headers
+
+    def _set_result(self, content_type: str, payload: bytes, cached=False):
+        started = time.monotonic()
+        try:
+            self._result = self._new_result(content_type, payload)
+        except Exception as e:
+            raise OperationalError(
+                msg=f"Failed to execute query. could not deserialize response: {e}."  # noqa: E501,B950
+            ) from e
+        if self._metrics is not None:
+            self._metrics.add("decode", time.monotonic() - started)
+            self._metrics.cached = cached
+
+    def _new_result(self, content_type: str, payload: bytes) -> Result:
+        return _to_result(
+            content_type,
+            payload,
+            self._connection.codec,
+            self.decode_types,
+        )
+
+    def _close_result(self):
+        if self._result is not None:
+            self._result.close()
+            self._result = None
+
+    async def _send(
+        self,
+        endpoint: Endpoint,
+        request_payload: bytes,
+        headers: dict,
+        timeout_sec: float,
+        fresh: bool,
+        hedger: Optional[Hedger],
+        hedge_delay_sec: Optional[float],
+        retry=False,
+    ):
+        """
+        :param hedger: measuring the response time of a read
+        :param hedge_delay_sec: None not to hedge the request
+        :param retry: True if the request was sent before
+        :return: tuple of the endpoint that answered and its response
+        """
+        metrics = self._metrics
+        if metrics is not None:
+            metrics.retries = metrics.retries + int(retry)
+        started = time.monotonic()
+        if hedge_delay_sec is None:
+            response = await self._post(
+                endpoint, request_payload, headers, timeout_sec, fresh
+            )
+        else:
+            endpoint, response = await self._hedged_post(
+                endpoint,
+                request_payload,
+                headers,
+                timeout_sec,
+                hedge_delay_sec,
+            )
+        if hedger is not None and response[0] == 200:
+            hedger.record(time.monotonic() - started)
+        if metrics is not None:
+            # the round trip of a hedged read is the winner's
+            metrics.add("round_trip", time.monotonic() - started)
+            metrics.status = response[0]
+            metrics.response_bytes = len(response[2])
+        return endpoint, response
+
+    async def _hedged_post(
+        self,
+        endpoint: Endpoint,
+        request_payload: bytes,
+        headers: dict,
+        timeout_sec: float,
+        delay_sec: float,
+    ):
+        """
+        See radio_duck.db.Cursor._hedged_post
+        :return: tuple of the endpoint that answered and its response
+        """
+        connection = self._connection
+        primary = asyncio.ensure_future(
+            self._post(endpoint, request_payload, headers, timeout_sec)
+        )
+        done, _ = await asyncio.wait({primary}, timeout=delay_sec)
+        if done or not connection.hedger.spend():
+            return endpoint, await primary
+        hedge_endpoint = connection.balancer.choose(exclude=[endpoint])
+        hedge_id = new_query_id()
+        hedge_headers = dict(headers)
+        hedge_headers[query_id_header] = hedge_id
+        connection._running[hedge_id] = hedge_endpoint
+        hedge = asyncio.ensure_future(
+            self._post(
+                hedge_endpoint, request_payload, hedge_headers, timeout_sec
+            )
+        )
+        hedge.add_done_callback(
+            lambda _: connection._running.pop(hedge_id, None)
+        )
+        requests = [
+            (primary, endpoint, headers[query_id_header]),
+            (hedge, hedge_endpoint, hedge_id),
+        ]
+        pending = {primary, hedge}
+        while pending:
+            _, pending = await asyncio.wait(
+                pending, return_when=asyncio.FIRST_COMPLETED
+            )
+            for task, winner, query_id in requests:
+                if task in pending or not _answered(task):
+                    continue
+                for loser, loser_endpoint, loser_id in requests:
+                    if loser is task:
+                        continue
+                    # left to finish, so its pooled connection is released
+                    if not loser.done():
+                        connection._in_background(
+                            self._cancel_timed_out(loser_endpoint, loser_id)
+                        )
+                    loser.add_done_callback(_drop_outcome)
+                    connection._in_background(loser)
+                if task is not primary:
+                    connection.hedger.win()
+                    self._query_id = query_id
+                return winner, task.result()
+        return endpoint, primary.result()
+
+    async def _post(
+        self,
+        endpoint: Endpoint,
+        request_payload: bytes,
+        headers: dict,
+        timeout_sec: float,
+        fresh=False,
+    ) -> Tuple[int, str, bytes]:
+        """
+        Send a request to a replica, feeding the balancer's health
+        and latency tracking. See radio_duck.db.Cursor._post
+        :raise asyncio.TimeoutError if timeout_sec passed without a response
+        """
+        balancer = self._connection.balancer
+        balancer.started(endpoint)
+        started = time.monotonic()
+        healthy = False
+        try:
+            response = await self._request(
+                endpoint.pool, request_payload, headers, timeout_sec, fresh
+            )
+            healthy = response[0] not in unavailable_statuses
+            return response
+        except asyncio.TimeoutError:
+            # a slow query, not a sick endpoint
+            healthy = True
+            raise
+        finally:
+            balancer.finished(endpoint, time.monotonic() - started, healthy)
+
+    async def _request(
+        self,
+        pool: AsyncConnectionPool,
+        request_payload: bytes,
+        headers: dict,
+        timeout_sec: float,
+        fresh=False,
+    ) -> Tuple[int, str, bytes]:
+        http_connection = await pool.acquire(fresh=fresh)
+        try:
+            status, response_headers, payload = await asyncio.wait_for(
+                http_connection.request(
+                    self._connection.api, request_payload, headers
+                ),
+                timeout_sec,
+            )
+        except asyncio.TimeoutError:
+            pool.release(http_connection, discard=True)
+            raise
+        except async_disconnect_errors:
+            pool.release(http_connection, discard=True)
+            raise
+        except Exception as e:
+            pool.release(http_connection, discard=True)
+            logging.error("error in querying server {}".format(e))
+            raise OperationalError(
+                msg=f"failed to execute query. error: {e!r}"
+            ) from e
+        pool.release(http_connection)
+        return (
+            status,
+            response_headers.get("content-type", ""),
+            decode_response(payload, response_headers.get("content-encoding")),
+        )
+
+
+def _drop_outcome(task: asyncio.Future):
+    # retrieved, so an error of a losing hedge is not reported as unhandled
+    if not task.cancelled():
+        task.exception()
+
+
+async def connect(*args, **kwargs) -> AsyncConnection:
+    """
+    Connect to the database. Takes the same kwargs as radio_duck.connect
+    :return: AsyncConnection object
+    :raise InterfaceError on incorrect scheme
+    :raise OperationalError if unable to connect to database
+    """
+    connection = AsyncConnection(*args, **kwargs)
+    if connection.tracer is None:
+        await connection._open()
+        return connection
+    with connection.tracer.span(
+        "radio_duck.connect",
+        **{"server.address": connection.host, "server.port": connection.port},
+    ):
+        await connection._open()
+    return connection
@@ -0,0 +1,183 @@
+"""
+Client side load balancing over several radio_duck replicas.
+
+Every replica (endpoint) has its own connection pool. The balancer picks
+the endpoint of each request and keeps passive health: endpoints failing
+repeatedly are ejected for a while, without any probing traffic.
+"""
+import itertools
+import logging
+import threading
+import time
+from typing import Iterable, List, Optional, Sequence, Tuple, Union
+
+from radio_duck.exceptions import InterfaceError
+
+_policies = ["round_robin", "least_outstanding", "ewma"]
+
+
+def parse_endpoints(
+    host: Optional[str],
+    port: Union[int, str, None],
+    hosts: Union[str, Sequence, None] = None,
+) -> List[Tuple[str, int]]:
+    """
+    :param host: first endpoint, may be None if hosts is given
+    :param hosts: more endpoints as 'host:port,host:port', ex: from a url
+    query string, or a sequence of 'host:port' or (host, port).
+    A host without a port gets port.
+    :return: distinct (host, port) in the given order
+    :raise InterfaceError if there is no endpoint or a port is invalid
+    """
+    default_port = int(port or 8000)
+    if isinstance(hosts, str):
+        hosts = [h for h in hosts.split(",") if h.strip()]
+    endpoints = []
+    for entry in ([host] if host else []) + list(hosts or []):
+        if isinstance(entry, str):
+            name, _, entry_port = entry.strip().rpartition(":")
+            if not name:
+                name, entry_port = entry_port, ""
+        else:
+            name, entry_port = entry
+        try:
+            endpoint = (name, int(entry_port or default_port))
+        except ValueError:
+            raise InterfaceError(
+                msg=f"invalid port in endpoint {entry}"
+            ) from None
+        if endpoint not in endpoints:
+            endpoints.append(endpoint)
+    if not endpoints:
+        raise InterfaceError(msg="no host given to connect to")
+    return endpoints
+
+
+class Endpoint(object):
+    """
+    One replica, its pool and what the balancer knows about it.
+    """
+
+    def __init__(self, host: str, port: int, pool):
+        self.host = host
+        self.port = port
+        self.pool = pool
+        # requests sent and not yet answered
+        self.outstanding = 0
+        # moving average of response times, None until measured
+        self.ewma_sec: Optional[float] = None
+        self.consecutive_failures = 0
+        self.ejected_until = 0.0
+
+    @property
+    def address(self) -> str:
+        return f"{self.host}:{self.port}"
+
+    def is_ejected(self, now: float) -> bool:
+        return self.ejected_until > now
+
+    def __repr__(self):
+        return f"Endpoint({self.address})"
+
+
+class Balancer(object):
+    """
+    Picks the endpoint of each request.
+
+    round_robin: endpoints in turn.
+    least_outstanding: fewest requests in flight, ties in turn.
+    ewma: lowest expected wait, the moving average of response times
+    scaled by requests in flight. Endpoints not measured yet go first.
+
+    An endpoint failing eject_after times in a row is skipped for
+    eject_sec. If every endpoint is ejected, the one whose ejection
+    ends first is used anyway.
+    """
+
+    def __init__(
+        self,
+        endpoints: List[Endpoint],
+        policy: str = "round_robin",
+        eject_after: int = 3,
+        eject_sec: float = 30,
+        ewma_alpha: float = 0.3,
+    ):
+        if policy not in _policies:
+            raise InterfaceError(
+                msg=f"unknown balance policy {policy}. supported: {_policies}"
+            )
+        if not endpoints:
+            raise InterfaceError(msg="no endpoint to balance over")
+        self.endpoints = endpoints
+        self.policy = policy
+        self.eject_after = eject_after
+        self.eject_sec = eject_sec
+        self.ewma_alpha = ewma_alpha
+        self._turn = itertools.count()
+        self._lock = threading.Lock()
+
+    def choose(self, exclude: Iterable[Endpoint] = ()) -> Endpoint:
+        """
+        :param exclude: endpoints already tried by this request,
+        chosen only if there is nothing else
+        """
+        now = time.monotonic()
+        with self._lock:
+            candidates = [
+                e for e in self.endpoints if e not in exclude
+            ] or self.endpoints
+            healthy = [e for e in candidates if not e.is_ejected(now)]
+            if not healthy:
+                return min(candidates, key=lambda e: e.ejected_until)
+            # rotate, so ties go to endpoints in turn
+            start = next(self._turn) % len(healthy)
+            healthy = healthy[start:] + healthy[:start]
+            if self.policy == "least_outstanding":
+                return min(healthy, key=lambda e: e.outstanding)
+            if self.policy == "ewma":
+                return min(healthy, key=_expected_wait)
+            return healthy[0]
+
+    def started(self, endpoint: Endpoint):
+        with self._lock:
+            endpoint.outstanding = endpoint.outstanding + 1
+
+    def finished(self, endpoint: Endpoint, elapsed_sec: float, ok: bool):
+        """
+        :param ok: False if the endpoint failed to answer or was
+        unavailable, not for errors of the query itself
+        """
+        with self._lock:
+            endpoint.outstanding = max(0, endpoint.outstanding - 1)
+            if not ok:
+                endpoint.consecutive_failures = (
+                    endpoint.consecutive_failures + 1
+                )
+                if endpoint.consecutive_failures >= self.eject_after:
+                    endpoint.ejected_until = time.monotonic() + self.eject_sec
+                    endpoint.consecutive_failures = 0
+                    logging.warning(
+                        "ejecting radio_duck endpoint {} for {}s".format(
+                            endpoint.address, self.eject_sec
+                        )
+                    )
+                return
+            endpoint.consecutive_failures = 0
+            endpoint.ejected_until = 0.0
+            if endpoint.ewma_sec is None:
+                endpoint.ewma_sec = elapsed_sec
+            else:
+                endpoint.ewma_sec = (
+                    self.ewma_alpha * elapsed_sec
+                    + (1 - self.ewma_alpha) * endpoint.ewma_sec  # noqa: W503
+                )
+
+    def eject(self, endpoint: Endpoint):
+        with self._lock:
+            endpoint.ejected_until = time.monotonic() + self.eject_sec
+
+
+def _expected_wait(endpoint: Endpoint) -> float:
+    if endpoint.ewma_sec is None:
+        return -1.0
+    return endpoint.ewma_sec * (endpoint.outstanding + 1)
@@ -0,0 +1,70 @@
+import pytest
+
+from radio_duck.balancer import Balancer, Endpoint, parse_endpoints
+from radio_duck.exceptions import InterfaceError
+
+
+def _endpoints(n):
+    return [Endpoint("replica", 8000 + i, None) for i in range(n)]
+
+
+def test_parse_endpoints():
+    assert [("a", 8000), ("b", 9000), ("c", 8000)] == parse_endpoints(
+        "a", 8000, "b:9000, c,a:8000"
+    )
+    assert [("b", 1), ("c", 2)] == parse_endpoints(
+        None, None, ["b:1", ("c", 2)]
+    )
+    with pytest.raises(InterfaceError):
+        parse_endpoints(None, 8000)
+    with pytest.raises(InterfaceError):
+        parse_endpoints("a", 8000, "b:http")
+
+
+def test_round_robin():
+    endpoints = _endpoints(3)
+    balancer = Balancer(endpoints)
+    chosen = [balancer.choose() for _ in range(6)]
+    assert endpoints + endpoints == chosen
+    assert endpoints[2] == balancer.choose(exclude=endpoints[:2])
+    assert balancer.choose(exclude=endpoints) in endpoints
+
+
+def test_least_outstanding():
+    endpoints = _endpoints(3)
+    balancer = Balancer(endpoints, policy="least_outstanding")
+    balancer.started(endpoints[0])
+    balancer.started(endpoints[1])
+    assert endpoints[2] == balancer.choose()
+    balancer.finished(endpoints[0], 0.1, True)
+    assert endpoints[1] != balancer.choose()
+
+
+def test_ewma():
+    endpoints = _endpoints(2)
+    balancer = Balancer(endpoints, policy="ewma")
+    balancer.started(endpoints[0])
+    balancer.finished(endpoints[0], 0.5, True)
+    balancer.started(endpoints[1])
+    balancer.finished(endpoints[1], 0.1, True)
+    assert all(endpoints[1] == balancer.choose() for _ in range(4))
+    # the fast one is busy enough to be slower
+    for _ in range(5):
+        balancer.started(endpoints[1])
+    assert endpoints[0] == balancer.choose()
+
+
+def test_ejection():
+    endpoints = _endpoints(2)
+    balancer = Balancer(endpoints, eject_after=2, eject_sec=60)
+    for _ in range(2):
+        balancer.started(endpoints[0])
+        balancer.finished(endpoints[0], 0.1, False)
+    assert all(endpoints[1] == balancer.choose() for _ in range(4))
+    balancer.eject(endpoints[1])
+    assert endpoints[0] == balancer.choose(), "ejected first, retried first"
+
+
+def test_unknown_policy():
+    with pytest.raises(InterfaceError):
+        Balancer(_endpoints(1), policy="random")
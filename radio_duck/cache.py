@@ -0,0 +1,95 @@
+import collections
+import json
+import threading
+import time
+from typing import Any, Hashable, Optional, Union
+
+from radio_duck.statements import normalize
+
+
+def normalize_sql(query: str) -> str:
+    """
+    :return: query without comments and with runs of whitespace
+    outside of quoted literals collapsed, so that formatting
+    differences map to the same cache entry
+    """
+    return normalize(query)
+
+
+def cache_key(query: Union[bytes, str], parameters, *extra) -> Hashable:
+    """
+    :param extra: anything else which changes the response,
+    ex: the result format
+    """
+    if isinstance(query, str):
+        query = normalize_sql(query)
+    return (
+        query,
+        json.dumps(parameters, sort_keys=True, default=repr),
+    ) + extra
+
+
+class TtlLruCache(object):
+    """
+    Thread safe LRU mapping whose entries expire ttl_sec after being put.
+    """
+
+    def __init__(self, max_size: int = 256, ttl_sec: float = 60):
+        self.max_size = max_size
+        self.ttl_sec = ttl_sec
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] < time.monotonic():
+                del self._entries[key]
+                entry = None
+            if entry is None:
+                self.misses = self.misses + 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits = self.hits + 1
+            return entry[1]
+
+    def put(self, key: Hashable, value: Any):
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl_sec, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions = self.evictions + 1
+
+    def invalidate(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "size": len(self._entries),
+                "max_size": self.max_size,
+            }
+
+
+class ResultCache(TtlLruCache):
+    """
+    Responses of read only queries, keyed by normalized sql,
+    parameters and result format. A connection clears it whenever
+    it runs anything that is not read only (DDL/DML).
+
+    Can be shared by several connections, ex: a sqlalchemy pool,
+    by passing the same instance as the result_cache kwarg.
+    """
@@ -0,0 +1,62 @@
+import time
+
+from radio_duck.cache import TtlLruCache, cache_key, normalize_sql
+
+
+def test_normalize_sql():
+    assert "select * from pond where a = 'x  y'" == normalize_sql(
+        "select *\n  from pond -- all ducks\n where a = 'x  y' ;"
+    )
+    assert normalize_sql("select /* hint */ 1") == normalize_sql("select  1")
+    assert normalize_sql("select 'a -- b'") == "select 'a -- b'"
+    # whitespace within escaped and dollar quoted strings is kept
+    assert normalize_sql("select E'a\\'  b'") != normalize_sql(
+        "select E'a\\' b'"
+    )
+    assert normalize_sql("select $$a   b$$") == "select $$a   b$$"
+    assert normalize_sql("select $q$a -- b$q$") == "select $q$a -- b$q$"
+
+
+def test_cache_key():
+    assert cache_key("select ?", [1], "json") == cache_key(
+        "select   ?", [1], "json"
+    )
+    assert cache_key("select ?", [1], "json") != cache_key(
+        "select ?", [2], "json"
+    )
+    assert cache_key("select ?", [1], "json") != cache_key(
+        "select ?", [1], "arrow"
+    )
+
+
+def test_lru_eviction():
+    cache = TtlLruCache(max_size=2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert 1 == cache.get("a")
+    cache.put("c", 3)  # b is the least recently used
+    assert cache.get("b") is None
+    assert 3 == cache.get("c")
+    assert {
+        "hits": 2,
+        "misses": 1,
+        "evictions": 1,
+        "size": 2,
+        "max_size": 2,
+    } == cache.stats()
+
+
+def test_ttl_expiry():
+    cache = TtlLruCache(ttl_sec=0.05)
+    cache.put("a", 1)
+    assert 1 == cache.get("a")
+    time.sleep(0.1)
+    assert cache.get("a") is None
+    assert 0 == len(cache)
+
+
+def test_invalidate():
+    cache = TtlLruCache()
+    cache.put("a", 1)
+    cache.invalidate()
+    assert cache.get("a") is None
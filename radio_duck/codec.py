@@ -0,0 +1,120 @@
+"""
+json encoding of requests and decoding of responses.
+
+The fastest installed backend is used: orjson, simdjson (decoding
+only), ujson, else the standard library.
+"""
+import datetime
+import decimal
+import json
+import uuid
+from typing import Any, Optional
+
+from radio_duck.exceptions import InterfaceError, NotSupportedError
+
+
+def _encode_default(value):
+    """
+    Encode parameter values json has no type for.
+    """
+    if isinstance(value, (datetime.datetime, datetime.date, datetime.time)):
+        return value.isoformat()
+    if isinstance(value, (decimal.Decimal, uuid.UUID)):
+        return str(value)
+    raise TypeError(f"cannot encode {type(value).__name__} as json")
+
+
+class JsonCodec(object):
+    """
+    The standard library codec. Other backends override dumps/loads.
+    """
+
+    name = "json"
+
+    def dumps(self, obj) -> bytes:
+        return json.dumps(obj, default=_encode_default).encode("utf-8")
+
+    def loads(self, data: bytes) -> Any:
+        return json.loads(data)
+
+
+class OrjsonCodec(JsonCodec):
+    name = "orjson"
+
+    def __init__(self):
+        import orjson
+
+        self._orjson = orjson
+
+    def dumps(self, obj) -> bytes:
+        # orjson encodes datetime and uuid itself, in the same iso format
+        return self._orjson.dumps(obj, default=_encode_default)
+
+    def loads(self, data: bytes) -> Any:
+        return self._orjson.loads(data)
+
+
+class UjsonCodec(JsonCodec):
+    name = "ujson"
+
+    def __init__(self):
+        import ujson
+
+        self._ujson = ujson
+
+    def dumps(self, obj) -> bytes:
+        return self._ujson.dumps(
+            obj, default=_encode_default, ensure_ascii=False
+        ).encode("utf-8")
+
+    def loads(self, data: bytes) -> Any:
+        return self._ujson.loads(data)
+
+
+class SimdjsonCodec(JsonCodec):
+    name = "simdjson"
+
+    def __init__(self):
+        import simdjson
+
+        self._simdjson = simdjson
+
+    def loads(self, data: bytes) -> Any:
+        return self._simdjson.loads(data)
+
+
+# in order of preference
+_codecs = {
+    codec.name: codec
+    for codec in (OrjsonCodec, SimdjsonCodec, UjsonCodec, JsonCodec)
+}
+_default_codec: Optional[JsonCodec] = None
+
+
+def get_codec(name: str = "auto") -> JsonCodec:
+    """
+    :param name: 'auto' for the fastest installed backend,
+    or one of 'orjson', 'simdjson', 'ujson', 'json'
+    :raise InterfaceError on an unknown name
+    :raise NotSupportedError if the named backend is not installed
+    """
+    global _default_codec
+    if name is None or name == "auto":
+        if _default_codec is None:
+            for codec in _codecs.values():
+                try:
+                    _default_codec = codec()
+                    break
+                except ImportError:
+                    continue
+        return _default_codec
+    if name not in _codecs:
+        raise InterfaceError(
+            msg=f"unknown json_codec {name}. supported: {list(_codecs)}"
+        )
+    try:
+        return _codecs[name]()
+    except ImportError:
+        raise NotSupportedError(
+            msg=f"json_codec {name} is not installed. pip install {name}"
+        ) from None
@@ -0,0 +1,46 @@
+import datetime
+import decimal
+import importlib.util
+import json
+import uuid
+
+import pytest
+
+from radio_duck import InterfaceError, NotSupportedError
+from radio_duck.codec import JsonCodec, get_codec
+
+
+def test_get_codec():
+    assert "json" == get_codec("json").name
+    assert get_codec() is get_codec("auto")
+    if importlib.util.find_spec("orjson") is not None:
+        assert "orjson" == get_codec().name
+    with pytest.raises(InterfaceError):
+        get_codec("yaml")
+    for name in ("orjson", "simdjson", "ujson"):
+        if importlib.util.find_spec(name) is None:
+            with pytest.raises(NotSupportedError):
+                get_codec(name)
+
+
+def test_encode_parameters():
+    request = {
+        "parameters": [
+            datetime.datetime(2023, 10, 1, 12, 30, 5),
+            datetime.date(2023, 10, 1),
+            decimal.Decimal("1.10"),
+            uuid.UUID("12345678-1234-5678-1234-567812345678"),
+            "ü",
+        ]
+    }
+    expected = [
+        "2023-10-01T12:30:05",
+        "2023-10-01",
+        "1.10",
+        "12345678-1234-5678-1234-567812345678",
+        "ü",
+    ]
+    assert expected == json.loads(JsonCodec().dumps(request))["parameters"]
+    assert expected == json.loads(get_codec().dumps(request))["parameters"]
+    with pytest.raises(TypeError):
+        JsonCodec().dumps({"parameters": [object()]})
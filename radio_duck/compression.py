@@ -0,0 +1,168 @@
+"""
+Content-Encoding of responses and, optionally, of request bodies.
+
+zstd is used when the zstandard package is installed,
+gzip/deflate from the standard library otherwise.
+"""
+import zlib
+from typing import Optional
+
+from radio_duck.exceptions import InterfaceError, NotSupportedError
+
+try:
+    import zstandard
+except ImportError:  # optional
+    zstandard = None
+
+
+def supported_encodings() -> list:
+    """
+    :return: content encodings this client can decode, preferred first
+    """
+    encodings = ["gzip", "deflate"]
+    if zstandard is not None:
+        encodings.insert(0, "zstd")
+    return encodings
+
+
+def accept_encoding() -> str:
+    return ", ".join(supported_encodings())
+
+
+def check_encoding(encoding: Optional[str]) -> Optional[str]:
+    """
+    Validate a request compression setting.
+    :return: the encoding or None to send requests uncompressed
+    """
+    if encoding is None or str(encoding).strip().lower() in (
+        "",
+        "false",
+        "none",
+        "identity",
+    ):
+        return None
+    encoding = str(encoding).strip().lower()
+    if encoding == "zstd" and zstandard is None:
+        raise NotSupportedError(
+            msg="zstd compression requires zstandard. pip install zstandard"
+        )
+    if encoding not in ("zstd", "gzip", "deflate"):
+        raise InterfaceError(
+            msg=f"unknown compression {encoding}. supported: zstd, gzip, deflate"  # noqa: E501
+        )
+    return encoding
+
+
+def compress(data: bytes, encoding: str) -> bytes:
+    if encoding == "zstd":
+        return zstandard.ZstdCompressor().compress(data)
+    if encoding == "gzip":
+        compressor = zlib.compressobj(wbits=31)
+    else:
+        compressor = zlib.compressobj()
+    return compressor.compress(data) + compressor.flush()
+
+
+class _Deflate(object):
+    """
+    'deflate' should be zlib wrapped, some servers send it raw.
+    The wrapping is told apart by the first byte.
+    """
+
+    def __init__(self):
+        self._decompressor = None
+
+    def decompress(self, data: bytes) -> bytes:
+        if self._decompressor is None:
+            if not data:
+                return b""
+            wbits = 15 if data[0] & 0x0F == 8 else -15
+            self._decompressor = zlib.decompressobj(wbits)
+        return self._decompressor.decompress(data)
+
+    def flush(self) -> bytes:
+        if self._decompressor is None:
+            return b""
+        return self._decompressor.flush()
+
+
+def _decompressor(encoding: str):
+    if encoding == "gzip" or encoding == "x-gzip":
+        return zlib.decompressobj(wbits=31)
+    if encoding == "deflate":
+        return _Deflate()
+    if encoding == "zstd" and zstandard is not None:
+        return zstandard.ZstdDecompressor().decompressobj()
+    raise NotSupportedError(
+        msg=f"cannot decode response with content encoding {encoding}"
+    )
+
+
+def is_encoded(encoding: Optional[str]) -> bool:
+    return encoding is not None and encoding.strip().lower() not in (
+        "",
+        "identity",
+    )
+
+
+def decompress(data: bytes, encoding: str) -> bytes:
+    decompressor = _decompressor(encoding.strip().lower())
+    return decompressor.decompress(data) + decompressor.flush()
+
+
+class DecompressingReader(object):
+    """
+    File like object decompressing a response body as it is read.
+    """
+
+    def __init__(self, source, encoding: str, chunk_size: int = 64 * 1024):
+        """
+        :param source: object with read(amt), ex: PooledResponse
+        """
+        self._source = source
+        self._decompressor = _decompressor(encoding.strip().lower())
+        self._chunk_size = chunk_size
+        self._buf = bytearray()
+        self._eof = False
+        self.closed = False
+
+    def read(self, amt: Optional[int] = None) -> bytes:
+        if amt is None or amt < 0:
+            while not self._eof:
+                self._fill()
+            amt = len(self._buf)
+        else:
+            while not self._buf and not self._eof:
+                self._fill()
+        data = bytes(self._buf[:amt])
+        del self._buf[:amt]
+        return data
+
+    def readline(self) -> bytes:
+        while b"\n" not in self._buf and not self._eof:
+            self._fill()
+        end = self._buf.find(b"\n") + 1 or len(self._buf)
+        data = bytes(self._buf[:end])
+        del self._buf[:end]
+        return data
+
+    def close(self, drain=False):
+        if self.closed:
+            return
+        self.closed = True
+        self._buf = bytearray()
+        close = getattr(self._source, "close", None)
+        if close is None:
+            return
+        try:
+            close(drain=drain)
+        except TypeError:
+            close()
+
+    def _fill(self):
+        chunk = self._source.read(self._chunk_size)
+        if not chunk:
+            self._eof = True
+            self._buf += self._decompressor.flush()
+            return
+        self._buf += self._decompressor.decompress(chunk)
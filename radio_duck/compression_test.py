@@ -0,0 +1,52 @@
+import gzip
+import io
+import zlib
+
+import pytest
+
+from radio_duck.compression import (
+    DecompressingReader,
+    accept_encoding,
+    check_encoding,
+    compress,
+    decompress,
+)
+from radio_duck.exceptions import InterfaceError
+
+data = b"\n".join(b'["duck_%d", %d]' % (i, i) for i in range(1000))
+
+
+@pytest.mark.parametrize("encoding", ["gzip", "deflate"])
+def test_round_trip(encoding):
+    assert data == decompress(compress(data, encoding), encoding)
+
+
+def test_raw_deflate():
+    compressor = zlib.compressobj(wbits=-15)
+    raw = compressor.compress(data) + compressor.flush()
+    assert data == decompress(raw, "deflate")
+
+
+def test_accept_encoding():
+    assert "gzip" in accept_encoding()
+    assert "deflate" in accept_encoding()
+
+
+def test_check_encoding():
+    assert check_encoding(None) is None
+    assert check_encoding("identity") is None
+    assert "gzip" == check_encoding(" GZIP ")
+    with pytest.raises(InterfaceError):
+        check_encoding("br")
+
+
+def test_decompressing_reader():
+    reader = DecompressingReader(
+        io.BytesIO(gzip.compress(data)), "gzip", chunk_size=64
+    )
+    assert b'["duck_0", 0]\n' == reader.readline()
+    assert b'["duck_1", 1]' == reader.read(13)
+    assert data.split(b"\n", 2)[2] == reader.read()[1:]
+    assert b"" == reader.read()
+    reader.close()
+    assert reader.closed
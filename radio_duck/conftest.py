@@ -0,0 +1,14 @@
+import gc
+
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def close_mock_servers():
+    """
+    http_server_mock shuts its server down without closing the listening
+    socket, which stays bound until the server is garbage collected.
+    Collect it so that the next test can bind the same port.
+    """
+    yield
+    gc.collect()
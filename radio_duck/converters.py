@@ -0,0 +1,256 @@
+"""
+Typed conversion of json values, driven by the column types of a result.
+
+Rows are converted lazily and a column at a time: the first time any row
+of a fetched chunk is indexed at a column, that column is converted for
+the whole chunk. Columns nobody reads are never converted.
+"""
+import datetime
+import decimal
+import re
+import uuid
+from collections.abc import Sequence
+from typing import Any, Callable, FrozenSet, List, Optional, Union
+
+from radio_duck import db_types
+from radio_duck.exceptions import DataError
+
+_timestamp = re.compile(
+    r"^(\d{4}-\d{2}-\d{2}[T ]\d{2}:\d{2}(?::\d{2})?)(?:\.(\d+))?"
+    r"(Z|[+-]\d{2}(?::?\d{2})?)?$"
+)
+# duckdb's text form of an INTERVAL, ex: '1 year 2 months 3 days 04:05:06'
+_interval = re.compile(
+    r"^\s*(?:(-?\d+) years?)?\s*(?:(-?\d+) mon(?:th)?s?)?\s*"
+    r"(?:(-?\d+) days?)?\s*(?:(-?)(\d+):(\d{2}):(\d{2})(?:\.(\d+))?)?\s*$"
+)
+# duckdb's text form of a BLOB, non printable bytes escaped as \xHH
+_blob_byte = re.compile(r"\\x([0-9A-Fa-f]{2})|(.)", re.DOTALL)
+_decimal_type = re.compile(
+    r"^(?:DECIMAL|NUMERIC)\s*\(\s*(\d+)\s*,\s*(\d+)\s*\)$"
+)
+# widest decimal of duckdb, in digits
+_max_decimal_width = 38
+
+
+def parse_timestamp(value: str) -> datetime.datetime:
+    try:
+        return datetime.datetime.fromisoformat(value)
+    except ValueError:
+        pass
+    # what older pythons' fromisoformat rejects: 'Z', '+05' offsets
+    # and fractions of other than 3 or 6 digits, ex: nanoseconds
+    match = _timestamp.match(value)
+    if match is None:
+        raise ValueError(f"invalid timestamp {value!r}")
+    base, fraction, offset = match.groups()
+    if fraction:
+        base = base + "." + fraction[:6].ljust(6, "0")
+    if offset == "Z":
+        offset = "+00:00"
+    elif offset and ":" not in offset:
+        offset = offset[:3] + ":" + (offset[3:] or "00")
+    return datetime.datetime.fromisoformat(base + (offset or ""))
+
+
+def parse_temporal(value: str):
+    # radio_duck's generic DATETIME covers dates and timestamps
+    if len(value) == 10:
+        return datetime.date.fromisoformat(value)
+    return parse_timestamp(value)
+
+
+def parse_interval(value) -> datetime.timedelta:
+    """
+    Months and years have no fixed length; they are taken
+    as 30 and 365 days, as duckdb does for epoch().
+    """
+    if isinstance(value, (int, float)):
+        return datetime.timedelta(seconds=value)
+    match = _interval.match(value)
+    if match is None or not value.strip():
+        raise ValueError(f"invalid interval {value!r}")
+    years, months, days, sign, hours, minutes, seconds, fraction = (
+        match.groups()
+    )
+    clock = datetime.timedelta(
+        hours=int(hours or 0),
+        minutes=int(minutes or 0),
+        seconds=int(seconds or 0),
+        microseconds=int((fraction or "0")[:6].ljust(6, "0")),
+    )
+    return datetime.timedelta(
+        days=int(years or 0) * 365 + int(months or 0) * 30 + int(days or 0)
+    ) + (-clock if sign == "-" else clock)
+
+
+def parse_blob(value) -> bytes:
+    if isinstance(value, bytes):
+        return value
+    return bytes(
+        int(hex_byte, 16) if hex_byte else ord(char)
+        for hex_byte, char in _blob_byte.findall(value)
+    )
+
+
+def to_decimal(value) -> decimal.Decimal:
+    # str() of a float is its shortest round trip repr, ex: 0.1
+    return decimal.Decimal(value if isinstance(value, str) else str(value))
+
+
+def _scaled_decimal(
+    width: int, scale: int
+) -> Callable[[Any], decimal.Decimal]:
+    exponent = decimal.Decimal(1).scaleb(-scale)
+    # the default context has 28 digits, too few for a DECIMAL(38, s)
+    context = decimal.Context(prec=max(width, _max_decimal_width))
+
+    def convert(value) -> decimal.Decimal:
+        return to_decimal(value).quantize(exponent, context=context)
+
+    return convert
+
+
+_timestamp_types = {
+    "TIMESTAMP",
+    "TIMESTAMPTZ",
+    "TIMESTAMP WITH TIME ZONE",
+    "TIMESTAMP_S",
+    "TIMESTAMP_MS",
+    "TIMESTAMP_NS",
+}
+
+# for type names radio_duck reduces to a PEP 249 type object
+_type_object_converters = {
+    db_types.DATETIME.get_type_code(): parse_temporal,
+    db_types.BINARY.get_type_code(): parse_blob,
+}
+
+
+def get_converter(type_name: str) -> Optional[Callable[[Any], Any]]:
+    """
+    :return: function converting a non null json value of a column
+    of the given schema type or None if json already has the right type
+    """
+    type_name = str(type_name).strip().upper()
+    if type_name == "DATE":
+        return datetime.date.fromisoformat
+    if type_name == "TIME":
+        return datetime.time.fromisoformat
+    if type_name in _timestamp_types:
+        return parse_timestamp
+    if type_name == "INTERVAL":
+        return parse_interval
+    if type_name in ("BLOB", "BYTEA", "VARBINARY"):
+        return parse_blob
+    if type_name == "UUID":
+        return uuid.UUID
+    match = _decimal_type.match(type_name)
+    if match is not None:
+        return _scaled_decimal(int(match.group(1)), int(match.group(2)))
+    if type_name in ("DECIMAL", "NUMERIC"):
+        return to_decimal
+    return _type_object_converters.get(db_types.get_type_code(type_name))
+
+
+def column_converters(
+    schema: List[str],
+    columns: List[str],
+    only: Union[bool, FrozenSet[str]] = True,
+) -> List[Optional[Callable]]:
+    """
+    :param only: True for all columns or names of the columns to convert
+    """
+    selected = [only is True or name in only for name in columns]
+    return [
+        (
+            get_converter(type_name)
+            if index < len(selected) and selected[index]
+            else None
+        )
+        for index, type_name in enumerate(schema)
+    ]
+
+
+def parse_columns_option(value) -> Union[bool, FrozenSet[str]]:
+    """
+    :param value: bool, iterable of column names or, from a url query
+    string, 'true'/'false' or comma separated column names
+    """
+    if isinstance(value, str):
+        if value.strip().lower() in ("true", "1", "yes"):
+            return True
+        if value.strip().lower() in ("", "false", "0", "no"):
+            return False
+        return frozenset(name.strip() for name in value.split(","))
+    if isinstance(value, (list, tuple, set, frozenset)):
+        return frozenset(value)
+    return bool(value)
+
+
+class _Chunk(object):
+    """
+    Rows fetched together. Each column is converted for all of them
+    on first access.
+    """
+
+    __slots__ = ("rows", "_pending")
+
+    def __init__(self, rows: List[list], converters: List[Optional[Callable]]):
+        self.rows = rows
+        self._pending = list(converters)
+
+    def convert(self, index: int):
+        if index >= len(self._pending) or self._pending[index] is None:
+            return
+        converter = self._pending[index]
+        self._pending[index] = None
+        try:
+            for row in self.rows:
+                value = row[index]
+                if value is not None:
+                    row[index] = converter(value)
+        except (ValueError, TypeError, ArithmeticError) as e:
+            raise DataError(
+                msg=f"could not convert value of column {index}: {e}"
+            ) from e
+
+
+class LazyRow(Sequence):
+    """
+    A row whose values are converted to python types when indexed.
+    """
+
+    __slots__ = ("_chunk", "_row")
+
+    def __init__(self, chunk: _Chunk, row: list):
+        self._chunk = chunk
+        self._row = row
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            for i in range(*index.indices(len(self._row))):
+                self._chunk.convert(i)
+        else:
+            self._chunk.convert(
+                index if index >= 0 else len(self._row) + index
+            )
+        return self._row[index]
+
+    def __len__(self):
+        return len(self._row)
+
+    def __eq__(self, other):
+        if isinstance(other, Sequence) and not isinstance(other, str):
+            return list(self) == list(other)
+        return NotImplemented
+
+    def __repr__(self):
+        return repr(list(self))
+
+
+def lazy_rows(
+    rows: List[list], converters: List[Optional[Callable]]
+) -> List[LazyRow]:
+    chunk = _Chunk(rows, converters)
+    return [LazyRow(chunk, row) for row in rows]
@@ -0,0 +1,85 @@
+import datetime
+import decimal
+import uuid
+
+import pytest
+
+from radio_duck import DataError
+from radio_duck.converters import (
+    column_converters,
+    get_converter,
+    lazy_rows,
+    parse_columns_option,
+)
+
+
+def test_converters():
+    timestamp = get_converter("TIMESTAMP")
+    assert datetime.datetime(2023, 10, 1, 12, 30) == timestamp(
+        "2023-10-01 12:30:00"
+    )
+    assert datetime.datetime(
+        2023, 10, 1, 12, 30, 0, 123456, tzinfo=datetime.timezone.utc
+    ) == timestamp("2023-10-01 12:30:00.123456789Z")
+    offset = timestamp("2023-10-01 12:30:00+05").utcoffset()
+    assert datetime.timedelta(hours=5) == offset
+    assert datetime.date(2023, 10, 1) == get_converter("DATE")("2023-10-01")
+    assert decimal.Decimal("0.100") == get_converter("DECIMAL(18,3)")(0.1)
+    assert "0.100" == str(get_converter("decimal(18, 3)")("0.1"))
+    widest = "1234567890123456789012345678.9012345678"
+    assert decimal.Decimal(widest) == get_converter("DECIMAL(38,10)")(widest)
+    assert uuid.UUID(int=1) == get_converter("UUID")(str(uuid.UUID(int=1)))
+    assert b"\xaa\xbbduck" == get_converter("BLOB")("\\xAA\\xBBduck")
+    assert datetime.timedelta(days=33, hours=4, seconds=6) == get_converter(
+        "INTERVAL"
+    )("1 month 3 days 04:00:06")
+    assert datetime.timedelta(hours=-1) == get_converter("INTERVAL")(
+        "-01:00:00"
+    )
+    assert get_converter("VARCHAR") is None
+    assert get_converter("NUMBER") is None
+
+
+def test_converters_of_pep249_type_objects():
+    # radio_duck's coarse type names map to db_types type objects
+    assert datetime.date(2023, 10, 1) == get_converter("DATETIME")(
+        "2023-10-01"
+    )
+    assert datetime.datetime(2023, 10, 1, 1, 2) == get_converter("DATETIME")(
+        "2023-10-01T01:02:00"
+    )
+    assert b"\x01" == get_converter("BINARY")("\\x01")
+    assert get_converter("STRING") is None
+
+
+def test_lazy_rows_convert_read_columns_only():
+    calls = []
+
+    def convert(value):
+        calls.append(value)
+        return value.upper()
+
+    rows = lazy_rows([["a", "b", 1], ["c", None, 2]], [convert, convert, None])
+    assert "A" == rows[0][0]
+    assert ["a", "c"] == calls, "the whole column is converted at once"
+    assert "C" == rows[1][0]
+    assert 2 == len(calls)
+    assert ["C", None, 2] == rows[1]
+    assert ["a", "c", "b"] == calls
+    assert (2,) == tuple(rows[1][-1:])
+
+
+def test_column_converters():
+    converters = column_converters(
+        ["DATE", "DATE", "STRING"], ["a", "b", "c"], frozenset(["b"])
+    )
+    assert [None, datetime.date.fromisoformat, None] == converters
+    assert frozenset(["a", "b"]) == parse_columns_option("a, b")
+    assert parse_columns_option("true") is True
+    assert parse_columns_option("false") is False
+
+
+def test_conversion_error():
+    rows = lazy_rows([["not a date"]], column_converters(["DATE"], ["d"]))
+    with pytest.raises(DataError):
+        rows[0][0]
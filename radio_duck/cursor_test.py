@@ -1,6 +1,14 @@
+import json
+
 import pytest
 
-from radio_duck import OperationalError, ProgrammingError, connect, db_types
+from radio_duck import (
+    NotSupportedError,
+    OperationalError,
+    ProgrammingError,
+    connect,
+    db_types,
+)
 from radio_duck.connection_test import http_server_port
 
 
@@ -30,6 +38,29 @@ def test_no_query():
             assert "query is empty" in e.msg.lower()
 
 
+def test_unencodable_parameters():
+    from http_server_mock import HttpServerMock
+
+    app = HttpServerMock(__name__)
+
+    @app.route("/v1/sql/", methods=["POST"])
+    def index():
+        return "{}"
+
+    with app.run("localhost", http_server_port):
+        with connect(
+            host="localhost",
+            port=http_server_port,
+            api="/v1/sql/",
+            scheme="http",
+        ) as conn:
+            with conn.cursor() as cursor:
+                for parameters in ([object()], [{1, 2}]):
+                    with pytest.raises(ProgrammingError) as e:
+                        cursor.execute("select ?", parameters)
+                    assert "cannot encode query parameters" in e.value.msg
+
+
 def test_cursor_description():
     from http_server_mock import HttpServerMock
 
@@ -352,3 +383,862 @@ def test_with_server():
             assert cursor.rowcount == 0, "testing rowcount after execution"
             row = cursor.fetchone()
             assert row is None
+
+
+class _DroppingServer(object):
+    """
+    Raw http server which drops the first `drops` requests without
+    replying, like an idle keep-alive socket closed by a load balancer.
+    """
+
+    body = b'{"schema": ["NUMBER"], "columns": ["n"], "rows": [[1]]}'
+
+    def __init__(self, drops):
+        import socket
+        import threading
+
+        self.drops = drops
+        self.requests = 0
+        self.sock = socket.socket()
+        self.sock.bind(("localhost", 0))
+        self.sock.listen(8)
+        self.port = self.sock.getsockname()[1]
+        self.thread = threading.Thread(target=self._serve, daemon=True)
+        self.thread.start()
+
+    def _serve(self):
+        while True:
+            try:
+                client, _ = self.sock.accept()
+            except OSError:
+                return
+            with client, client.makefile("rb") as reader:
+                while True:
+                    line = reader.readline()
+                    if not line:
+                        break
+                    length = 0
+                    while line not in (b"\r\n", b""):
+                        if line.lower().startswith(b"content-length"):
+                            length = int(line.split(b":")[1])
+                        line = reader.readline()
+                    reader.read(length)
+                    self.requests += 1
+                    if self.requests <= self.drops:
+                        break  # close without responding
+                    head = (
+                        b"HTTP/1.1 200 OK\r\nContent-Type: application/json"
+                        b"\r\nContent-Length: %d\r\n\r\n"
+                    )
+                    client.sendall(head % len(self.body) + self.body)
+
+    def close(self):
+        self.sock.close()
+
+
+def test_stale_socket_retried_for_reads():
+    server = _DroppingServer(drops=1)
+    try:
+        with connect(
+            host="localhost", port=server.port, api="/v1/sql/", scheme="http"
+        ) as conn:
+            with conn.cursor() as cursor:
+                cursor.execute("select 1 as n")
+                assert [1] == cursor.fetchone()
+                assert 2 == server.requests
+    finally:
+        server.close()
+
+
+def test_stale_socket_not_retried_for_writes():
+    from radio_duck.db import connect_stale_socket_msg
+
+    server = _DroppingServer(drops=1)
+    try:
+        with connect(
+            host="localhost", port=server.port, api="/v1/sql/", scheme="http"
+        ) as conn:
+            with conn.cursor() as cursor:
+                with pytest.raises(OperationalError) as e:
+                    cursor.execute("insert into pond values ('teal', 1)")
+                assert connect_stale_socket_msg in e.value.msg
+                assert 1 == server.requests
+    finally:
+        server.close()
+
+
+def _arrow_stream(table):
+    import pyarrow as pa
+
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        # several small batches to exercise fetch across batch boundaries
+        for batch in table.to_batches(max_chunksize=2):
+            writer.write_batch(batch)
+    return sink.getvalue().to_pybytes()
+
+
+def test_arrow_result_format():
+    import flask
+    import pyarrow as pa
+    from http_server_mock import HttpServerMock
+
+    from radio_duck.results import arrow_stream_content_type
+
+    app = HttpServerMock(__name__)
+    table = pa.table(
+        {
+            "duck_type": ["mallard", "teal", "eider", "scaup", "smew"],
+            "total": [1, 2, 3, 4, 5],
+        }
+    )
+
+    @app.route("/v1/sql/", methods=["POST"])
+    def index():
+        assert arrow_stream_content_type in flask.request.headers["Accept"]
+        return flask.Response(
+            _arrow_stream(table), mimetype=arrow_stream_content_type
+        )
+
+    with app.run("localhost", http_server_port):
+        with connect(
+            host="localhost",
+            port=http_server_port,
+            api="/v1/sql/",
+            scheme="http",
+            result_format="arrow",
+        ) as conn:
+            with conn.cursor() as cursor:
+                cursor.execute("select duck_type, total from pond")
+                # the whole body was read, as for json
+                assert 5 == cursor.rowcount
+                assert ["duck_type", "total"] == [
+                    d[0] for d in cursor.description
+                ]
+                assert cursor.description[1][1] == db_types.get_type_code(
+                    "NUMBER"
+                )
+                assert ["mallard", 1] == cursor.fetchone()
+                assert [["teal", 2], ["eider", 3]] == cursor.fetchmany(2)
+                assert [["scaup", 4], ["smew", 5]] == cursor.fetchall()
+                assert 5 == cursor.rowcount
+                assert cursor.fetchone() is None
+
+                cursor.execute("select duck_type, total from pond")
+                cursor.fetchone()
+                remaining = cursor.fetch_arrow_table()
+                assert 4 == remaining.num_rows
+                assert ["teal", "eider", "scaup", "smew"] == remaining.column(
+                    "duck_type"
+                ).to_pylist()
+
+
+def test_arrow_fetch_on_json_result():
+    from http_server_mock import HttpServerMock
+
+    app = HttpServerMock(__name__)
+
+    @app.route("/v1/sql/", methods=["POST"])
+    def index():
+        # server which does not speak arrow answers with json
+        return """{"schema": ["STRING", "NUMBER"],
+        "columns": ["duck_type", "total"],
+        "rows": [["mallard", 1], ["teal", 2]]}"""
+
+    with app.run("localhost", http_server_port):
+        with connect(
+            host="localhost",
+            port=http_server_port,
+            api="/v1/sql/",
+            scheme="http",
+        ) as conn:
+            with conn.cursor(result_format="arrow") as cursor:
+                cursor.execute("select duck_type, total from pond")
+                table = cursor.fetch_arrow_table()
+                assert ["duck_type", "total"] == table.column_names
+                assert [1, 2] == table.column("total").to_pylist()
+                assert [] == cursor.fetchall()
+                assert [] == list(cursor.fetch_record_batches())
+
+
+def test_columnar_fetch():
+    import pyarrow as pa
+    from http_server_mock import HttpServerMock
+
+    app = HttpServerMock(__name__)
+
+    @app.route("/v1/sql/", methods=["POST"])
+    def index():
+        return """{"schema": ["STRING", "NUMBER", "BOOLEAN"],
+        "columns": ["duck_type", "total", "flies"],
+        "rows": [[null, 1], [null, 2.5]]}""".replace("1]", "1, true]").replace(
+            "2.5]", "2.5, false]"
+        )
+
+    with app.run("localhost", http_server_port):
+        with connect(
+            host="localhost",
+            port=http_server_port,
+            api="/v1/sql/",
+            scheme="http",
+        ) as conn:
+            with conn.cursor() as cursor:
+                cursor.execute("select * from pond")
+                table = cursor.fetch_arrow_table()
+                # typed by the schema even when all values are null
+                assert pa.string() == table.schema.field("duck_type").type
+                assert pa.float64() == table.schema.field("total").type
+                assert pa.bool_() == table.schema.field("flies").type
+
+                try:
+                    import numpy  # noqa: F401
+                except ImportError:
+                    cursor.execute("select * from pond")
+                    with pytest.raises(NotSupportedError):
+                        cursor.fetch_numpy()
+                    return
+                cursor.execute("select * from pond")
+                arrays = cursor.fetch_numpy()
+                assert [1.0, 2.5] == arrays["total"].tolist()
+                assert [True, False] == arrays["flies"].tolist()
+
+
+def test_fetch_df():
+    pandas = pytest.importorskip("pandas")
+    from http_server_mock import HttpServerMock
+
+    app = HttpServerMock(__name__)
+
+    @app.route("/v1/sql/", methods=["POST"])
+    def index():
+        return """{"schema": ["STRING", "NUMBER"],
+        "columns": ["duck_type", "total"],
+        "rows": [["mallard", 1], ["teal", 2]]}"""
+
+    with app.run("localhost", http_server_port):
+        with connect(
+            host="localhost",
+            port=http_server_port,
+            api="/v1/sql/",
+            scheme="http",
+        ) as conn:
+            with conn.cursor() as cursor:
+                cursor.execute("select * from pond")
+                df = cursor.fetch_df()
+                assert isinstance(df, pandas.DataFrame)
+                assert ["mallard", "teal"] == df["duck_type"].tolist()
+                assert [1, 2] == df["total"].tolist()
+
+
+def test_decode_types():
+    import datetime
+    import decimal
+
+    from http_server_mock import HttpServerMock
+
+    app = HttpServerMock(__name__)
+
+    @app.route("/v1/sql/", methods=["POST"])
+    def index():
+        return """{"schema": ["STRING", "DATE", "DECIMAL(5,2)"],
+        "columns": ["duck_type", "seen", "weight"],
+        "rows": [["mallard", "2023-10-01", 1.25], ["teal", null, 0.5]]}"""
+
+    with app.run("localhost", http_server_port):
+        with connect(
+            host="localhost",
+            port=http_server_port,
+            api="/v1/sql/",
+            scheme="http",
+            json_codec="json",
+            decode_types=True,
+        ) as conn:
+            with conn.cursor() as cursor:
+                cursor.execute("select * from pond")
+                assert [
+                    "mallard",
+                    datetime.date(2023, 10, 1),
+                    decimal.Decimal("1.25"),
+                ] == cursor.fetchone()
+                assert [["teal", None, decimal.Decimal("0.5")]] == (
+                    cursor.fetchall()
+                )
+
+
+def test_streamed_json_result():
+    from http_server_mock import HttpServerMock
+
+    app = HttpServerMock(__name__)
+    rows = ", ".join(f'["duck_{i}", {i}]' for i in range(100))
+
+    @app.route("/v1/sql/", methods=["POST"])
+    def index():
+        return (
+            '{"schema": ["STRING", "NUMBER"], "columns": ["duck_type",'
+            f' "total"], "rows": [{rows}]}}'
+        )
+
+    with app.run("localhost", http_server_port):
+        with connect(
+            host="localhost",
+            port=http_server_port,
+            api="/v1/sql/",
+            scheme="http",
+            stream="true",
+            pool_size=1,
+        ) as conn:
+            with conn.cursor() as cursor:
+                cursor.arraysize = 10
+                cursor.execute("select duck_type, total from pond")
+                assert "duck_type" == cursor.description[0][0]
+                assert -1 == cursor.rowcount, "unknown until fully read"
+                assert ["duck_0", 0] == cursor.fetchone()
+                assert 10 == len(cursor.fetchmany())
+                assert 89 == len(cursor.fetchall())
+                assert 100 == cursor.rowcount
+
+                # partially read result, the only pooled socket
+                # must be given back for the next execute
+                cursor.execute("select duck_type, total from pond")
+                cursor.fetchone()
+                cursor.execute("select duck_type, total from pond")
+                assert 100 == len(cursor.fetchall())
+
+
+def test_streamed_ndjson_result():
+    import flask
+    from http_server_mock import HttpServerMock
+
+    from radio_duck.results import ndjson_content_type
+
+    app = HttpServerMock(__name__)
+
+    @app.route("/v1/sql/", methods=["POST"])
+    def index():
+        assert ndjson_content_type in flask.request.headers["Accept"]
+
+        def generate():
+            yield '{"schema": ["STRING"], "columns": ["duck_type"]}\n'
+            for name in ["mallard", "teal", "eider"]:
+                yield json.dumps([name]) + "\n"
+
+        return flask.Response(generate(), mimetype=ndjson_content_type)
+
+    with app.run("localhost", http_server_port):
+        with connect(
+            host="localhost",
+            port=http_server_port,
+            api="/v1/sql/",
+            scheme="http",
+        ) as conn:
+            with conn.cursor(stream=True) as cursor:
+                cursor.execute("select duck_type from pond")
+                assert [["mallard"], ["teal"]] == cursor.fetchmany(2)
+                assert [["eider"]] == cursor.fetchall()
+                assert 3 == cursor.rowcount
+
+
+def test_streamed_bad_json():
+    from http_server_mock import HttpServerMock
+
+    app = HttpServerMock(__name__)
+
+    @app.route("/v1/sql/", methods=["POST"])
+    def index():
+        return '{"schema": ["NUMBER"], "columns": ["n"], "rows": [[1], [2 oops'
+
+    with app.run("localhost", http_server_port):
+        with connect(
+            host="localhost",
+            port=http_server_port,
+            api="/v1/sql/",
+            scheme="http",
+            stream=True,
+        ) as conn:
+            with conn.cursor() as cursor:
+                cursor.execute("select n from numbers")
+                assert [1] == cursor.fetchone()
+                with pytest.raises(OperationalError) as e:
+                    cursor.fetchall()
+                assert "could not deserialize" in e.value.msg
+
+
+def test_executemany_batches_inserts():
+    import flask
+    from http_server_mock import HttpServerMock
+
+    app = HttpServerMock(__name__)
+    requests = []
+
+    @app.route("/v1/sql/", methods=["POST"])
+    def index():
+        requests.append(flask.request.json)
+        return '{"schema": ["NUMBER"], "columns": ["Count"], "rows": [[1]]}'
+
+    with app.run("localhost", http_server_port):
+        with connect(
+            host="localhost",
+            port=http_server_port,
+            api="/v1/sql/",
+            scheme="http",
+            executemany_batch_size="2",
+        ) as conn:
+            with conn.cursor() as cursor:
+                ducks = [("mallard", 1), ("teal", 2), ("eider", 3)]
+                cursor.executemany(
+                    "insert into pond (duck_type, total) values (?, ?)", ducks
+                )
+                assert 3 == cursor.rowcount
+                assert 2 == len(requests)
+                assert (
+                    "insert into pond (duck_type, total) values (?, ?), (?, ?)"
+                    == requests[0]["sql"]  # noqa: W503
+                )
+                assert ["mallard", 1, "teal", 2] == requests[0]["parameters"]
+                assert ["eider", 3] == requests[1]["parameters"]
+
+                requests.clear()
+                cursor.executemany(
+                    "update pond set total = ? where duck_type = ?",
+                    [(1, "teal"), (2, "eider")],
+                )
+                assert 2 == len(requests)
+                assert [2, "eider"] == requests[1]["parameters"]
+                assert 2 == cursor.rowcount
+
+
+def test_result_cache():
+    import flask
+    from http_server_mock import HttpServerMock
+
+    app = HttpServerMock(__name__)
+    queries = []
+
+    @app.route("/v1/sql/", methods=["POST"])
+    def index():
+        queries.append(flask.request.json["sql"])
+        return '{"schema": ["NUMBER"], "columns": ["total"], "rows": [[5]]}'
+
+    with app.run("localhost", http_server_port):
+        with connect(
+            host="localhost",
+            port=http_server_port,
+            api="/v1/sql/",
+            scheme="http",
+            result_cache_size=8,
+        ) as conn:
+            executed = []
+            conn.add_listener(executed.append)
+            with conn.cursor() as cursor:
+                cursor.execute("select total from pond where total > ?", [1])
+                assert [[5]] == cursor.fetchall()
+                cursor.execute(
+                    "select total\n  from pond where total > ?", [1]
+                )
+                assert [[5]] == cursor.fetchall()
+                assert 1 == len(queries), "second query must be a cache hit"
+                # a hit does not even encode a request
+                assert executed[1].cached
+                assert "encode" not in executed[1].phases
+                assert 0 == executed[1].request_bytes
+
+                cursor.execute(
+                    "select total from pond where total > ?", [1], cache=False
+                )
+                assert 2 == len(queries)
+
+                cursor.execute("insert into pond values ('teal', 1)")
+                cursor.execute("select total from pond where total > ?", [1])
+                assert 4 == len(queries), "insert must invalidate the cache"
+
+                # reflection changes session settings only
+                cursor.execute("SET schema 'main'; PRAGMA table_info('pond')")
+                cursor.execute("select total from pond where total > ?", [1])
+                assert 5 == len(queries), "reflection must keep the cache"
+            stats = conn.result_cache.stats()
+            assert 2 == stats["hits"]
+            assert 1 == stats["size"]
+
+
+def test_compressed_response():
+    import gzip
+
+    import flask
+    from http_server_mock import HttpServerMock
+
+    app = HttpServerMock(__name__)
+    rows = ", ".join(f'["duck_{i}", {i}]' for i in range(100))
+    body = gzip.compress(
+        (
+            '{"schema": ["STRING", "NUMBER"], "columns": ["duck_type",'
+            f' "total"], "rows": [{rows}]}}'
+        ).encode("utf-8")
+    )
+
+    @app.route("/v1/sql/", methods=["POST"])
+    def index():
+        assert "gzip" in flask.request.headers["Accept-Encoding"]
+        return flask.Response(body, headers={"Content-Encoding": "gzip"})
+
+    with app.run("localhost", http_server_port):
+        with connect(
+            host="localhost",
+            port=http_server_port,
+            api="/v1/sql/",
+            scheme="http",
+        ) as conn:
+            with conn.cursor() as cursor:
+                cursor.execute("select duck_type, total from pond")
+                assert 100 == len(cursor.fetchall())
+            with conn.cursor(stream=True) as cursor:
+                cursor.execute("select duck_type, total from pond")
+                assert ["duck_0", 0] == cursor.fetchone()
+                assert 99 == len(cursor.fetchall())
+
+
+def test_compressed_request():
+    import zlib
+
+    import flask
+    from http_server_mock import HttpServerMock
+
+    app = HttpServerMock(__name__)
+    encodings = []
+
+    @app.route("/v1/sql/", methods=["POST"])
+    def index():
+        encoding = flask.request.headers.get("Content-Encoding")
+        encodings.append(encoding)
+        data = flask.request.get_data()
+        if encoding == "gzip":
+            data = zlib.decompress(data, wbits=31)
+        sql = json.loads(data)["sql"]
+        assert sql.startswith("select")
+        return '{"schema": ["NUMBER"], "columns": ["n"], "rows": [[1]]}'
+
+    with app.run("localhost", http_server_port):
+        with connect(
+            host="localhost",
+            port=http_server_port,
+            api="/v1/sql/",
+            scheme="http",
+            compress_request="gzip",
+            compress_request_min_bytes=1024,
+        ) as conn:
+            with conn.cursor() as cursor:
+                cursor.execute("select 1 as n")
+                assert [[1]] == cursor.fetchall()
+                cursor.execute("select 1 as n --" + "x" * 2048)
+                assert [[1]] == cursor.fetchall()
+    assert [None, "gzip"] == encodings
+
+
+def test_query_timeout_cancels_query():
+    import time
+
+    import flask
+    from http_server_mock import HttpServerMock
+
+    from radio_duck.db import query_timeout_msg
+
+    app = HttpServerMock(__name__)
+    sent, cancelled = [], []
+
+    @app.route("/v1/sql/", methods=["POST"])
+    def index():
+        sent.append(
+            (
+                flask.request.headers["X-Query-Id"],
+                flask.request.json["timeout"],
+            )
+        )
+        if "slow" in flask.request.json["sql"]:
+            time.sleep(1)
+        return '{"schema": ["NUMBER"], "columns": ["n"], "rows": [[1]]}'
+
+    @app.route("/v1/cancel/", methods=["POST"])
+    def cancel():
+        cancelled.append(flask.request.json["query_id"])
+        return "{}"
+
+    with app.run("localhost", http_server_port):
+        with connect(
+            host="localhost",
+            port=http_server_port,
+            api="/v1/sql/",
+            scheme="http",
+            query_timeout_sec=30,
+        ) as conn:
+            with conn.cursor() as cursor:
+                with pytest.raises(OperationalError) as e:
+                    cursor.execute("select slow()", timeout_sec=0.2)
+                assert query_timeout_msg in e.value.msg
+                assert [cursor.query_id] == cancelled
+                assert (cursor.query_id, 0.2) == sent[0]
+
+                query_id = cursor.reserve_query_id()
+                cursor.execute("select 1 as n")
+                assert [[1]] == cursor.fetchall()
+                assert (query_id, 30) == sent[1]
+                assert cursor.cancel()
+                assert [sent[0][0], query_id] == cancelled
+                # the reserved id is only the next query's
+                cursor.execute("select 2 as n")
+                assert sent[2][0] not in (sent[0][0], query_id)
+                assert sent[2][0] == cursor.query_id
+
+
+def test_cancel_not_supported():
+    from http_server_mock import HttpServerMock
+
+    from radio_duck import NotSupportedError
+
+    app = HttpServerMock(__name__)
+
+    @app.route("/v1/sql/", methods=["POST"])
+    def index():
+        return '{"schema": ["NUMBER"], "columns": ["n"], "rows": [[1]]}'
+
+    @app.route("/v1/cancel/", methods=["POST"])
+    def cancel():
+        return "not implemented", 501
+
+    with app.run("localhost", http_server_port):
+        with connect(
+            host="localhost",
+            port=http_server_port,
+            api="/v1/sql/",
+            scheme="http",
+        ) as conn:
+            with conn.cursor() as cursor:
+                assert not cursor.cancel(), "nothing executed yet"
+                cursor.execute("select 1 as n")
+                with pytest.raises(NotSupportedError):
+                    cursor.cancel()
+            assert not conn.cancel(), "no query running"
+
+
+def test_submit_and_poll():
+    import flask
+    from http_server_mock import HttpServerMock
+
+    app = HttpServerMock(__name__)
+    submitted, polls = {}, []
+
+    @app.route("/v1/submit/", methods=["POST"])
+    def submit():
+        query_id = flask.request.headers["X-Query-Id"]
+        submitted[query_id] = flask.request.json["sql"]
+        return {"query_id": query_id, "state": "running"}, 202
+
+    @app.route("/v1/status/", methods=["POST"])
+    def query_status():
+        query_id = flask.request.json["query_id"]
+        polls.append(flask.request.json["wait"])
+        if "bad" in submitted[query_id]:
+            return {
+                "query_id": query_id,
+                "state": "failed",
+                "status": 400,
+                "error": "table bad not found",
+            }
+        if len(polls) < 3:
+            return {"query_id": query_id, "state": "running", "progress": 50}
+        return {"query_id": query_id, "state": "finished"}
+
+    @app.route("/v1/result/", methods=["POST"])
+    def result():
+        assert flask.request.json["query_id"] in submitted
+        return '{"schema": ["NUMBER"], "columns": ["n"], "rows": [[1], [2]]}'
+
+    with app.run("localhost", http_server_port):
+        with connect(
+            host="localhost",
+            port=http_server_port,
+            api="/v1/sql/",
+            scheme="http",
+            submit=True,
+            poll_wait_sec=2,
+        ) as conn:
+            with conn.cursor() as cursor:
+                cursor.execute("select n from numbers")
+                assert cursor.query_id in submitted
+                status = cursor.poll()
+                assert "running" == status["state"]
+                assert 50 == status["progress"]
+                assert [[1], [2]] == cursor.fetchall()
+                assert [0, 2, 2] == polls
+                assert "finished" == cursor.poll()["state"]
+
+                cursor.execute("select n from bad")
+                with pytest.raises(ProgrammingError) as e:
+                    cursor.fetchall()
+                assert "table bad not found" in e.value.msg
+
+
+def test_submitted_query_outlives_the_socket_timeout():
+    import time
+
+    import flask
+    from http_server_mock import HttpServerMock
+
+    from radio_duck.db import default_submit_timeout_sec
+
+    app = HttpServerMock(__name__)
+    timeouts, submitted_at = [], []
+
+    @app.route("/v1/submit/", methods=["POST"])
+    def submit():
+        timeouts.append(flask.request.json["timeout"])
+        submitted_at.append(time.monotonic())
+        query_id = flask.request.headers["X-Query-Id"]
+        return {"query_id": query_id, "state": "running"}, 202
+
+    @app.route("/v1/status/", methods=["POST"])
+    def query_status():
+        query_id = flask.request.json["query_id"]
+        if time.monotonic() - submitted_at[-1] < 1.5:
+            time.sleep(flask.request.json["wait"])
+            return {"query_id": query_id, "state": "running"}
+        return {"query_id": query_id, "state": "finished"}
+
+    @app.route("/v1/result/", methods=["POST"])
+    def result():
+        return '{"schema": ["NUMBER"], "columns": ["n"], "rows": [[1]]}'
+
+    with app.run("localhost", http_server_port):
+        with connect(
+            host="localhost",
+            port=http_server_port,
+            api="/v1/sql/",
+            scheme="http",
+            timeout_sec=1,
+            submit=True,
+            poll_wait_sec=0.5,
+        ) as conn:
+            assert default_submit_timeout_sec == conn.submit_timeout_sec
+            with conn.cursor() as cursor:
+                cursor.execute("select n from numbers")
+                assert [[1]] == cursor.fetchall()
+                assert [default_submit_timeout_sec] == timeouts
+                cursor.execute("select n from numbers", timeout_sec=30)
+                assert 30 == timeouts[-1]
+        with connect(
+            host="localhost",
+            port=http_server_port,
+            query_timeout_sec=60,
+            submit=True,
+        ) as conn:
+            assert 60 == conn.submit_timeout_sec
+
+
+def test_submit_not_supported():
+    from http_server_mock import HttpServerMock
+
+    app = HttpServerMock(__name__)
+
+    @app.route("/v1/sql/", methods=["POST"])
+    def index():
+        return '{"schema": ["NUMBER"], "columns": ["n"], "rows": [[1]]}'
+
+    with app.run("localhost", http_server_port):
+        with connect(
+            host="localhost",
+            port=http_server_port,
+            api="/v1/sql/",
+            scheme="http",
+        ) as conn:
+            with conn.cursor(submit=True) as cursor:
+                cursor.execute("select 1 as n")
+                assert [[1]] == cursor.fetchall()
+                assert conn.submit_supported is False
+
+
+def test_reads_fail_over_to_replica():
+    from http_server_mock import HttpServerMock
+
+    down, up = HttpServerMock("down"), HttpServerMock("up")
+    requests = {"down": 0, "up": 0}
+
+    @down.route("/v1/sql/", methods=["POST"])
+    def unavailable():
+        requests["down"] += 1
+        return "overloaded", 503
+
+    @up.route("/v1/sql/", methods=["POST"])
+    def index():
+        requests["up"] += 1
+        return '{"schema": ["NUMBER"], "columns": ["n"], "rows": [[1]]}'
+
+    replica_port = http_server_port + 14
+    with (
+        down.run("localhost", http_server_port),
+        up.run("localhost", replica_port),
+    ):
+        with connect(
+            host="localhost",
+            port=http_server_port,
+            hosts=f"localhost:{replica_port}",
+            api="/v1/sql/",
+            scheme="http",
+            eject_after=2,
+        ) as conn:
+            assert 2 == len(conn.balancer.endpoints)
+            with conn.cursor() as cursor:
+                for _ in range(6):
+                    cursor.execute("select 1 as n")
+                    assert [[1]] == cursor.fetchall()
+    assert 6 == requests["up"]
+    assert 2 == requests["down"], "ejected after 2 failures"
+
+
+def test_slow_read_is_hedged():
+    import time
+
+    from flask import request
+    from http_server_mock import HttpServerMock
+
+    slow, fast = HttpServerMock("slow"), HttpServerMock("fast")
+    cancelled = []
+
+    @slow.route("/v1/sql/", methods=["POST"])
+    def paused():
+        time.sleep(0.5)
+        return '{"schema": ["NUMBER"], "columns": ["n"], "rows": [[1]]}'
+
+    @slow.route("/v1/cancel/", methods=["POST"])
+    def cancel():
+        cancelled.append(json.loads(request.data)["query_id"])
+        return "{}"
+
+    @fast.route("/v1/sql/", methods=["POST"])
+    def index():
+        return '{"schema": ["NUMBER"], "columns": ["n"], "rows": [[2]]}'
+
+    replica_port = http_server_port + 14
+    with (
+        slow.run("localhost", http_server_port),
+        fast.run("localhost", replica_port),
+    ):
+        with connect(
+            host="localhost",
+            port=http_server_port,
+            hosts=f"localhost:{replica_port}",
+            api="/v1/sql/",
+            scheme="http",
+            hedge=True,
+            hedge_budget=1,
+        ) as conn:
+            for _ in range(20):
+                conn.hedger.record(0.01)
+            with conn.cursor() as cursor:
+                for _ in range(2):
+                    started = time.monotonic()
+                    cursor.execute("select n from pond")
+                    assert [[2]] == cursor.fetchall()
+                    assert time.monotonic() - started < 0.4
+            assert 1 <= conn.hedger.hedged == conn.hedger.won
+            deadline = time.monotonic() + 2
+            while not cancelled and time.monotonic() < deadline:
+                time.sleep(0.05)
+            assert cancelled, "the slow request is cancelled"
@@ -1,9 +1,28 @@
 import http.client
-import json
+import io
 import logging
+import socket
+import threading
+import time
+import uuid
+from concurrent import futures
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from functools import wraps
-from typing import Any, List, Optional, Union
+from typing import Any, FrozenSet, Iterator, List, Optional, Tuple, Union
 
+from radio_duck.balancer import Balancer, Endpoint, parse_endpoints
+from radio_duck.cache import ResultCache, cache_key
+from radio_duck.codec import JsonCodec, get_codec
+from radio_duck.compression import (
+    DecompressingReader,
+    accept_encoding,
+    check_encoding,
+    compress,
+    decompress,
+    is_encoded,
+)
+from radio_duck.converters import parse_columns_option
 from radio_duck.db_types import get_type_code
 from radio_duck.exceptions import (
     InterfaceError,
@@ -11,8 +30,50 @@ from radio_duck.exceptions import (
     OperationalError,
     ProgrammingError,
 )
+from radio_duck.hedging import Hedger
+from radio_duck.metrics import QueryMetrics, notify
+from radio_duck.pool import HttpConnectionPool, PooledResponse
+from radio_duck.prepared import (
+    PreparedStatements,
+    prepare_after,
+    statement_handle,
+    unknown_handle_status,
+)
+from radio_duck.results import (
+    ArrowResult,
+    JsonResult,
+    NdjsonResult,
+    Result,
+    StreamingJsonResult,
+    arrow_stream_content_type,
+    json_content_type,
+    ndjson_content_type,
+)
+from radio_duck.slowlog import JsonlFile, SlowQueryLog
+from radio_duck.statements import (  # noqa: E501
+    changes_data,
+    is_read_only,
+    split_insert_values,
+)
+from radio_duck.tracing import Tracer, new_tracer
 
 connect_close_resource_msg = "connect_resource_closure"
+connect_stale_socket_msg = "connect_stale_socket"
+query_timeout_msg = "query_timeout"
+# replica down or overloaded, reads are sent to another one
+unavailable_statuses = (502, 503, 504)
+# header carrying the client generated id of a query
+query_id_header = "X-Query-Id"
+# seconds a submitted query may run unless limited otherwise
+default_submit_timeout_sec = 6 * 3600
+
+# errors raised when the server or a proxy has dropped a socket.
+# RemoteDisconnected is a ConnectionResetError.
+disconnect_errors = (
+    BrokenPipeError,
+    ConnectionResetError,
+    ConnectionAbortedError,
+)
 
 
 def check_closed(f):
@@ -31,6 +92,25 @@ def check_closed(f):
     return g
 
 
+def traced(f):
+    """
+    Decorator putting a cursor's fetch method in a tracing span,
+    if its connection traces.
+    """
+
+    @wraps(f)
+    def g(self, *args, **kwargs):
+        tracer = self._connection.tracer
+        if tracer is None:
+            return f(self, *args, **kwargs)
+        with tracer.span(f"radio_duck.{f.__name__}") as span:
+            value = f(self, *args, **kwargs)
+            tracer.fetched(span, value)
+            return value
+
+    return g
+
+
 class Connection(object):
     """
     A DB-API 2.0 (PEP 249) connection.
@@ -48,33 +128,182 @@ class Connection(object):
         self.host = kwargs.get("host", "specify_host")
         self.port = kwargs.get("port", 8000)
         self.scheme = kwargs.get("scheme", "http")
-        self.timeout_sec = kwargs.get("timeout_sec", 10)  # todo
+        # connect and socket timeout
+        self.timeout_sec = kwargs.get("timeout_sec", 10)
+        # default time limit of a query, execute(timeout_sec=) overrides it.
+        # the server is asked to stop the query when it is exceeded.
+        self.query_timeout_sec = float(
+            kwargs.get("query_timeout_sec", self.timeout_sec)
+        )
+        # endpoint stopping a running query by its query id
+        self.cancel_api = kwargs.get("cancel_api", "/v1/cancel/")
+        # submit queries and poll for their results instead of holding
+        # a request open for the whole query, see Cursor.poll()
+        self.submit = _as_bool(kwargs.get("submit", False))
+        self.submit_api = kwargs.get("submit_api", "/v1/submit/")
+        self.status_api = kwargs.get("status_api", "/v1/status/")
+        self.result_api = kwargs.get("result_api", "/v1/result/")
+        # longest the server may hold a status request, waiting
+        # for the query to finish
+        self.poll_wait_sec = float(kwargs.get("poll_wait_sec", 5))
+        # default time limit of a submitted query. submitting is for
+        # queries running longer than sockets are kept waiting, so it
+        # is query_timeout_sec only if that was given
+        self.submit_timeout_sec = float(
+            kwargs.get(
+                "submit_timeout_sec",
+                kwargs.get("query_timeout_sec", default_submit_timeout_sec),
+            )
+        )
+        # unknown until the first submit
+        self.submit_supported: Optional[bool] = None
+        # send the handle of sql executed repeatedly instead of the sql,
+        # see Cursor.prepare()
+        self.prepare = _as_bool(kwargs.get("prepare", False))
+        self.prepare_api = kwargs.get("prepare_api", "/v1/prepare/")
+        prepared_size = int(kwargs.get("prepared_statements_size", 256))
+        self.prepared: Optional[PreparedStatements] = (
+            PreparedStatements(prepared_size) if prepared_size > 0 else None
+        )
+        # unknown until the first statement is prepared
+        self.prepare_supported: Optional[bool] = None
+        # ids of queries sent and not yet answered, to their endpoint
+        self._running = {}
+        self._running_lock = threading.Lock()
         self.closed = False
         self.api = kwargs.get("api", "/v1/sql/")
+        # 'json' or 'arrow'. arrow is negotiated; servers that cannot
+        # produce it answer with json.
+        self.result_format = _check_result_format(
+            kwargs.get("result_format", "json")
+        )
+        # rows per request when executemany can batch an insert
+        self.executemany_batch_size = int(
+            kwargs.get("executemany_batch_size", 1000)
+        )
+        # endpoint accepting arrow/parquet uploads, see ingest()
+        self.ingest_api = kwargs.get("ingest_api", "/v1/ingest/")
+        # unknown until the first ingest()
+        self.ingest_supported: Optional[bool] = None
+        # decode rows incrementally as they are fetched
+        self.stream = _as_bool(kwargs.get("stream", False))
+        # 'auto' picks the fastest installed json library
+        self.codec = get_codec(kwargs.get("json_codec", "auto"))
+        # True or names of columns whose json values are converted to
+        # datetime, Decimal, bytes, timedelta, ... when first read
+        self.decode_types = parse_columns_option(
+            kwargs.get("decode_types", False)
+        )
+        # ask for compressed responses, decompressed as they are read
+        self.compression = _as_bool(kwargs.get("compression", True))
+        # 'zstd', 'gzip' or 'deflate' to compress request bodies of
+        # at least compress_request_min_bytes
+        self.compress_request = check_encoding(kwargs.get("compress_request"))
+        self.compress_request_min_bytes = int(
+            kwargs.get("compress_request_min_bytes", 16 * 1024)
+        )
+        # responses of read only queries, off unless sized or given
+        self.result_cache: Optional[ResultCache] = _result_cache(kwargs)
+        # resend slow reads to another replica or socket, off unless set
+        self.hedger: Optional[Hedger] = _hedger(kwargs)
+        # opentelemetry spans, off unless tracing is set
+        self.tracer: Optional[Tracer] = _tracer(kwargs)
+        # called with the QueryMetrics of every execute, see add_listener()
+        self.listeners = list(kwargs.get("listeners") or [])
+        # records slow and sampled queries, off unless slow_query_sec
+        # or slow_query_sample_rate is set
+        self.slow_log: Optional[SlowQueryLog] = _slow_query_log(kwargs)
+        if self.slow_log is not None:
+            self.listeners.append(self.slow_log)
+        # threads of hedged requests, started on the first one
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._executor_lock = threading.Lock()
         if self.scheme == "http":
-            self._http_connection = http.client.HTTPConnection(
-                self.host, self.port, timeout=self.timeout_sec
+            # replicas: host:port and any in hosts
+            hosts = kwargs.get("hosts")
+            addresses = parse_endpoints(
+                kwargs.get("host", None if hosts else self.host),
+                self.port,
+                hosts,
             )
-            try:
-                logging.info(
-                    "connecting to radio_duck... {}://{}:{}{}".format(
-                        self.scheme, self.host, self.port, self.api
+            self.host, self.port = addresses[0]
+            # kwargs from a sqlalchemy url query string arrive as str
+            self.balancer = Balancer(
+                [
+                    Endpoint(
+                        host,
+                        port,
+                        HttpConnectionPool(
+                            host,
+                            port,
+                            timeout_sec=self.timeout_sec,
+                            max_size=int(kwargs.get("pool_size", 8)),
+                            idle_timeout_sec=float(
+                                kwargs.get("pool_idle_timeout_sec", 60)
+                            ),
+                        ),
                     )
-                )
-                self._http_connection.connect()
-                logging.info("connected to radio_duck")
-            except Exception as e:
-                raise OperationalError(
-                    f"unable to connect to database: {e}"
-                ) from e  # noqa: E501
+                    for host, port in addresses
+                ],
+                policy=kwargs.get("balance", "round_robin"),
+                eject_after=int(kwargs.get("eject_after", 3)),
+                eject_sec=float(kwargs.get("eject_sec", 30)),
+            )
+            if self.tracer is None:
+                self._open()
+            else:
+                with self.tracer.span(
+                    "radio_duck.connect",
+                    **{"server.address": self.host, "server.port": self.port},
+                ):
+                    self._open()
         else:
             raise InterfaceError(
                 msg="driver only supports http scheme for now"
             )  # noqa: E501
 
+    def _open(self):
+        """
+        Open one connection to every endpoint upfront, so bad
+        host/port fail fast. Unreachable replicas are ejected,
+        the connection fails only if none can be reached.
+        """
+        error = None
+        for endpoint in self.balancer.endpoints:
+            logging.info(
+                "connecting to radio_duck... {}://{}{}".format(
+                    self.scheme, endpoint.address, self.api
+                )
+            )
+            try:
+                endpoint.pool.release(endpoint.pool.acquire())
+            except OperationalError as e:
+                if len(self.balancer.endpoints) == 1:
+                    raise
+                logging.warning(
+                    "radio_duck endpoint {} unreachable: {}".format(
+                        endpoint.address, e
+                    )
+                )
+                self.balancer.eject(endpoint)
+                error = e
+                continue
+            logging.info("connected to radio_duck")
+            error = None
+        if error is not None and all(
+            endpoint.is_ejected(time.monotonic())
+            for endpoint in self.balancer.endpoints
+        ):
+            raise error
+
     def close(self):
         logging.debug("closing connection to radio_duck")
-        self._http_connection.close()
+        for endpoint in self.balancer.endpoints:
+            endpoint.pool.close()
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+        if self.slow_log is not None:
+            self.slow_log.close()
         self.closed = True
         logging.info("closed connection to radio_duck")
 
@@ -97,9 +326,121 @@ class Connection(object):
     def cursor(self, *args, **kwargs):
         return Cursor(self, **kwargs)
 
+    @check_closed
+    def ingest(self, table: str, data, file_format: str = "arrow") -> int:
+        """
+        Bulk load data into a table.
+
+        The data is streamed to radio_duck's ingest_api as an arrow ipc
+        stream (or a parquet file) and inserted server side. If the server
+        has no such endpoint, rows are inserted with batched executemany.
+        :param table: name of an existing table
+        :param data: pyarrow Table, RecordBatch, RecordBatchReader,
+        iterable of RecordBatch or pandas DataFrame
+        :param file_format: 'arrow' or 'parquet'
+        :return: number of rows ingested
+        :raise ProgrammingError on bad data or if the server rejects it
+        :raise OperationalError if unable to ingest
+        """
+        # imported here, ingest builds on this module
+        from radio_duck.ingest import ingest
+
+        with self.cursor() as cursor:
+            return ingest(cursor, table, data, file_format)
+
+    @check_closed
+    def cancel(self, query_id: Optional[str] = None) -> bool:
+        """
+        Ask the server to stop a running query. Safe to call from
+        another thread while a cursor waits for the query.
+
+        The request is sent on a connection of its own, it must get
+        through even when the pool is busy with runaway queries.
+        A query this connection is not waiting for, ex: one started
+        by another process, is cancelled on every endpoint.
+        :param query_id: see Cursor.query_id. None for every query
+        this connection is waiting for
+        :return: True if the server stopped a query
+        :raise NotSupportedError if the server has no cancel_api
+        :raise OperationalError if unable to reach the server
+        """
+        if query_id is None:
+            with self._running_lock:
+                running = list(self._running)
+            return any([self.cancel(query_id) for query_id in running])
+        with self._running_lock:
+            endpoint = self._running.get(query_id)
+        if endpoint is not None:
+            return self._cancel(endpoint, query_id)
+        endpoints = self.balancer.endpoints
+        if len(endpoints) == 1:
+            return self._cancel(endpoints[0], query_id)
+        cancelled, error = False, None
+        for endpoint in endpoints:
+            try:
+                cancelled = self._cancel(endpoint, query_id) or cancelled
+            except OperationalError as e:
+                error = e
+        if not cancelled and error is not None:
+            raise error
+        return cancelled
+
+    def _cancel(self, endpoint: Endpoint, query_id: str) -> bool:
+        http_connection = http.client.HTTPConnection(
+            endpoint.host, endpoint.port, timeout=self.timeout_sec
+        )
+        try:
+            http_connection.request(
+                "POST",
+                self.cancel_api,
+                body=self.codec.dumps({"query_id": query_id}),
+                headers={"Content-Type": json_content_type},
+            )
+            http_response = http_connection.getresponse()
+            response_payload = http_response.read()
+        except Exception as e:
+            raise OperationalError(
+                msg=f"failed to cancel query {query_id}: {e!r}"
+            ) from e
+        finally:
+            http_connection.close()
+        return cancel_status(query_id, http_response.status, response_payload)
+
+    def add_listener(self, listener):
+        """
+        :param listener: callable taking the radio_duck.metrics.QueryMetrics
+        of every execute() of this connection's cursors, ex: a
+        MetricsRegistry. Called in the thread of the cursor.
+        """
+        self.listeners.append(listener)
+
+    def remove_listener(self, listener):
+        self.listeners.remove(listener)
+
+    def _run(self, fn, *args, **kwargs) -> futures.Future:
+        """
+        Call fn in a thread of the connection, ex: a hedged request.
+        """
+        with self._executor_lock:
+            if self._executor is None:
+                # a request and its hedge per pooled connection
+                pooled = sum(
+                    endpoint.pool.max_size
+                    for endpoint in self.balancer.endpoints
+                )
+                self._executor = ThreadPoolExecutor(
+                    max_workers=2 * pooled, thread_name_prefix="radio_duck"
+                )
+        return self._executor.submit(fn, *args, **kwargs)
+
     @property
-    def http_connection(self):
-        return self._http_connection
+    def pool(self) -> HttpConnectionPool:
+        """
+        The pool of http connections shared by all cursors
+        of this connection, to its first endpoint.
+        See balancer.endpoints for all of them.
+        """
+        return self.balancer.endpoints[0].pool
 
 
 class Cursor(object):
@@ -115,13 +456,29 @@ class Cursor(object):
     def __exit__(self, exc_type, exc_value, exc_traceback):
         self.close()
 
-    def __init__(self, connection: Connection):
+    def __init__(self, connection: Connection, **kwargs):
         self.closed = False
-        self._result = None
+        self._result: Optional[Result] = None
         self._connection = connection
-        self._rowcount = -1
         self._arraysize = 1
-        self._index = -1
+        # set by executemany, which has no single result
+        self._rowcount = -1
+        self.result_format = _check_result_format(
+            kwargs.get("result_format", connection.result_format)
+        )
+        self.decode_types = parse_columns_option(
+            kwargs.get("decode_types", connection.decode_types)
+        )
+        self.stream = _as_bool(kwargs.get("stream", connection.stream))
+        self.submit = _as_bool(kwargs.get("submit", connection.submit))
+        self._query_id: Optional[str] = None
+        # id of the next execute(), see reserve_query_id()
+        self._next_query_id: Optional[str] = None
+        # (query id, deadline, endpoint) of a submitted query whose result
+        # has not been opened yet
+        self._submitted: Optional[Tuple[str, float, Endpoint]] = None
+        # of the running execute(), only if the connection has listeners
+        self._metrics: Optional[QueryMetrics] = None
         logging.debug("opened cursor to radio_duck")
 
     @property
@@ -133,25 +490,67 @@ class Cursor(object):
         """
         return self._connection
 
+    @property
+    def query_id(self) -> Optional[str]:
+        """
+        Id of the running or last executed query, sent to the server
+        in the X-Query-Id header. Pass it to Connection.cancel().
+        """
+        return self._query_id
+
+    def reserve_query_id(self) -> str:
+        """
+        Pick the id of the next execute() ahead of time, so a query
+        can be cancelled by something that only learns about it before
+        it starts, ex: superset's stop query. Later execute() calls get
+        ids of their own, so that server side state of one statement,
+        ex: of a submitted query, never matches another.
+        """
+        if self._next_query_id is None:
+            self._next_query_id = new_query_id()
+        return self._next_query_id
+
+    def cancel(self) -> bool:
+        """
+        Ask the server to stop this cursor's running query,
+        ex: from another thread. See Connection.cancel()
+        :return: True if the server stopped a query
+        """
+        submitted = self._submitted
+        if submitted is not None:
+            return self._connection._cancel(submitted[2], submitted[0])
+        query_id = self._query_id or self._next_query_id
+        if query_id is None:
+            return False
+        return self._connection.cancel(query_id)
+
     @property
     def rowcount(self):
+        if self._rowcount >= 0:
+            return self._rowcount
         if self._result is None:
             return -1
-        return len(self._result["rows"])
+        return self._result.rowcount
 
     def callproc(self, procname, *args):
         raise NotSupportedError(msg="callproc not supported on cursor")
 
     def close(self):
         # free up the resources
-        self._result = None
+        self._close_result()
         self._rowcount = -1
-        self._index = -1
         self.closed = True
         logging.debug("closed cursor to radio_duck")
 
     @check_closed
-    def execute(self, query: Union[bytes, str], parameters=None):
+    def execute(
+        self,
+        query: Union[bytes, str],
+        parameters=None,
+        cache: bool = True,
+        timeout_sec: Optional[float] = None,
+        submit: Optional[bool] = None,
+    ):
         """
         Execute a query.
 
@@ -163,108 +562,818 @@ class Cursor(object):
         parameters
             Parameters to bind.  Can be a Python sequence (to provide
             a single set of parameters).
-        :raise OperationalError if unable to execute query
+        cache
+            False to bypass the connection's result cache, if any.
+        timeout_sec
+            Time limit of this query, defaults to the connection's
+            query_timeout_sec. A query running longer is cancelled.
+        submit
+            True to only submit the query, defaults to the cursor's
+            submit. fetch*() then waits for it, see poll().
+        :raise OperationalError if unable to execute query or on timeout
         :raise ProgrammingError if query is empty or invalid or improper(ex: table not found)  # noqa: E501,B950
         """
+        connection = self._connection
+        listeners = connection.listeners
+        if not listeners and connection.tracer is None:
+            return self._execute(query, parameters, cache, timeout_sec, submit)
+        metrics = self._metrics = QueryMetrics(query, parameters)
+        started = time.monotonic()
+        with _traced_execute(connection, metrics):
+            try:
+                self._execute(query, parameters, cache, timeout_sec, submit)
+            except Exception as e:
+                metrics.error = type(e).__name__
+                raise
+            finally:
+                metrics.total_sec = time.monotonic() - started
+                self._metrics = None
+                metrics.query_id = self._query_id
+                if self._result is not None and self._result.rowcount >= 0:
+                    metrics.rows = self._result.rowcount
+                notify(listeners, metrics)
+
+    def _execute(
+        self,
+        query: Union[bytes, str],
+        parameters,
+        cache: bool,
+        timeout_sec: Optional[float],
+        submit: Optional[bool],
+    ):
         if query is None or "" == query.strip():
             raise ProgrammingError(msg="query is empty")
 
-        request = {
-            "sql": query,
-            "timeout": self._connection.timeout_sec,
-            "parameters": parameters,
-        }
+        metrics = self._metrics
+        if submit is None:
+            submit = self.submit
+        submit = submit and self._connection.submit_supported is not False
+        if timeout_sec is None:
+            timeout_sec = (
+                self._connection.submit_timeout_sec
+                if submit
+                else self._connection.query_timeout_sec
+            )
+        query_id = self._next_query_id or new_query_id()
+        self._next_query_id = None
+        self._query_id = query_id
+        self._close_result()
+        self._rowcount = -1
+
+        # a cached result costs no request, not even encoding one
+        read_only = is_read_only(query)
+        key = result_cache_key(
+            self._connection.result_cache,
+            query,
+            parameters,
+            read_only,
+            cache and not (self.stream or submit),
+            self.result_format,
+        )
+        if key is not None:
+            cached = self._connection.result_cache.get(key)
+            if cached is not None:
+                if metrics is not None:
+                    metrics.cached = True
+                self._set_result(*cached)
+                return
+
+        handle = None if submit else self._handle(query)
+        request_payload, headers = self._encode(
+            None if handle else query, parameters, timeout_sec, handle
+        )
+        if submit and self._submit(
+            request_payload, headers, query_id, timeout_sec, read_only
+        ):
+            if not read_only and self._connection.result_cache is not None:
+                if changes_data(query):
+                    self._connection.result_cache.invalidate()
+            return
+
+        (
+            _,
+            response_status,
+            content_type,
+            response_payload,
+        ) = self._send(
+            request_payload,
+            headers,
+            query_id,
+            timeout_sec,
+            read_only,
+            stream=self.stream,
+        )
+        if handle is not None and response_status == unknown_handle_status:
+            # the server restarted, dropped the statement or is another
+            # replica. the sql along with the handle prepares it again
+            request_payload, headers = self._encode(
+                query, parameters, timeout_sec, handle
+            )
+            (
+                _,
+                response_status,
+                content_type,
+                response_payload,
+            ) = self._send(
+                request_payload,
+                headers,
+                query_id,
+                timeout_sec,
+                read_only,
+                stream=self.stream,
+            )
+        if metrics is not None:
+            metrics.status = response_status
+        check_status(response_status, response_payload)
+
+        self._set_result(content_type, response_payload)
+        if key is not None:
+            self._connection.result_cache.put(
+                key, (content_type, response_payload)
+            )
+        elif not read_only and self._connection.result_cache is not None:
+            # again, reads racing the write may have cached old rows
+            if changes_data(query):
+                self._connection.result_cache.invalidate()
+
+    def _encode(
+        self,
+        query: Union[bytes, str, None],
+        parameters,
+        timeout_sec: float,
+        handle: Optional[str] = None,
+    ) -> Tuple[bytes, dict]:
+        """
+        :return: body and headers of the query's request
+        """
+        started = time.monotonic()
+        connection = self._connection
+        request_payload = request_json(
+            query, parameters, timeout_sec, connection.codec, handle
+        )
         headers = {
-            "Content-Type": "application/json",
-            "Accept": "application/json",
+            "Content-Type": json_content_type,
+            "Accept": _accept_header(self.result_format, self.stream),
+            query_id_header: self._query_id,
         }
+        if connection.tracer is not None:
+            connection.tracer.inject(headers)
+        request_payload = encode_request(connection, request_payload, headers)
+        if self._metrics is not None:
+            self._metrics.add("encode", time.monotonic() - started)
+            self._metrics.request_bytes = len(request_payload)
+        return request_payload, headers
 
-        http_response = None
-        response_status = -1
-        response_payload = None
+    def _handle(self, query) -> Optional[str]:
+        """
+        :return: handle of the query's prepared statement, None to send
+        the sql. With connect(prepare=True) sql executed repeatedly is
+        prepared first.
+        """
+        connection = self._connection
+        prepared = connection.prepared
+        if prepared is None or connection.prepare_supported is False:
+            return None
+        if not isinstance(query, str):
+            # substrait plans are not parsed
+            return None
+        handle = prepared.get(query)
+        if handle is not None or not connection.prepare:
+            return handle
+        if prepared.seen(query) < prepare_after:
+            return None
+        try:
+            return self.prepare(query)
+        except NotSupportedError:
+            return None
 
+    @check_closed
+    def prepare(self, query: str) -> str:
+        """
+        Register a statement with radio_duck. execute() of the same sql
+        then sends only the statement's handle and the parameters.
+        Statements the server forgot, ex: on a restart, are prepared
+        again on their next execute().
+        :return: the statement's handle
+        :raise NotSupportedError if radio_duck cannot prepare statements
+        or prepared_statements_size is 0
+        :raise ProgrammingError if the statement is invalid
+        :raise OperationalError if unable to reach the server
+        """
+        connection = self._connection
+        if connection.prepared is None:
+            raise NotSupportedError(
+                msg="prepared statements are off, prepared_statements_size=0"
+            )
+        handle = connection.prepared.get(query)
+        if handle is not None:
+            return handle
+        if connection.prepare_supported is False:
+            raise NotSupportedError(msg="radio_duck has no prepare api")
+        handle = statement_handle(query)
+        # the round trip of an execute() preparing its statement is not
+        # the query's, its bytes and retries are not either
+        metrics, self._metrics = self._metrics, None
+        started = time.monotonic()
         try:
-            request_payload = json.dumps(request)
-            self._connection.http_connection.request(
-                "POST",
-                self._connection.api,
-                body=request_payload,
-                headers=headers,
+            _, status, _, payload = self._send(
+                connection.codec.dumps({"sql": query, "handle": handle}),
+                {"Content-Type": json_content_type},
+                new_query_id(),
+                connection.timeout_sec,
+                True,
+                api=connection.prepare_api,
             )
-            http_response = self._connection.http_connection.getresponse()
-            response_status = http_response.status
-            response_payload = http_response.read()
-        except Exception as e:
-            logging.error("error in querying server {}".format(e))
-            raise OperationalError(
-                msg=f"failed to execute query. response status {response_status}. response: {response_payload}"  # noqa: E501,B950
-            ) from e
         finally:
-            if http_response is not None:
-                http_response.close()
+            self._metrics = metrics
+            if metrics is not None:
+                metrics.add("prepare", time.monotonic() - started)
+        if status in (404, 405, 501):
+            logging.warning(
+                "radio_duck has no prepare api, sending the sql of every"
+                " query. response status: {}".format(status)
+            )
+            connection.prepare_supported = False
+            raise NotSupportedError(msg="radio_duck has no prepare api")
+        check_status(status, payload)
+        connection.prepare_supported = True
+        connection.prepared.put(query, handle)
+        return handle
 
-        if response_status != 200:
-            msg = (
-                "failed to execute query. response status: "
-                f"{response_status}. response_payload: {response_payload}"
+    def _send(
+        self,
+        request_payload,
+        headers: dict,
+        query_id: str,
+        timeout_sec: float,
+        read_only: bool,
+        stream=False,
+        api: Optional[str] = None,
+        endpoint: Optional[Endpoint] = None,
+    ):
+        """
+        Post a query, cancelling it if it runs out of time.
+        :param endpoint: send to this endpoint only, ex: the one
+        running a submitted query. Chosen by the balancer if None
+        :return: tuple of endpoint, response status, content type
+        and payload
+        """
+        balancer = self._connection.balancer
+        hedger = self._connection.hedger
+        # only queries of the sql api, free to go to any endpoint
+        hedgeable = (
+            hedger is not None
+            and read_only  # noqa: W503
+            and api is None  # noqa: W503
+            and endpoint is None  # noqa: W503
+            and isinstance(request_payload, bytes)  # noqa: W503
+        )
+        hedge_delay_sec = _hedge_delay(hedger if hedgeable else None)
+        # a pooled keep-alive socket may have been closed by the server
+        # or a load balancer while idle, or a replica may be down.
+        # reads are retried on another endpoint, or on a fresh socket
+        # if there is none, anything else is left to the caller.
+        attempts = max(2, len(balancer.endpoints)) if read_only else 1
+        tried = []
+        for attempt in range(1, attempts + 1):
+            target = endpoint or balancer.choose(exclude=tried)
+            fresh = target in tried
+            tried.append(target)
+            can_fail_over = (
+                attempt < attempts
+                and endpoint is None  # noqa: W503
+                and len(tried) < len(balancer.endpoints)  # noqa: W503
             )
-            if _is4xx(response_status):
-                raise ProgrammingError(
-                    msg=msg, response_status=response_status
-                )
-            else:
+            started = time.monotonic()
+            try:
+                with self._running(query_id, target):
+                    if hedge_delay_sec is not None and not fresh:
+                        target, response = self._hedged_post(
+                            request_payload,
+                            headers,
+                            target,
+                            hedge_delay_sec,
+                            stream=stream,
+                            timeout_sec=timeout_sec,
+                        )
+                        if self._metrics is not None:
+                            # the phases of two requests do not add up
+                            self._metrics.add(
+                                "round_trip", time.monotonic() - started
+                            )
+                    else:
+                        response = self._post(
+                            request_payload,
+                            headers,
+                            fresh=fresh,
+                            stream=stream,
+                            api=api,
+                            timeout_sec=timeout_sec,
+                            endpoint=target,
+                            metrics=self._metrics,
+                        )
+            except socket.timeout as e:
+                self._cancel_timed_out(target, query_id)
+                raise OperationalError(
+                    msg=f"[{query_timeout_msg}]: query {query_id} did not finish within {timeout_sec} seconds and was cancelled"  # noqa: E501,B950
+                ) from e
+            except disconnect_errors as e:
+                if attempt < attempts:
+                    logging.warning(
+                        "stale connection to radio_duck ({}), retrying".format(
+                            repr(e)
+                        )
+                    )
+                    continue
+                logging.error("error in querying server {}".format(e))
                 raise OperationalError(
-                    msg=msg, response_status=response_status
+                    msg=f"[{connect_stale_socket_msg}]: failed to execute query. connection dropped by server: {e!r}"  # noqa: E501,B950
+                ) from e
+            except OperationalError as e:
+                if not can_fail_over:
+                    raise
+                logging.warning(
+                    "radio_duck endpoint {} failed ({}), failing over".format(
+                        target.address, e
+                    )
+                )
+                continue
+            if response[0] in unavailable_statuses and can_fail_over:
+                logging.warning(
+                    "radio_duck endpoint {} unavailable ({}), failing over"
+                    .format(target.address, response[0])
                 )
+                continue
+            if hedgeable and response[0] == 200:
+                hedger.record(time.monotonic() - started)
+            if self._metrics is not None:
+                self._metrics.retries = self._metrics.retries + attempt - 1
+            return (target,) + response
 
+    def _hedged_post(
+        self,
+        request_payload: bytes,
+        headers: dict,
+        endpoint: Endpoint,
+        delay_sec: float,
+        stream=False,
+        timeout_sec: Optional[float] = None,
+    ):
+        """
+        Post a read and, if it gets no response within delay_sec and the
+        hedge budget allows, post it again to another endpoint, or over
+        another socket if there is none. The first response wins, the
+        other request is cancelled and its response dropped.
+        :return: tuple of the endpoint that answered and its response
+        """
+        connection = self._connection
+        primary = connection._run(
+            self._post,
+            request_payload,
+            headers,
+            stream=stream,
+            timeout_sec=timeout_sec,
+            endpoint=endpoint,
+        )
         try:
-            self._result = json.loads(response_payload.decode("utf-8"))
-            self._index = 0
+            return endpoint, primary.result(timeout=delay_sec)
+        except futures.TimeoutError:
+            pass
+        if not connection.hedger.spend():
+            return endpoint, primary.result()
+        hedge_endpoint = connection.balancer.choose(exclude=[endpoint])
+        # its own id, so that cancelling the loser spares the winner
+        hedge_id = new_query_id()
+        hedge_headers = dict(headers)
+        hedge_headers[query_id_header] = hedge_id
+        logging.debug(
+            "no response from radio_duck endpoint {} within {}s, hedging"
+            " to {}".format(
+                endpoint.address, delay_sec, hedge_endpoint.address
+            )
+        )
+
+        def hedge():
+            with self._running(hedge_id, hedge_endpoint):
+                return self._post(
+                    request_payload,
+                    hedge_headers,
+                    stream=stream,
+                    timeout_sec=timeout_sec,
+                    endpoint=hedge_endpoint,
+                )
+
+        requests = [
+            (primary, endpoint, headers[query_id_header]),
+            (connection._run(hedge), hedge_endpoint, hedge_id),
+        ]
+        pending = {request[0] for request in requests}
+        while pending:
+            _, pending = futures.wait(
+                pending, return_when=futures.FIRST_COMPLETED
+            )
+            for future, winner, query_id in requests:
+                if future in pending or not _answered(future):
+                    continue
+                for loser in requests:
+                    if loser[0] is not future:
+                        self._drop_hedged(*loser)
+                if future is not primary:
+                    connection.hedger.win()
+                    self._query_id = query_id
+                return winner, future.result()
+        # neither answered, the primary's error or status stands
+        return endpoint, primary.result()
+
+    def _drop_hedged(
+        self, future: futures.Future, endpoint: Endpoint, query_id: str
+    ):
+        if not future.done():
+            self._connection._run(self._cancel_timed_out, endpoint, query_id)
+        future.add_done_callback(_close_response)
+
+    def _set_result(self, content_type: str, response_payload):
+        started = time.monotonic()
+        try:
+            self._result = self._new_result(content_type, response_payload)
+            if self._metrics is not None:
+                self._metrics.add("decode", time.monotonic() - started)
         except Exception as e:
+            if not isinstance(response_payload, bytes):
+                # a streamed body, holding on to a pooled connection
+                response_payload.close()
             logging.error(
-                "error in deserializing json response server {}".format(e)
+                "error in deserializing response from server {}".format(e)
             )
             raise OperationalError(  # noqa: E501,B950
                 msg=f"Failed to execute query. could not deserialize response: {e}."  # noqa: E501,B950
             ) from e
 
-    def executemany(self, query: Union[bytes, str], seq_of_parameters) -> None:
-        raise NotSupportedError(
-            msg="`executemany` is not supported, use `execute` instead"
+    def _submit(
+        self,
+        request_payload,
+        headers: dict,
+        query_id: str,
+        timeout_sec: float,
+        read_only: bool,
+    ) -> bool:
+        """
+        Submit a query to the submit_api. The server either accepts it
+        (202) or, for a quick query, answers with its result (200).
+        :return: False if the server cannot take submitted queries
+        """
+        deadline = time.monotonic() + timeout_sec
+        endpoint, status, content_type, payload = self._send(
+            request_payload,
+            headers,
+            query_id,
+            self._connection.timeout_sec,
+            read_only,
+            api=self._connection.submit_api,
         )
+        if status in (404, 405, 501):
+            logging.warning(
+                "radio_duck has no submit api, executing queries"
+                " synchronously. response status: {}".format(status)
+            )
+            self._connection.submit_supported = False
+            return False
+        self._connection.submit_supported = True
+        if status == 202:
+            # status and result are only known to the endpoint running it
+            self._submitted = (query_id, deadline, endpoint)
+            return True
+        check_status(status, payload)
+        self._set_result(content_type, payload)
+        return True
+
+    @check_closed
+    def poll(self, wait_sec: float = 0) -> dict:
+        """
+        Status of the submitted query, ex:
+        {"query_id": "..", "state": "running", "progress": 40}.
+        state is one of 'running', 'finished', 'failed' or 'cancelled'.
+        :param wait_sec: long poll, the server answers once the query
+        is done or after wait_sec at most
+        :raise ProgrammingError before execute()
+        :raise OperationalError if unable to reach the server
+        """
+        if self._submitted is None:
+            if self._result is None:
+                raise ProgrammingError(msg="cannot poll before execute()")
+            return {"query_id": self._query_id, "state": "finished"}
+        query_id, _, endpoint = self._submitted
+        codec = self._connection.codec
+        try:
+            status, _, payload = self._post(
+                codec.dumps({"query_id": query_id, "wait": wait_sec}),
+                {"Content-Type": json_content_type},
+                api=self._connection.status_api,
+                timeout_sec=wait_sec + self._connection.timeout_sec,
+                endpoint=endpoint,
+            )
+        except OSError as e:
+            raise OperationalError(
+                msg=f"failed to poll query {query_id}: {e!r}"
+            ) from e
+        check_status(status, payload)
+        return codec.loads(payload)
+
+    def _collect(self):
+        """
+        Wait for the submitted query, if any, and open its result.
+        """
+        if self._submitted is None:
+            return
+        query_id, deadline, endpoint = self._submitted
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                self._submitted = None
+                self._cancel_timed_out(endpoint, query_id)
+                raise OperationalError(
+                    msg=f"[{query_timeout_msg}]: query {query_id} did not finish in time and was cancelled"  # noqa: E501,B950
+                )
+            try:
+                status = self.poll(
+                    min(self._connection.poll_wait_sec, remaining)
+                )
+            except Exception:
+                self._submitted = None
+                raise
+            if status.get("state") in _done_states:
+                break
+        self._submitted = None
+        check_query_state(status)
+        _, response_status, content_type, payload = self._send(
+            self._connection.codec.dumps({"query_id": query_id}),
+            {
+                "Content-Type": json_content_type,
+                "Accept": _accept_header(self.result_format, True),
+            },
+            query_id,
+            self._connection.timeout_sec,
+            True,
+            stream=True,
+            api=self._connection.result_api,
+            endpoint=endpoint,
+        )
+        check_status(response_status, payload)
+        self._set_result(content_type, payload)
+
+    @contextmanager
+    def _running(self, query_id: str, endpoint: Endpoint):
+        running = self._connection._running
+        lock = self._connection._running_lock
+        with lock:
+            running[query_id] = endpoint
+        try:
+            yield
+        finally:
+            with lock:
+                running.pop(query_id, None)
+
+    def _cancel_timed_out(self, endpoint: Endpoint, query_id: str):
+        # the server may not enforce the timeout it was sent
+        try:
+            self._connection._cancel(endpoint, query_id)
+        except Exception as e:
+            logging.warning(
+                "could not cancel timed out query {}: {}".format(query_id, e)
+            )
+
+    def _new_result(self, content_type: str, payload) -> Result:
+        return _to_result(
+            content_type,
+            payload,
+            self._connection.codec,
+            self.decode_types,
+        )
+
+    def _close_result(self):
+        self._submitted = None
+        if self._result is not None:
+            self._result.close()
+            self._result = None
+
+    def _post(
+        self,
+        request_payload,
+        headers: dict,
+        fresh=False,
+        stream=False,
+        api: Optional[str] = None,
+        timeout_sec: Optional[float] = None,
+        endpoint: Optional[Endpoint] = None,
+        metrics: Optional[QueryMetrics] = None,
+    ):
+        """
+        Send a request to a replica, see _request(). The outcome
+        feeds the balancer's health and latency tracking.
+        :param endpoint: replica to send to, chosen by the connection's
+        balancer if None
+        """
+        balancer = self._connection.balancer
+        if endpoint is None:
+            endpoint = balancer.choose()
+        balancer.started(endpoint)
+        started = time.monotonic()
+        healthy = False
+        try:
+            response = self._request(
+                endpoint.pool,
+                request_payload,
+                headers,
+                fresh=fresh,
+                stream=stream,
+                api=api,
+                timeout_sec=timeout_sec,
+                metrics=metrics,
+            )
+            healthy = response[0] not in unavailable_statuses
+            return response
+        except socket.timeout:
+            # a slow query, not a sick endpoint
+            healthy = True
+            raise
+        finally:
+            balancer.finished(endpoint, time.monotonic() - started, healthy)
+
+    def _request(
+        self,
+        pool: HttpConnectionPool,
+        request_payload,
+        headers: dict,
+        fresh=False,
+        stream=False,
+        api: Optional[str] = None,
+        timeout_sec: Optional[float] = None,
+        metrics: Optional[QueryMetrics] = None,
+    ):
+        """
+        Send a request over a pooled connection.
+        :param request_payload: str, bytes or an iterable of bytes,
+        which is sent with chunked transfer encoding
+        :param api: endpoint, defaults to the connection's sql api
+        :param stream: for a 200 response return the body as a
+        PooledResponse, which holds on to the connection until read or closed
+        :param timeout_sec: socket timeout while waiting for the response,
+        defaults to the pool's
+        :param metrics: to add the round trip and read phases to
+        :return: tuple of response status, content type and payload
+        :raise disconnect_errors if the socket was dropped
+        :raise socket.timeout if timeout_sec passed without a response
+        :raise OperationalError on any other transport failure
+        """
+        http_response = None
+        response_status = -1
+        content_type = ""
+        response_payload = None
+        http_connection = pool.acquire(fresh=fresh)
+        try:
+            if timeout_sec is not None:
+                http_connection.sock.settimeout(timeout_sec)
+            started = time.monotonic()
+            http_connection.request(
+                "POST",
+                api or self._connection.api,
+                body=request_payload,
+                headers=headers,
+                encode_chunked=not isinstance(request_payload, (str, bytes)),
+            )
+            http_response = http_connection.getresponse()
+            if metrics is not None:
+                metrics.add("round_trip", time.monotonic() - started)
+                started = time.monotonic()
+            response_status = http_response.status
+            content_type = http_response.getheader("Content-Type", "")
+            content_encoding = http_response.getheader("Content-Encoding")
+            if stream and response_status == 200:
+                body = PooledResponse(pool, http_connection, http_response)
+                if is_encoded(content_encoding):
+                    body = DecompressingReader(body, content_encoding)
+                return response_status, content_type, body
+            response_payload = http_response.read()
+        except socket.timeout:
+            # the response may still arrive, the socket is unusable
+            pool.release(http_connection, discard=True)
+            raise
+        except disconnect_errors:
+            pool.release(http_connection, discard=True)
+            raise
+        except Exception as e:
+            pool.release(http_connection, discard=True)
+            logging.error("error in querying server {}".format(e))
+            raise OperationalError(
+                msg=f"failed to execute query. response status {response_status}. response: {response_payload}"  # noqa: E501,B950
+            ) from e
+        http_response.close()
+        pool.release(http_connection)
+        payload = decode_response(response_payload, content_encoding)
+        if metrics is not None:
+            metrics.add("read", time.monotonic() - started)
+            metrics.response_bytes = (metrics.response_bytes or 0) + len(
+                response_payload
+            )
+        return response_status, content_type, payload
+
+    @check_closed
+    def executemany(self, query: Union[bytes, str], seq_of_parameters) -> None:
+        """
+        Execute a query against every set of parameters.
+
+        A single row 'INSERT ... VALUES (?, ..)' is rewritten to a multi
+        row insert and sent in batches of executemany_batch_size rows,
+        one request per batch. Any other query is executed once per set.
+        :raise OperationalError if unable to execute query
+        :raise ProgrammingError if query is empty or invalid
+        """
+        seq_of_parameters = list(seq_of_parameters)
+        for batch_query, batch_parameters in executemany_batches(
+            query, seq_of_parameters, self._connection.executemany_batch_size
+        ):
+            self.execute(batch_query, batch_parameters)
+        self._close_result()
+        self._rowcount = len(seq_of_parameters)
 
     @check_closed
     def fetchone(self) -> Optional[tuple]:
+        self._collect()
         if self._result is None:
             raise ProgrammingError(msg="cannot fetchone() before execute()")
-
-        rows = self._result["rows"]
-        if len(rows) == 0 or self._index < 0 or self._index >= len(rows):
-            return None
-        to_return = rows[self._index]
-        self._index = self._index + 1
-        return to_return
+        rows = self._result.fetch(1)
+        return rows[0] if rows else None
 
     @check_closed
+    @traced
     def fetchmany(self, size: Optional[int] = None) -> List[tuple]:
+        self._collect()
         if self._result is None:
             raise ProgrammingError(msg="cannot fetchmany before execute()")
         if size is None or size <= 0:
             size = self._arraysize
-        # _result['rows'] is [], slice it to get elems
-        next_elements = self._result["rows"][
-            self._index : self._index + size  # noqa: E203,E501
-        ]
-        self._index = self._index + size
-        return next_elements
+        return self._result.fetch(size)
 
     @check_closed
+    @traced
     def fetchall(self) -> List[tuple]:
+        self._collect()
         if self._result is None:
             raise ProgrammingError(msg="cannot fetchall before execute()")
-        remaining = self._result["rows"][self._index :]  # noqa: E203
-        self._index = len(self._result["rows"])
-        return remaining
+        return self._result.fetch()
+
+    @check_closed
+    @traced
+    def fetch_arrow_table(self):
+        """
+        Fetch the remaining rows as a pyarrow Table.
+        Zero copy when the server answered with arrow.
+        """
+        self._collect()
+        if self._result is None:
+            raise ProgrammingError(
+                msg="cannot fetch_arrow_table before execute()"
+            )
+        return self._result.fetch_arrow_table()
+
+    @check_closed
+    def fetch_record_batches(self):
+        """
+        Fetch the remaining rows as an iterator of pyarrow RecordBatch.
+        """
+        self._collect()
+        if self._result is None:
+            raise ProgrammingError(
+                msg="cannot fetch_record_batches before execute()"
+            )
+        return self._result.fetch_record_batches()
+
+    @check_closed
+    @traced
+    def fetch_numpy(self) -> dict:
+        """
+        Fetch the remaining rows column wise as {name: numpy array},
+        decoded into typed arrays without building row objects.
+        Zero copy when the server answered with arrow.
+        :raise NotSupportedError if numpy is not installed
+        """
+        self._collect()
+        if self._result is None:
+            raise ProgrammingError(msg="cannot fetch_numpy before execute()")
+        return self._result.fetch_numpy()
+
+    @check_closed
+    @traced
+    def fetch_df(self):
+        """
+        Fetch the remaining rows as a pandas DataFrame,
+        built from arrow columns rather than python rows.
+        :raise NotSupportedError if pandas is not installed
+        """
+        self._collect()
+        if self._result is None:
+            raise ProgrammingError(msg="cannot fetch_df before execute()")
+        return self._result.fetch_df()
 
     def nextset(self):
         """Move to the next available result set (not supported)."""
@@ -291,33 +1400,349 @@ class Cursor(object):
         """
         This read-only attribute is a sequence of 7-item sequences.
         """
-        if self.closed or self._result is None:
+        if self.closed:
+            return None
+        self._collect()
+        if self._result is None:
             return None
 
-        columns_types = self._result.get("schema", [])
-        column_names = self._result.get("columns", [])
-
-        return self._get_description(columns_types, column_names)
+        return self._get_description(self._result.schema, self._result.columns)
 
     def _get_description(
         self, columns_types: List[str], column_names: List[str]
     ) -> Any:
-        return [
-            (
-                column_name,
-                get_type_code(column_type),
-                None,
-                None,
-                None,
-                None,
-                True,
-            )
-            for column_name, column_type, in zip(  # noqa: B905,E501
-                column_names, columns_types
+        return get_description(columns_types, column_names)
+
+
+def get_description(columns_types: List[str], column_names: List[str]) -> Any:
+    """
+    :return: PEP 249 cursor.description for a result's schema and columns
+    """
+    return [
+        (
+            column_name,
+            get_type_code(column_type),
+            None,
+            None,
+            None,
+            None,
+            True,
+        )
+        for column_name, column_type, in zip(  # noqa: B905,E501
+            column_names, columns_types
+        )
+        # strict = True for zip not working
+        # https://github.com/adieyal/sd-dynamic-prompts/issues/601 # noqa: B905,E501
+    ]
+
+
+# states of a submitted query that has stopped running
+_done_states = ("finished", "failed", "cancelled")
+
+
+def check_query_state(status: dict):
+    """
+    :param status: of a submitted query, see Cursor.poll()
+    :raise ProgrammingError/OperationalError as for a synchronous
+    response if the query failed, OperationalError if cancelled
+    """
+    state = status.get("state")
+    if state == "finished":
+        return
+    query_id = status.get("query_id")
+    if state == "cancelled":
+        raise OperationalError(msg=f"query {query_id} was cancelled")
+    response_status = int(status.get("status") or 500)
+    check_status(
+        500 if response_status == 200 else response_status,
+        status.get("error"),
+    )
+
+
+def _hedge_delay(hedger: Optional[Hedger]) -> Optional[float]:
+    """
+    Count a read that may be hedged towards the hedge budget.
+    :return: seconds after which to hedge it, None not to
+    """
+    if hedger is None:
+        return None
+    hedger.earn()
+    return hedger.delay()
+
+
+def _answered(future: futures.Future) -> bool:
+    # a replica's 502/503/504 is no answer while another may give one
+    return (
+        future.exception() is None
+        and future.result()[0] not in unavailable_statuses  # noqa: W503
+    )
+
+
+def _close_response(future: futures.Future):
+    # a dropped streamed body still holds on to a pooled connection
+    if future.exception() is None:
+        payload = future.result()[2]
+        if not isinstance(payload, bytes):
+            payload.close()
+
+
+def new_query_id() -> str:
+    return uuid.uuid4().hex
+
+
+def cancel_status(query_id: str, status: int, payload: bytes) -> bool:
+    """
+    :return: True if the server stopped the query, False if it was
+    not running (anymore) or the server refused
+    :raise NotSupportedError if the server has no cancel endpoint
+    """
+    if status == 200:
+        return True
+    if status in (405, 501):
+        raise NotSupportedError(
+            msg=f"server does not support query cancellation. response status: {status}"  # noqa: E501,B950
+        )
+    logging.warning(
+        "query {} not cancelled. response status: {}, response: {}".format(
+            query_id, status, payload
+        )
+    )
+    return False
+
+
+def request_json(
+    query: Union[bytes, str, None],
+    parameters,
+    timeout_sec,
+    codec: Optional[JsonCodec] = None,
+    handle: Optional[str] = None,
+) -> bytes:
+    """
+    :param query: None to execute the prepared statement of the handle
+    :param handle: of the prepared statement, see radio_duck.prepared
+    :return: json body of a query request to radio_duck
+    :raise ProgrammingError if a parameter cannot be encoded
+    """
+    request = {
+        "sql": query,
+        "timeout": timeout_sec,
+        "parameters": parameters,
+    }
+    if handle is not None:
+        request["handle"] = handle
+        if query is None:
+            del request["sql"]
+    try:
+        return (codec or get_codec()).dumps(request)
+    except (TypeError, ValueError, OverflowError) as e:
+        # ex: a parameter of a type json has no value for
+        raise ProgrammingError(
+            msg=f"cannot encode query parameters {parameters!r}: {e}"
+        ) from e
+
+
+def executemany_batches(
+    query: Union[bytes, str], seq_of_parameters: list, batch_size: int
+) -> Iterator[Tuple[Union[bytes, str], Any]]:
+    """
+    A single row 'INSERT ... VALUES (?, ..)' becomes multi row inserts
+    of up to batch_size rows with flattened parameters. Any other query
+    is yielded once per set of parameters.
+    :return: iterator of (query, parameters) to execute
+    """
+    insert = split_insert_values(query)
+    if insert is None or len(seq_of_parameters) <= 1:
+        for parameters in seq_of_parameters:
+            yield query, parameters
+        return
+    prefix, row = insert
+    batch_size = max(1, batch_size)
+    for i in range(0, len(seq_of_parameters), batch_size):
+        batch = seq_of_parameters[i : i + batch_size]  # noqa: E203
+        yield (
+            prefix + ", ".join([row] * len(batch)),
+            [value for parameters in batch for value in parameters],
+        )
+
+
+_result_formats = ["json", "arrow"]
+
+
+def _check_result_format(result_format: str) -> str:
+    if result_format not in _result_formats:
+        raise InterfaceError(
+            msg=(
+                f"unknown result_format {result_format}. "
+                f"supported: {_result_formats}"
             )
-            # strict = True for zip not working
-            # https://github.com/adieyal/sd-dynamic-prompts/issues/601 # noqa: B905,E501
-        ]
+        )
+    return result_format
+
+
+def _accept_header(result_format: str, stream: bool) -> str:
+    accepted = []
+    if result_format == "arrow":
+        accepted.append(arrow_stream_content_type)
+    if stream:
+        accepted.append(ndjson_content_type)
+    if not accepted:
+        return json_content_type
+    return ", ".join(accepted + [f"{json_content_type};q=0.5"])
+
+
+def _to_result(
+    content_type: str,
+    payload,
+    codec: Optional[JsonCodec] = None,
+    decode_types: Union[bool, FrozenSet[str]] = False,
+) -> Result:
+    """
+    :param payload: bytes or, when streaming, a PooledResponse
+    :param decode_types: True or names of columns whose json values
+    are converted to python types, see converters.get_converter
+    """
+    codec = codec or get_codec()
+    if content_type.startswith(arrow_stream_content_type):
+        # arrow values are already typed
+        return ArrowResult(payload)
+    if isinstance(payload, bytes):
+        if content_type.startswith(ndjson_content_type):
+            result = NdjsonResult(io.BytesIO(payload), codec)
+        else:
+            result = JsonResult(codec.loads(payload))
+    elif content_type.startswith(ndjson_content_type):
+        result = NdjsonResult(payload, codec)
+    else:
+        result = StreamingJsonResult(payload)
+    result.decode_types = decode_types
+    return result
+
+
+def result_cache_key(
+    result_cache: Optional[ResultCache],
+    query,
+    parameters,
+    read_only: bool,
+    cache: bool,
+    result_format: str,
+):
+    """
+    :return: result cache key of the query or None if
+    its response must not be cached
+    """
+    if result_cache is None:
+        return None
+    if not read_only:
+        if changes_data(query):
+            # DDL/DML may change what any cached query returns
+            result_cache.invalidate()
+        return None
+    if not cache:
+        return None
+    return cache_key(query, parameters, result_format)
+
+
+def encode_request(connection, request_payload: bytes, headers: dict):
+    """
+    Set the Accept-Encoding header and compress a large request body
+    if the connection is configured to.
+    :return: request body to send
+    """
+    if connection.compression:
+        headers["Accept-Encoding"] = accept_encoding()
+    encoding = connection.compress_request
+    if encoding is None:
+        return request_payload
+    if len(request_payload) < connection.compress_request_min_bytes:
+        return request_payload
+    headers["Content-Encoding"] = encoding
+    return compress(request_payload, encoding)
+
+
+def decode_response(payload: bytes, content_encoding: Optional[str]):
+    """
+    :return: payload decompressed according to its Content-Encoding
+    :raise OperationalError if it cannot be decompressed
+    """
+    if not is_encoded(content_encoding):
+        return payload
+    try:
+        return decompress(payload, content_encoding)
+    except Exception as e:
+        raise OperationalError(
+            msg=f"failed to execute query. could not decompress {content_encoding} response: {e}"  # noqa: E501,B950
+        ) from e
+
+
+def _result_cache(kwargs: dict) -> Optional[ResultCache]:
+    if kwargs.get("result_cache") is not None:
+        return kwargs["result_cache"]
+    max_size = int(kwargs.get("result_cache_size", 0))
+    if max_size <= 0:
+        return None
+    return ResultCache(max_size, float(kwargs.get("result_cache_ttl_sec", 60)))
+
+
+def _hedger(kwargs: dict) -> Optional[Hedger]:
+    if not _as_bool(kwargs.get("hedge", False)):
+        return None
+    return Hedger(
+        percentile=float(kwargs.get("hedge_percentile", 95)),
+        budget=float(kwargs.get("hedge_budget", 0.05)),
+        min_delay_sec=float(kwargs.get("hedge_min_delay_sec", 0.005)),
+    )
+
+
+def _tracer(kwargs: dict) -> Optional[Tracer]:
+    tracing = kwargs.get("tracing", False)
+    if isinstance(tracing, (bool, str)):
+        return new_tracer() if _as_bool(tracing) else None
+    # an opentelemetry Tracer
+    return new_tracer(tracing)
+
+
+@contextmanager
+def _traced_execute(connection, metrics: QueryMetrics):
+    if connection.tracer is None:
+        yield
+        return
+    with connection.tracer.execute(metrics, connection.host, connection.port):
+        yield
+
+
+def _slow_query_log(kwargs: dict) -> Optional[SlowQueryLog]:
+    threshold_sec = kwargs.get("slow_query_sec")
+    sample_rate = float(kwargs.get("slow_query_sample_rate", 0))
+    if threshold_sec is None and not sample_rate:
+        return None
+    path = kwargs.get("slow_query_log")
+    return SlowQueryLog(
+        threshold_sec=None if threshold_sec is None else float(threshold_sec),
+        sample_rate=sample_rate,
+        sink=None if path is None else JsonlFile(path),
+    )
+
+
+def _as_bool(value) -> bool:
+    # url query string values arrive as str
+    if isinstance(value, str):
+        return value.strip().lower() in ("true", "1", "yes")
+    return bool(value)
+
+
+def check_status(response_status: int, response_payload):
+    """
+    :raise ProgrammingError on 4xx, OperationalError on other non 200
+    """
+    if response_status == 200:
+        return
+    msg = (
+        "failed to execute query. response status: "
+        f"{response_status}. response_payload: {response_payload}"
+    )
+    if _is4xx(response_status):
+        raise ProgrammingError(msg=msg, response_status=response_status)
+    raise OperationalError(msg=msg, response_status=response_status)
 
 
 def _is4xx(status: int):
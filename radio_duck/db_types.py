@@ -65,6 +65,68 @@ def get_type_code(col_type: str) -> int:
     return __types.get(col_type, UNKNOWN).get_type_code()
 
 
+def get_arrow_type_name(arrow_type) -> str:
+    """
+    Map a pyarrow DataType to one of the type names above,
+    as sent by radio_duck in the json 'schema' of a result.
+    """
+    # imported here, only arrow results need it
+    import pyarrow.types as pa_types
+
+    if (
+        pa_types.is_integer(arrow_type)
+        or pa_types.is_floating(arrow_type)  # noqa: W503
+        or pa_types.is_decimal(arrow_type)  # noqa: W503
+    ):
+        return "NUMBER"
+    if pa_types.is_temporal(arrow_type):
+        return "DATETIME"
+    if pa_types.is_binary(arrow_type) or pa_types.is_large_binary(arrow_type):
+        return "BINARY"
+    if pa_types.is_string(arrow_type) or pa_types.is_large_string(arrow_type):
+        return "STRING"
+    return str(arrow_type)
+
+
+# json 'schema' type names whose values decode to one arrow type.
+# others (NUMBER may hold ints or floats, dates arrive as strings)
+# are left for arrow to infer from the values.
+_arrow_type_names = {
+    "STRING": "string",
+    "VARCHAR": "string",
+    "TEXT": "string",
+    "CHAR": "string",
+    "BPCHAR": "string",
+    "UUID": "string",
+    "BOOL": "bool_",
+    "BOOLEAN": "bool_",
+    "LOGICAL": "bool_",
+    "TINYINT": "int64",
+    "SMALLINT": "int64",
+    "INTEGER": "int64",
+    "INT": "int64",
+    "BIGINT": "int64",
+    "UTINYINT": "int64",
+    "USMALLINT": "int64",
+    "UINTEGER": "int64",
+    "DOUBLE": "float64",
+    "FLOAT": "float64",
+    "REAL": "float64",
+}
+
+
+def get_arrow_type(type_name: str):
+    """
+    Map a type name of the json 'schema' of a result to a pyarrow
+    DataType, the reverse of get_arrow_type_name.
+    :return: pyarrow DataType or None if it must be inferred
+    """
+    import pyarrow as pa
+
+    name = _arrow_type_names.get(str(type_name).upper())
+    return None if name is None else getattr(pa, name)()
+
+
 # ----------------------------------------------------------
 
 
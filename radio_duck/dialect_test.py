@@ -105,6 +105,22 @@ def test_is_disconnect():
         None,
         None,
     )
+    assert dialect.is_disconnect(
+        OperationalError(msg=radio_duck.db.connect_stale_socket_msg),
+        None,
+        None,
+    )
+    import http.client
+
+    for cause in [
+        http.client.RemoteDisconnected("closed"),
+        BrokenPipeError(),
+        ConnectionResetError(),
+    ]:
+        try:
+            raise OperationalError(msg="failed") from cause
+        except OperationalError as e:
+            assert dialect.is_disconnect(e, None, None)
 
 
 def test_has_index():
@@ -319,19 +335,14 @@ def test_get_uniq_constraints():
 
     @app.route("/v1/sql/", methods=["POST"])
     def index():
-        json = flask.request.json
-        table_name = json["parameters"][1]
-        response_rows = (
-            '"rows":[ ["UNIQUE(id, id)", ["id"] ] ]'
-            if table_name == "students"
-            else '"rows":[]'
-        )
+        # one query for all tables of the schema
+        response_rows = '"rows":[ ["students", "UNIQUE(id, id)", ["id"] ] ]'
         resp = f"""{{
           "schema": [
-            "string","list"
+            "string","string","list"
           ],
           "columns": [
-            "name", "column_names"
+            "table_name", "name", "column_names"
           ],
           {response_rows}
         }}"""
@@ -450,19 +461,14 @@ def test_get_pk():
 
     @app.route("/v1/sql/", methods=["POST"])
     def index():
-        json = flask.request.json
-        table_name = json["parameters"][1]
-        response_rows = (
-            '"rows":[ ["PRIMARY KEY(id)", ["id"] ] ]'
-            if table_name == "students"
-            else '"rows":[]'
-        )
+        # one query for all tables of the schema
+        response_rows = '"rows":[ ["students", "PRIMARY KEY(id)", ["id"] ] ]'
         resp = f"""{{
           "schema": [
-            "string","list"
+            "string","string","list"
           ],
           "columns": [
-            "name", "column_names"
+            "table_name", "name", "column_names"
           ],
           {response_rows}
         }}"""
@@ -496,19 +502,14 @@ def test_get_indexes():
 
     @app.route("/v1/sql/", methods=["POST"])
     def index():
-        json = flask.request.json
-        table_name = json["parameters"][1]
-        response_rows = (
-            '"rows":[ ["city_id_ndex", "CREATE INDEX city_id_ndex ON employee (city,id);", false] ]'  # noqa: E501,B950
-            if table_name == "employee"
-            else '"rows":[]'
-        )
+        # one query for all tables of the schema
+        response_rows = '"rows":[ ["employee", "city_id_ndex", "CREATE INDEX city_id_ndex ON employee (city,id);", false] ]'  # noqa: E501,B950
         resp = f"""{{
           "schema": [
-            "string","string","bool"
+            "string","string","string","bool"
           ],
           "columns": [
-            "index_name","sql","is_unique"
+            "table_name","index_name","sql","is_unique"
           ],
           {response_rows}
         }}"""
@@ -536,19 +537,17 @@ def test_get_fk():
 
     @app.route("/v1/sql/", methods=["POST"])
     def index():
-        json = flask.request.json
-        table_name = json["parameters"][1]
+        # one query for all tables of the schema
         response_rows = (
-            '"rows":[ ["FOREIGN KEY (t1_id) REFERENCES t1(id)", ["t1_id"] ] ]'
-            if table_name == "t2"
-            else '"rows":[]'
+            '"rows":[ ["t2", "FOREIGN KEY (t1_id) REFERENCES t1(id)",'
+            ' ["t1_id"] ] ]'
         )
         resp = f"""{{
           "schema": [
-            "string","list"
+            "string","string","list"
           ],
           "columns": [
-            "name", "column_names"
+            "table_name", "name", "column_names"
           ],
           {response_rows}
         }}"""
@@ -571,18 +570,49 @@ def test_get_fk():
 
 
 def test_get_columns():
+    import json
+
     from http_server_mock import HttpServerMock
 
     app = HttpServerMock(__name__)
 
+    queries = []
+
     @app.route("/v1/sql/", methods=["POST"])
     def index():
-        response_rows = (
-            '"rows":[ [1, "map_col", "MAP(INTEGER, DOUBLE)", false, null,'
-            ' false], [2, "listing", "INTEGER[]", false, null, false], [3,'
-            ' "unionn", "UNION(num INTEGER, str VARCHAR)", false, null,'
-            ' false], [4, "name", "STRING", true, "acb", true]]'
-        )
+        sql = flask.request.json["sql"]
+        queries.append(sql)
+        rows = [
+            [1, "map_col", "MAP(INTEGER, DOUBLE)", False, None, False],
+            [2, "listing", "INTEGER[]", False, None, False],
+            [
+                3,
+                "unionn",
+                "UNION(num INTEGER, str VARCHAR)",
+                False,
+                None,
+                False,
+            ],
+            [4, "name", "STRING", True, "acb", True],
+        ]
+        if "duckdb_columns" in sql:
+            # columns of all tables of the schema, after the table name
+            return json.dumps(
+                {
+                    "schema": ["STRING", "NUMBER", "STRING", "STRING"] + [
+                        "bool",
+                        "STRING",
+                        "bool",
+                    ],  # noqa: W503
+                    "columns": ["table_name", "cid", "name", "type"] + [
+                        "notnull",
+                        "dflt_value",
+                        "pk",
+                    ],  # noqa: W503
+                    "rows": [["pond"] + row for row in rows],
+                }
+            )
+        response_rows = f'"rows": {json.dumps(rows)}'
         resp = f"""{{
           "schema": [
                 "NUMBER",
@@ -612,6 +642,10 @@ def test_get_columns():
 
             dialect = RadioDuckDialect(dbapi=radio_duck)
             result = dialect.get_columns(conn, "pond", "main")
+            assert 1 == len(queries)
+            # tables missing from the schema wide query are asked for
+            assert result == dialect.get_columns(conn, "elsewhere", "main")
+            assert "PRAGMA table_info('elsewhere')" in queries[-1]
             assert [
                 {
                     "name": "map_col",
@@ -651,19 +685,14 @@ def test_get_checks():
 
     @app.route("/v1/sql/", methods=["POST"])
     def index():
-        json = flask.request.json
-        table_name = json["parameters"][1]
-        response_rows = (
-            '"rows":[ ["CHECK((x<y))" , "(x<y)" ] ]'
-            if table_name == "t2"
-            else '"rows":[]'
-        )
+        # one query for all tables of the schema
+        response_rows = '"rows":[ ["t2", "CHECK((x<y))" , "(x<y)" ] ]'
         resp = f"""{{
           "schema": [
-            "string","string"
+            "string","string","string"
           ],
           "columns": [
-            "name", "sqltext"
+            "table_name", "name", "sqltext"
           ],
           {response_rows}
         }}"""
@@ -712,3 +741,389 @@ class NotImplementedTest(unittest.TestCase):
         dialect = RadioDuckDialect(dbapi=radio_duck)
         with self.assertRaises(NotImplementedError):
             dialect.get_table_comment(None, None)
+
+
+def test_stream_results():
+    from http_server_mock import HttpServerMock
+    from sqlalchemy import text
+
+    from radio_duck.results import ndjson_content_type
+
+    app = HttpServerMock(__name__)
+    accepts = []
+
+    @app.route("/v1/sql/", methods=["POST"])
+    def index():
+        accepts.append(flask.request.headers["Accept"])
+        rows = ", ".join(f"[{i}]" for i in range(25))
+        return (
+            f"""{{"schema": ["NUMBER"], "columns": ["n"], "rows": [{rows}]}}"""
+        )
+
+    with app.run("localhost", http_server_port):
+        with engine.connect() as conn:
+            result = conn.execution_options(
+                stream_results=True, yield_per=10
+            ).execute(text("select n from numbers"))
+            assert result.cursor.stream
+            assert 10 == result.cursor.arraysize
+            sizes = [len(partition) for partition in result.partitions(10)]
+            assert [10, 10, 5] == sizes
+            assert ndjson_content_type in accepts[-1]
+
+            rows = conn.execute(text("select n from numbers")).fetchall()
+            assert 25 == len(rows)
+            assert ndjson_content_type not in accepts[-1]
+
+
+def test_bulk_insert_uses_one_request():
+    from http_server_mock import HttpServerMock
+    from sqlalchemy import Column, Integer, MetaData, String, Table
+
+    app = HttpServerMock(__name__)
+    requests = []
+
+    @app.route("/v1/sql/", methods=["POST"])
+    def index():
+        requests.append(flask.request.json)
+        return '{"schema": ["NUMBER"], "columns": ["Count"], "rows": [[3]]}'
+
+    pond = Table(
+        "pond",
+        MetaData(),
+        Column("duck_type", String),
+        Column("total", Integer),
+    )
+    with app.run("localhost", http_server_port):
+        with engine.connect() as conn:
+            conn.execute(
+                pond.insert(),
+                [
+                    {"duck_type": "mallard", "total": 1},
+                    {"duck_type": "teal", "total": 2},
+                    {"duck_type": "eider", "total": 3},
+                ],
+            )
+            assert 1 == len(requests)
+            assert 6 == len(requests[0]["parameters"])
+
+
+def test_result_cache_bypass_option():
+    from http_server_mock import HttpServerMock
+    from sqlalchemy import text
+
+    app = HttpServerMock(__name__)
+    queries = []
+
+    @app.route("/v1/sql/", methods=["POST"])
+    def index():
+        queries.append(flask.request.json["sql"])
+        return '{"schema": ["NUMBER"], "columns": ["n"], "rows": [[1]]}'
+
+    cached_engine = create_engine(url + "&result_cache_size=16")
+    with app.run("localhost", http_server_port):
+        with cached_engine.connect() as conn:
+            conn.execute(text("select n from numbers")).fetchall()
+            conn.execute(text("select n from numbers")).fetchall()
+            assert 1 == len(queries)
+            conn.execution_options(radio_duck_cache=False).execute(
+                text("select n from numbers")
+            ).fetchall()
+            assert 2 == len(queries)
+    cached_engine.dispose()
+
+
+def test_timeout_option():
+    from http_server_mock import HttpServerMock
+    from sqlalchemy import text
+
+    app = HttpServerMock(__name__)
+    timeouts = []
+
+    @app.route("/v1/sql/", methods=["POST"])
+    def index():
+        timeouts.append(flask.request.json["timeout"])
+        return '{"schema": ["NUMBER"], "columns": ["n"], "rows": [[1]]}'
+
+    engine = create_engine(url + "&query_timeout_sec=60")
+    with app.run("localhost", http_server_port):
+        with engine.connect() as conn:
+            conn.execute(text("select n from numbers")).fetchall()
+            conn.execution_options(radio_duck_timeout_sec=5).execute(
+                text("select n from numbers")
+            ).fetchall()
+    engine.dispose()
+    assert [60, 5] == timeouts
+
+
+def test_reflection_cache():
+    from http_server_mock import HttpServerMock
+    from sqlalchemy import inspect, text
+
+    app = HttpServerMock(__name__)
+    queries = []
+
+    @app.route("/v1/sql/", methods=["POST"])
+    def index():
+        queries.append(flask.request.json["sql"])
+        return (
+            '{"schema": ["STRING", "NUMBER", "STRING", "STRING", "bool",'
+            ' "STRING", "bool"], "columns": ["table_name", "cid", "name",'
+            ' "type", "notnull", "dflt_value", "pk"], "rows": [["pond", 1,'
+            ' "total", "INTEGER", false, null, false]]}'
+        )
+
+    # info_cache of a single inspector
+    dialect = RadioDuckDialect(dbapi=radio_duck)
+    with app.run("localhost", http_server_port):
+        with engine.connect() as conn:
+            info_cache = {}
+            for _ in range(2):
+                dialect.get_columns(
+                    conn, "pond", "main", info_cache=info_cache
+                )
+            assert 1 == len(queries)
+            dialect.get_columns(conn, "pond", "main", info_cache={})
+            assert 2 == len(queries)
+
+        # across inspectors of an engine
+        queries.clear()
+        cached_engine = create_engine(url + "&reflection_cache_ttl_sec=60")
+        columns = inspect(cached_engine).get_columns("pond", "main")
+        columns[0]["name"] = "changed by caller"
+        columns = inspect(cached_engine).get_columns("pond", "main")
+        assert "total" == columns[0]["name"]
+        assert 1 == len(queries)
+
+        with cached_engine.connect() as conn:
+            conn.execute(text("alter table pond add column n int"))
+        inspect(cached_engine).get_columns("pond", "main")
+        assert 3 == len(queries), "ddl must invalidate reflected metadata"
+    cached_engine.dispose()
+
+
+def test_metadata_reflect_queries_once_per_schema():
+    import json
+
+    from http_server_mock import HttpServerMock
+    from sqlalchemy import MetaData
+
+    app = HttpServerMock(__name__)
+    queries = []
+    tables = ["pond", "lake", "river"]
+
+    def rows(columns, values):
+        return json.dumps(
+            {
+                "schema": ["STRING"] * len(columns),
+                "columns": columns,
+                "rows": values,
+            }
+        )
+
+    @app.route("/v1/sql/", methods=["POST"])
+    def index():
+        json_body = flask.request.json
+        queries.append((json_body["sql"], json_body["parameters"]))
+        sql = json_body["sql"]
+        if "pg_tables" in sql:
+            return rows(["tablename"], [[t] for t in tables])
+        if "duckdb_columns" in sql:
+            return rows(
+                ["table_name", "cid", "name", "type"]
+                + ["notnull", "dflt_value", "pk"],  # noqa: W503
+                [[t, 1, "id", "INTEGER", True, None, True] for t in tables],
+            )
+        if "PRIMARY KEY" in json_body["parameters"]:
+            return rows(
+                ["table_name", "name", "column_names"],
+                [[t, "PRIMARY KEY(id)", ["id"]] for t in tables],
+            )
+        return rows(["table_name", "name", "column_names"], [])
+
+    with app.run("localhost", http_server_port):
+        reflect_engine = create_engine(url)
+        metadata = MetaData()
+        metadata.reflect(bind=reflect_engine)
+        reflect_engine.dispose()
+    assert sorted(tables) == sorted(metadata.tables)
+    assert ["id"] == [c.name for c in metadata.tables["pond"].primary_key]
+    # table names, then one query per kind of metadata for all tables,
+    # not one per table
+    assert 7 == len(queries), queries
+    assert len(queries) == len({json.dumps(q) for q in queries})
+
+
+def test_get_multi_reflection():
+    from http_server_mock import HttpServerMock
+    from sqlalchemy import types
+
+    app = HttpServerMock(__name__)
+    queries = []
+
+    @app.route("/v1/sql/", methods=["POST"])
+    def index():
+        sql = flask.request.json["sql"]
+        queries.append(sql)
+        if "pg_tables" in sql:
+            return (
+                '{"schema": ["STRING"], "columns": ["tablename"],'
+                ' "rows": [["pond"], ["lake"]]}'
+            )
+        if "duckdb_columns" in sql:
+            return (
+                '{"schema": ["STRING", "NUMBER", "STRING", "STRING", "bool",'
+                ' "STRING", "bool"], "columns": ["table_name",'
+                ' "column_index", "column_name", "data_type", "notnull",'
+                ' "column_default", "pk"], "rows": [["pond", 1, "duck_type",'
+                ' "VARCHAR", true, null, true], ["pond", 2, "total",'
+                ' "INTEGER", false, "0", false], ["lake", 1, "name",'
+                ' "VARCHAR", false, null, false]]}'
+            )
+        return (
+            '{"schema": ["STRING", "STRING", "STRING"], "columns":'
+            ' ["table_name", "name", "column_names"], "rows": [["pond",'
+            ' "PRIMARY KEY(duck_type)", ["duck_type"]]]}'
+        )
+
+    dialect = RadioDuckDialect(dbapi=radio_duck)
+    with app.run("localhost", http_server_port):
+        with engine.connect() as conn:
+            info_cache = {}
+            columns = dict(
+                dialect.get_multi_columns(conn, info_cache=info_cache)
+            )
+            assert 2 == len(queries), "columns of all tables and table names"
+            # keyed by the schema as given, None for the default schema
+            assert ["duck_type", "total"] == [
+                c["name"] for c in columns[(None, "pond")]
+            ]
+            assert types.String == columns[(None, "lake")][0]["type"]
+            assert not columns[(None, "pond")][0]["nullable"]
+
+            # per table reflection reuses what get_multi fetched
+            assert columns[(None, "lake")] == dialect.get_columns(
+                conn, "lake", None, info_cache=info_cache
+            )
+            assert 2 == len(queries)
+
+            pks = dict(
+                dialect.get_multi_pk_constraint(
+                    conn, "main", info_cache=info_cache
+                )
+            )
+            assert 3 == len(queries), "table names come from info_cache"
+            assert ["duck_type"] == pks[("main", "pond")][
+                "constrained_columns"
+            ]
+            assert [] == pks[("main", "lake")]["constrained_columns"]
+
+            uniques = dict(
+                dialect.get_multi_unique_constraints(
+                    conn, "main", filter_names=["lake"]
+                )
+            )
+            assert [("main", "lake")] == list(uniques)
+
+
+def test_get_multi_reflection_of_views_and_temporary_tables():
+    import enum
+
+    from http_server_mock import HttpServerMock
+
+    try:
+        from sqlalchemy.engine.reflection import ObjectKind, ObjectScope
+    except ImportError:
+        # sqlalchemy < 2.0, the same flags
+        class ObjectKind(enum.Flag):
+            TABLE = enum.auto()
+            VIEW = enum.auto()
+            MATERIALIZED_VIEW = enum.auto()
+            ANY_VIEW = VIEW | MATERIALIZED_VIEW
+            ANY = TABLE | VIEW | MATERIALIZED_VIEW
+
+        class ObjectScope(enum.Flag):
+            DEFAULT = enum.auto()
+            TEMPORARY = enum.auto()
+            ANY = DEFAULT | TEMPORARY
+
+    app = HttpServerMock(__name__)
+
+    def names(name):
+        return (
+            '{"schema": ["STRING"], "columns": ["name"], "rows": [["'
+            + name  # noqa: W503
+            + '"]]}'  # noqa: W503
+        )
+
+    @app.route("/v1/sql/", methods=["POST"])
+    def index():
+        sql = flask.request.json["sql"]
+        if "pg_tables" in sql:
+            return names("pond")
+        if "TEMPORARY" in sql:
+            return names("scratch")
+        if "duckdb_views where temporary" in sql:
+            return names("recent")
+        if "duckdb_views" in sql:
+            return names("big_ducks")
+        return (
+            '{"schema": ["STRING", "NUMBER", "STRING", "STRING", "bool",'
+            ' "STRING", "bool"], "columns": ["table_name", "column_index",'
+            ' "column_name", "data_type", "notnull", "column_default", "pk"],'
+            ' "rows": [["pond", 1, "n", "INTEGER", false, null, false],'
+            ' ["big_ducks", 1, "n", "INTEGER", false, null, false],'
+            ' ["scratch", 1, "n", "INTEGER", false, null, false],'
+            ' ["recent", 1, "n", "INTEGER", false, null, false]]}'
+        )
+
+    dialect = RadioDuckDialect(dbapi=radio_duck)
+    with app.run("localhost", http_server_port):
+        with engine.connect() as conn:
+
+            def reflected(kind, scope):
+                columns = dialect.get_multi_columns(
+                    conn, "main", kind=kind, scope=scope
+                )
+                return sorted(table for _, table in dict(columns))
+
+            assert ["pond"] == reflected(ObjectKind.TABLE, ObjectScope.DEFAULT)
+            assert ["big_ducks"] == reflected(
+                ObjectKind.VIEW, ObjectScope.DEFAULT
+            )
+            assert ["big_ducks", "pond"] == reflected(
+                ObjectKind.ANY, ObjectScope.DEFAULT
+            )
+            assert ["recent", "scratch"] == reflected(
+                ObjectKind.ANY, ObjectScope.TEMPORARY
+            )
+            assert ["big_ducks", "pond", "recent", "scratch"] == reflected(
+                ObjectKind.ANY, ObjectScope.ANY
+            )
+
+
+def test_decode_types_through_engine():
+    import datetime
+    import decimal
+
+    from http_server_mock import HttpServerMock
+    from sqlalchemy import text
+
+    app = HttpServerMock(__name__)
+
+    @app.route("/v1/sql/", methods=["POST"])
+    def index():
+        return (
+            '{"schema": ["TIMESTAMP", "DECIMAL(6,2)", "STRING"], "columns":'
+            ' ["seen", "weight", "duck_type"], "rows": [["2023-10-01'
+            ' 12:00:00", 1.5, "mallard"]]}'
+        )
+
+    typed_engine = create_engine(url + "&decode_types=seen,weight")
+    with app.run("localhost", http_server_port):
+        with typed_engine.connect() as conn:
+            row = conn.execute(text("select * from pond")).fetchone()
+            assert datetime.datetime(2023, 10, 1, 12) == row.seen
+            assert decimal.Decimal("1.50") == row.weight
+            assert "mallard" == row.duck_type
+    typed_engine.dispose()
@@ -0,0 +1,576 @@
+"""
+Scatter-gather over radio_duck shards.
+
+A table partitioned across several radio_duck nodes, ex: by date, is
+queried through a FederatedConnection: the same query and parameters go
+to every shard in parallel and the shards' rows are merged as they are
+fetched. Rows can be merged by
+
+concat: shard after shard, in the order the shards were given.
+ordered: k-way merge on the ORDER BY key every shard sorted by.
+aggregate: SUM, COUNT, MIN and MAX columns are combined per group,
+the other columns being the group key.
+
+Catalog queries, reading from information_schema, duckdb_*(), pg_* or
+sqlite_master, and PRAGMAs are only sent to the first shard, the shards
+share their schema. Statements that write are refused, write through the
+connection of a shard instead.
+"""
+import heapq
+import itertools
+import logging
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Union
+
+from radio_duck.balancer import parse_endpoints
+from radio_duck.db import Connection, Cursor, check_closed, new_query_id
+from radio_duck.exceptions import (  # noqa: E501
+    InterfaceError,
+    NotSupportedError,
+    ProgrammingError,
+)
+from radio_duck.statements import is_read_only, normalize, strip_comments
+
+merge_modes = ["concat", "ordered", "aggregate"]
+# how partial aggregates of the shards are combined.
+# a count is the sum of the shards' counts.
+aggregate_functions = ["sum", "count", "min", "max"]
+
+# duckdb's default_null_order settings, where NULLs sort
+null_orders = [
+    "nulls_last",
+    "nulls_first",
+    "nulls_first_on_asc_last_on_desc",
+    "nulls_last_on_asc_first_on_desc",
+]
+
+# a PRAGMA statement or a catalog table read from, in a query whose
+# string literals are emptied
+_catalog = re.compile(
+    r"(?:^|;)\s*pragma\b"
+    r"|\b(?:from|join)\s+(?:\"?\w+\"?\s*\.\s*)*\"?"
+    r"(?:information_schema|duckdb_\w+|pg_\w+|sqlite_master)\b",
+    re.IGNORECASE,
+)
+# a trailing ORDER BY of plain columns and an optional LIMIT
+_order_by = re.compile(
+    r"\border\s+by\s+((?:[\w\"]+(?:\s+(?:asc|desc))?"
+    r"(?:\s+nulls\s+(?:first|last))?\s*,\s*)*"
+    r"[\w\"]+(?:\s+(?:asc|desc))?(?:\s+nulls\s+(?:first|last))?)"
+    r"(?:\s+limit\s+(\d+))?\s*;?\s*$",
+    re.IGNORECASE,
+)
+# rows fetched from a shard at a time while merging
+_shard_fetch_size = 1000
+
+
+class FederatedConnection(object):
+    """
+    A DB-API 2.0 (PEP 249) connection to several shards, one
+    radio_duck Connection each.
+
+    Do not create this object directly; use globals.connect(shards=...).
+    """
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, exc_traceback):
+        self.close()
+
+    def __init__(self, *args, **kwargs):
+        """
+        :param kwargs: as for Connection, with shards as 'host:port,..'
+        or a sequence of them. host:port, if given, is the first shard.
+        merge, order_by and aggregate set the default merge of cursors,
+        see FederatedCursor.execute()
+        :raise InterfaceError if replicas (hosts) are also given
+        """
+        kwargs = dict(kwargs)
+        shards = kwargs.pop("shards")
+        if kwargs.get("hosts"):
+            raise InterfaceError(
+                msg="hosts (replicas) cannot be combined with shards"
+            )
+        addresses = parse_endpoints(
+            kwargs.pop("host", None), kwargs.pop("port", 8000), shards
+        )
+        self.merge = _check_merge(kwargs.pop("merge", "concat"))
+        self.order_by = kwargs.pop("order_by", None)
+        self.aggregate = kwargs.pop("aggregate", None)
+        # where NULLs sort in an ordered merge unless the ORDER BY says,
+        # as the shards' default_null_order
+        self.default_null_order = _check_null_order(
+            kwargs.pop("default_null_order", "nulls_last")
+        )
+        self.closed = False
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._executor_lock = threading.Lock()
+        self.shards: List[Connection] = []
+        try:
+            for host, port in addresses:
+                self.shards.append(Connection(host=host, port=port, **kwargs))
+        except Exception:
+            self.close()
+            raise
+
+    def close(self):
+        for shard in self.shards:
+            if not shard.closed:
+                shard.close()
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+        self.closed = True
+
+    @check_closed
+    def commit(self):
+        self.shards[0].commit()
+
+    def rollback(self):
+        self.shards[0].rollback()
+
+    @check_closed
+    def cursor(self, *args, **kwargs):
+        return FederatedCursor(self, **kwargs)
+
+    @check_closed
+    def cancel(self, query_id: Optional[str] = None) -> bool:
+        """
+        Ask every shard to stop a running query, see Connection.cancel()
+        :return: True if any shard stopped a query
+        """
+        return any([shard.cancel(query_id) for shard in self.shards])
+
+    def _map(self, fn, items: list) -> list:
+        """
+        Call fn on every item in parallel.
+        :return: what fn returned, in the order of the items
+        :raise the first error raised by fn, once all calls are done
+        """
+        if len(items) == 1:
+            return [fn(items[0])]
+        with self._executor_lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=len(self.shards),
+                    thread_name_prefix="radio_duck_shard",
+                )
+        futures = [self._executor.submit(fn, item) for item in items]
+        # wait for all, a shard still sending must not be left behind
+        errors = [f.exception() for f in futures]
+        for error in errors:
+            if error is not None:
+                raise error
+        return [f.result() for f in futures]
+
+
+class FederatedCursor(object):
+    """
+    A DB-API 2.0 (PEP 249) cursor over one Cursor per shard.
+
+    Do not create this object directly; use FederatedConnection.cursor().
+    """
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, exc_traceback):
+        self.close()
+
+    def __init__(self, connection: FederatedConnection, **kwargs):
+        self.closed = False
+        self._connection = connection
+        self._cursors: List[Cursor] = [
+            shard.cursor(**kwargs) for shard in connection.shards
+        ]
+        # cursors answering the last execute
+        self._executed: List[Cursor] = []
+        self._rows: Optional[Iterator] = None
+        self._rowcount = -1
+        self._arraysize = 1
+        # id of the next query, sent to all shards
+        self._next_query_id: Optional[str] = None
+
+    @property
+    def connection(self) -> FederatedConnection:
+        return self._connection
+
+    @property
+    def query_id(self) -> Optional[str]:
+        """
+        Id of the last executed query, the same on every shard.
+        """
+        return self._cursors[0].query_id
+
+    def reserve_query_id(self) -> str:
+        """
+        See Cursor.reserve_query_id(), the id is used on every shard.
+        """
+        if self._next_query_id is None:
+            self._next_query_id = new_query_id()
+        return self._next_query_id
+
+    def cancel(self) -> bool:
+        """
+        Ask every shard to stop this cursor's running query.
+        :return: True if any shard stopped it
+        """
+        return any([cursor.cancel() for cursor in self._cursors])
+
+    @property
+    def rowcount(self):
+        return self._rowcount
+
+    def callproc(self, procname, *args):
+        raise NotSupportedError(msg="callproc not supported on cursor")
+
+    def close(self):
+        for cursor in self._cursors:
+            cursor.close()
+        self._rows = None
+        self.closed = True
+
+    @check_closed
+    def execute(
+        self,
+        query: Union[bytes, str],
+        parameters=None,
+        merge: Optional[str] = None,
+        order_by: Union[str, List[str], None] = None,
+        aggregate: Union[str, Dict[str, str], None] = None,
+        **kwargs,
+    ):
+        """
+        Execute a query on every shard, in parallel.
+
+        :param merge: 'concat', 'ordered' or 'aggregate', defaults to
+        the connection's
+        :param order_by: key of an ordered merge, ex: 'day desc, id'.
+        defaults to the connection's, else to the query's trailing
+        ORDER BY. A LIMIT following it applies to the merged rows.
+        NULLs sort as NULLS FIRST or LAST say, else as the connection's
+        default_null_order, duckdb's NULLS LAST by default.
+        :param aggregate: columns combined by an aggregate merge, ex:
+        'total:sum,n:count,first_seen:min' or {'total': 'sum', ..}.
+        defaults to the connection's
+        :param kwargs: passed on to Cursor.execute(), ex: timeout_sec
+        :raise NotSupportedError for statements that write
+        :raise ProgrammingError for an invalid merge
+        :raise errors of Cursor.execute() of any shard
+        """
+        if query is None or "" == query.strip():
+            raise ProgrammingError(msg="query is empty")
+        self._rows = None
+        self._rowcount = -1
+        if _is_catalog_query(query):
+            # the shards share their schema
+            self._cursors[0].execute(query, parameters, **kwargs)
+            self._executed = self._cursors[:1]
+            self._rows = _shard_rows(self._cursors[0])
+            return
+        if not is_read_only(query):
+            raise NotSupportedError(
+                msg="only reads can be sent to all shards. write through the connection of a shard, see FederatedConnection.shards"  # noqa: E501,B950
+            )
+        merge = _check_merge(merge or self._connection.merge)
+        limit = None
+        if merge == "ordered":
+            order_by = order_by or self._connection.order_by
+            if order_by is None:
+                order_by, limit = parse_order_by(query)
+            order_by = _order_by_columns(
+                order_by, self._connection.default_null_order
+            )
+        elif merge == "aggregate":
+            aggregate = _aggregate_columns(
+                aggregate or self._connection.aggregate
+            )
+
+        query_id = self._next_query_id or new_query_id()
+        self._next_query_id = None
+        for cursor in self._cursors:
+            cursor._next_query_id = query_id
+
+        def execute(cursor: Cursor):
+            cursor.execute(query, parameters, **kwargs)
+
+        try:
+            self._connection._map(execute, self._cursors)
+        except Exception as e:
+            logging.error("error in querying shards {}".format(e))
+            for cursor in self._cursors:
+                cursor._close_result()
+            raise
+        self._executed = self._cursors
+        names = [column[0] for column in self._cursors[0].description or []]
+        shards = [_shard_rows(cursor) for cursor in self._cursors]
+        if merge == "ordered":
+            rows = heapq.merge(*shards, key=_sort_key(order_by, names))
+            self._rows = (
+                rows if limit is None else itertools.islice(rows, limit)
+            )
+        elif merge == "aggregate":
+            merged = _aggregate(shards, _aggregate_indexes(aggregate, names))
+            self._rowcount = len(merged)
+            self._rows = iter(merged)
+        else:
+            self._rows = itertools.chain(*shards)
+            rowcounts = [cursor.rowcount for cursor in self._cursors]
+            if all(rowcount >= 0 for rowcount in rowcounts):
+                self._rowcount = sum(rowcounts)
+
+    @check_closed
+    def executemany(self, query: Union[bytes, str], seq_of_parameters):
+        raise NotSupportedError(
+            msg="executemany writes, use the connection of a shard"
+        )
+
+    @check_closed
+    def fetchone(self) -> Optional[tuple]:
+        if self._rows is None:
+            raise ProgrammingError(msg="cannot fetchone() before execute()")
+        return next(self._rows, None)
+
+    @check_closed
+    def fetchmany(self, size: Optional[int] = None) -> List[tuple]:
+        if self._rows is None:
+            raise ProgrammingError(msg="cannot fetchmany before execute()")
+        if size is None or size <= 0:
+            size = self._arraysize
+        return list(itertools.islice(self._rows, size))
+
+    @check_closed
+    def fetchall(self) -> List[tuple]:
+        if self._rows is None:
+            raise ProgrammingError(msg="cannot fetchall before execute()")
+        return list(self._rows)
+
+    def nextset(self):
+        """Move to the next available result set (not supported)."""
+        raise NotSupportedError(msg="cursor.nextset")
+
+    @property
+    def arraysize(self):
+        return self._arraysize
+
+    @arraysize.setter
+    def arraysize(self, size):
+        self._arraysize = size
+
+    def setinputsizes(self, sizes):
+        """Preallocate memory for the parameters (no-op)."""
+        pass
+
+    def setoutputsize(self, size, column=None):
+        """Preallocate memory for the result set (no-op)."""
+        pass
+
+    @property
+    def description(self):
+        """
+        Description of the first shard's result, the shards
+        answer with the same columns.
+        """
+        if self.closed or not self._executed:
+            return None
+        return self._executed[0].description
+
+
+def parse_order_by(query: str) -> Tuple[str, Optional[int]]:
+    """
+    :return: columns of the query's trailing ORDER BY and the LIMIT
+    following it, if any
+    :raise ProgrammingError if the query has no ORDER BY of plain columns
+    """
+    match = _order_by.search(strip_comments(query))
+    if match is None:
+        raise ProgrammingError(
+            msg="an ordered merge needs order_by or a query ending with ORDER BY of plain columns"  # noqa: E501,B950
+        )
+    limit = match.group(2)
+    return match.group(1), None if limit is None else int(limit)
+
+
+def _check_merge(merge: str) -> str:
+    if merge not in merge_modes:
+        raise ProgrammingError(
+            msg=f"unknown merge {merge}. supported: {merge_modes}"
+        )
+    return merge
+
+
+def _check_null_order(null_order: str) -> str:
+    if null_order.lower() not in null_orders:
+        raise ProgrammingError(
+            msg=f"unknown default_null_order {null_order}. supported: {null_orders}"  # noqa: E501,B950
+        )
+    return null_order.lower()
+
+
+def _is_catalog_query(query) -> bool:
+    if not isinstance(query, str):
+        return False
+
+    def literal(quoted: str) -> str:
+        # names in string literals are not tables, quoted identifiers are
+        return quoted if quoted.startswith('"') else "''"
+
+    return bool(_catalog.search(normalize(query, literal)))
+
+
+def _order_by_columns(
+    order_by, null_order: str = "nulls_last"
+) -> List[Tuple[str, bool, bool]]:
+    """
+    :param order_by: 'a desc, b nulls first' or ['a desc', 'b']
+    :param null_order: where NULLs sort unless the column says,
+    see null_orders
+    :return: (column name, descending, nulls first) triples
+    """
+    if isinstance(order_by, str):
+        order_by = order_by.split(",")
+    columns = []
+    for entry in order_by:
+        words = [word.lower() for word in entry.split()]
+        if not words:
+            continue
+        descending = len(words) > 1 and words[1] == "desc"
+        if "nulls" in words[1:-1]:
+            nulls_first = words[words.index("nulls") + 1] == "first"
+        else:
+            nulls_first = null_order in (
+                "nulls_first",
+                (
+                    "nulls_last_on_asc_first_on_desc"
+                    if descending
+                    else "nulls_first_on_asc_last_on_desc"
+                ),
+            )
+        columns.append((entry.split()[0].strip('"'), descending, nulls_first))
+    if not columns:
+        raise ProgrammingError(msg="an ordered merge needs order_by columns")
+    return columns
+
+
+def _aggregate_columns(aggregate) -> Dict[str, str]:
+    """
+    :param aggregate: 'a:sum,b:count' or {'a': 'sum', 'b': 'count'}
+    """
+    if isinstance(aggregate, str):
+        aggregate = dict(
+            entry.strip().split(":", 1)
+            for entry in aggregate.split(",")
+            if entry.strip()
+        )
+    if not aggregate:
+        raise ProgrammingError(
+            msg="an aggregate merge needs aggregate columns, ex: 'total:sum'"
+        )
+    columns = {}
+    for name, function in aggregate.items():
+        function = function.strip().lower()
+        if function not in aggregate_functions:
+            raise NotSupportedError(
+                msg=f"cannot combine {function} of shards. supported: {aggregate_functions}, ex: avg as sum and count"  # noqa: E501,B950
+            )
+        columns[name.strip()] = function
+    return columns
+
+
+def _column_index(name: str, names: List[str]) -> int:
+    try:
+        return names.index(name)
+    except ValueError:
+        raise ProgrammingError(
+            msg=f"column {name} to merge by is not in the result {names}"
+        ) from None
+
+
+def _shard_rows(cursor: Cursor) -> Iterator:
+    while True:
+        rows = cursor.fetchmany(_shard_fetch_size)
+        if not rows:
+            return
+        yield from rows
+
+
+class _Descending(object):
+    """
+    Reverses the order of a value within a sort key.
+    """
+
+    __slots__ = ("value",)
+
+    def __init__(self, value):
+        self.value = value
+
+    def __lt__(self, other):
+        return other.value < self.value
+
+    def __eq__(self, other):
+        return self.value == other.value
+
+
+def _sort_key(order_by: List[Tuple[str, bool, bool]], names: List[str]):
+    indexes = [
+        (_column_index(name, names), descending, nulls_first)
+        for name, descending, nulls_first in order_by
+    ]
+
+    def key(row) -> tuple:
+        # (sorts after NULLs, value) pairs place NULLs first or last
+        # and never compare them
+        parts = []
+        for index, descending, nulls_first in indexes:
+            value = row[index]
+            parts.append(
+                (value is not None) if nulls_first else (value is None)
+            )
+            parts.append(_Descending(value) if descending else value)
+        return tuple(parts)
+
+    return key
+
+
+def _aggregate_indexes(
+    aggregate: Dict[str, str], names: List[str]
+) -> Dict[int, str]:
+    return {
+        _column_index(name, names): function
+        for name, function in aggregate.items()
+    }
+
+
+def _combine(function: str, current, value):
+    if value is None:
+        return current
+    if current is None:
+        return value
+    if function == "min":
+        return min(current, value)
+    if function == "max":
+        return max(current, value)
+    return current + value
+
+
+def _aggregate(shards: List[Iterator], aggregate: Dict[int, str]) -> list:
+    """
+    :param aggregate: function of each combined column by index,
+    the other columns are the group key
+    :return: a row per group, in the order groups were first seen
+    """
+    groups: Dict[tuple, List[Any]] = {}
+    for row in itertools.chain(*shards):
+        group = tuple(
+            value for index, value in enumerate(row) if index not in aggregate
+        )
+        merged = groups.get(group)
+        if merged is None:
+            groups[group] = list(row)
+            continue
+        for index, function in aggregate.items():
+            merged[index] = _combine(function, merged[index], row[index])
+    return list(groups.values())
@@ -0,0 +1,238 @@
+import pytest
+
+from radio_duck import NotSupportedError, ProgrammingError, connect
+from radio_duck.connection_test import http_server_port
+from radio_duck.federated import FederatedCursor, parse_order_by
+
+first_port = http_server_port + 15
+second_port = http_server_port + 16
+
+
+def _shards(first_rows, second_rows, requests=None):
+    import json
+
+    from flask import request
+    from http_server_mock import HttpServerMock
+
+    shards = []
+    for name, rows in (("first", first_rows), ("second", second_rows)):
+        app = HttpServerMock(name)
+
+        def index(name=name, rows=rows):
+            if requests is not None:
+                requests.append((name, json.loads(request.data)["sql"]))
+            return json.dumps(
+                {
+                    "schema": ["STRING", "NUMBER", "NUMBER"],
+                    "columns": ["kind", "total", "n"],
+                    "rows": rows,
+                }
+            )
+
+        app.add_url_rule("/v1/sql/", name, index, methods=["POST"])
+        shards.append(app)
+    return shards
+
+
+def _connect(**kwargs):
+    return connect(
+        host="localhost",
+        port=first_port,
+        shards=f"localhost:{second_port}",
+        api="/v1/sql/",
+        scheme="http",
+        **kwargs,
+    )
+
+
+def test_concat_and_ordered_merge():
+    first, second = _shards(
+        [["c", 4, 1], ["a", 1, 1], ["d", None, 1]],
+        [["b", 5, 1], ["e", 2, 1]],
+    )
+    with (
+        first.run("localhost", first_port),
+        second.run("localhost", second_port),
+    ):
+        with _connect() as conn:
+            assert 2 == len(conn.shards)
+            with conn.cursor() as cursor:
+                cursor.execute("select * from ducks where day > ?", [1])
+                assert ["kind", "total", "n"] == [
+                    column[0] for column in cursor.description
+                ]
+                assert ["c", "a", "d", "b", "e"] == [
+                    row[0] for row in cursor.fetchall()
+                ]
+                assert 5 == cursor.rowcount
+
+                cursor.execute(
+                    "select * from ducks order by total desc", merge="ordered"
+                )
+                assert ["b"] == [row[0] for row in cursor.fetchmany(1)]
+                assert ["c", "e"] == [row[0] for row in cursor.fetchmany(2)]
+                assert ["a", "d"] == [
+                    row[0] for row in cursor.fetchall()
+                ], "nulls last"
+
+                cursor.execute(
+                    "select * from ducks", merge="ordered", order_by="kind"
+                )
+                assert ["b", "c", "a", "d", "e"] == [
+                    row[0] for row in cursor.fetchall()
+                ], "each shard's rows are merged, not sorted"
+
+
+def test_ordered_merge_null_order():
+    first, second = _shards(
+        [["d", None, 1], ["a", 1, 1], ["c", 4, 1]],
+        [["e", None, 1], ["b", 5, 1]],
+    )
+    with (
+        first.run("localhost", first_port),
+        second.run("localhost", second_port),
+    ):
+        with _connect() as conn:
+            with conn.cursor() as cursor:
+                cursor.execute(
+                    "select * from ducks order by total nulls first",
+                    merge="ordered",
+                )
+                assert ["d", "e", "a", "c", "b"] == [
+                    row[0] for row in cursor.fetchall()
+                ]
+        with _connect(
+            default_null_order="nulls_first_on_asc_last_on_desc"
+        ) as conn:  # noqa: E501
+            with conn.cursor() as cursor:
+                cursor.execute(
+                    "select * from ducks order by total asc",
+                    merge="ordered",
+                )
+                assert ["d", "e", "a", "c", "b"] == [
+                    row[0] for row in cursor.fetchall()
+                ]
+        with pytest.raises(ProgrammingError):
+            _connect(default_null_order="nulls_somewhere")
+
+
+def test_reserved_query_id_is_the_next_query_on_every_shard():
+    first, second = _shards([["a", 1, 1]], [["b", 2, 1]])
+    with (
+        first.run("localhost", first_port),
+        second.run("localhost", second_port),
+    ):
+        with _connect() as conn:
+            with conn.cursor() as cursor:
+                query_id = cursor.reserve_query_id()
+                cursor.execute("select * from ducks")
+                assert [query_id, query_id] == [
+                    shard.query_id for shard in cursor._cursors
+                ]
+                cursor.execute("select * from ducks")
+                assert query_id != cursor.query_id
+                assert {cursor.query_id} == {
+                    shard.query_id for shard in cursor._cursors
+                }
+
+
+def test_aggregate_merge():
+    first, second = _shards(
+        [["mallard", 10, 2], ["teal", 3, 1]],
+        [["teal", 4, 2], ["mallard", None, 1], ["eider", 1, 1]],
+    )
+    with (
+        first.run("localhost", first_port),
+        second.run("localhost", second_port),
+    ):
+        with _connect(
+            merge="aggregate", aggregate="total:sum,n:count"
+        ) as conn:
+            with conn.cursor() as cursor:
+                cursor.execute(
+                    "select kind, sum(x) as total, count(*) as n"
+                    " from ducks group by kind"
+                )
+                assert [
+                    ["mallard", 10, 3],
+                    ["teal", 7, 3],
+                    ["eider", 1, 1],
+                ] == cursor.fetchall()
+                assert 3 == cursor.rowcount
+                with pytest.raises(NotSupportedError):
+                    cursor.execute("select 1", aggregate="total:avg")
+
+
+def test_catalog_queries_and_writes():
+    requests = []
+    first, second = _shards([], [], requests)
+    with (
+        first.run("localhost", first_port),
+        second.run("localhost", second_port),
+    ):
+        with _connect() as conn:
+            with conn.cursor() as cursor:
+                cursor.execute(
+                    "select table_name from information_schema.tables"
+                )
+                assert [] == cursor.fetchall()
+                assert ["first"] == [name for name, _ in requests]
+                for query in (
+                    "select * from pg_catalog.pg_tables",
+                    'select * from "main".duckdb_tables()',
+                    "PRAGMA table_info('ducks')",
+                ):
+                    requests.clear()
+                    cursor.execute(query)
+                    assert ["first"] == [name for name, _ in requests], query
+                for query in (
+                    "select * from ducks where kind = 'pg_x'",
+                    "select duckdb_count from ducks -- information_schema",
+                    "select * from ducks /* from pg_tables */",
+                ):
+                    requests.clear()
+                    cursor.execute(query)
+                    assert ["first", "second"] == sorted(
+                        name for name, _ in requests
+                    ), query
+                with pytest.raises(NotSupportedError):
+                    cursor.execute("insert into ducks values (1)")
+                with pytest.raises(ProgrammingError):
+                    cursor.execute("select * from ducks", merge="ordered")
+
+
+def test_parse_order_by():
+    assert ("day desc, id", None) == parse_order_by(
+        "select * from t order by day desc, id"
+    )
+    assert ("id", 10) == parse_order_by(
+        "select * from t where x in (select x from u order by y)"
+        " ORDER BY id LIMIT 10;"
+    )
+    with pytest.raises(ProgrammingError):
+        parse_order_by("select * from t order by lower(kind)")
+
+
+def test_merge_options_through_engine():
+    from sqlalchemy import create_engine, text
+
+    from radio_duck.dialect_test import url
+
+    first, second = _shards([["a", 1, 1], ["c", 3, 1]], [["b", 2, 1]])
+    engine = create_engine(
+        url.replace(str(http_server_port - 1), str(first_port))
+        + f"&shards=localhost:{second_port}"  # noqa: W503
+    )
+    with (
+        first.run("localhost", first_port),
+        second.run("localhost", second_port),
+    ):
+        with engine.connect() as conn:
+            assert isinstance(
+                conn.connection.cursor(), FederatedCursor
+            ), "the url's shards are used"
+            rows = conn.execution_options(radio_duck_merge="ordered").execute(
+                text("select * from ducks order by total")
+            )
+            assert ["a", "b", "c"] == [row.kind for row in rows]
+    engine.dispose()
@@ -3,10 +3,11 @@
 from typing import Any
 
 from radio_duck.db import Connection
+from radio_duck.federated import FederatedConnection
 
 apilevel = "2.0"
 
-threadsafety = 1
+threadsafety = 2
 
 paramstyle = "qmark"
 
@@ -22,9 +23,56 @@ def connect(*args, **kwargs) -> Any:
     Connect to the database
     :param args:
     :param kwargs: minimum kwargs are host,port,
-    api(endpoint url ex: '/v1/sql'). optional: timeout_sec
+    api(endpoint url ex: '/v1/sql'). optional: timeout_sec,
+    hosts(more replicas, 'host:port,host:port'),
+    balance('round_robin', 'least_outstanding' or 'ewma'),
+    eject_after(failures in a row taking a replica out, default 3),
+    eject_sec(how long a replica stays out, default 30),
+    hedge(resend reads without a response after hedge_percentile of
+    recent response times to another replica or socket, default False),
+    hedge_percentile(default 95), hedge_budget(hedges per read,
+    default 0.05), hedge_min_delay_sec(default 0.005),
+    shards(nodes a table is partitioned over, 'host:port,host:port'.
+    queries are sent to all of them and the rows merged, see
+    radio_duck.federated), merge('concat', 'ordered' or 'aggregate'),
+    order_by, aggregate(default merge options of shards),
+    query_timeout_sec(queries running longer are cancelled,
+    default timeout_sec),
+    cancel_api(endpoint cancelling a query by id, default '/v1/cancel/'),
+    submit(submit queries and poll for results, default False),
+    submit_api, status_api, result_api(default '/v1/submit/',
+    '/v1/status/', '/v1/result/'),
+    poll_wait_sec(longest a long poll is held by the server, default 5),
+    pool_size(max open http connections, default 8),
+    pool_idle_timeout_sec(idle connections are closed after, default 60),
+    result_format('json' or 'arrow', default json),
+    stream(decode rows incrementally while fetching, default False),
+    executemany_batch_size(rows per batched insert request, default 1000),
+    json_codec('auto', 'orjson', 'simdjson', 'ujson' or 'json', default auto),
+    decode_types(True or column names whose json values are converted to
+    datetime, Decimal, bytes, timedelta, uuid when read, default False),
+    compression(advertise gzip/deflate/zstd responses, default True),
+    compress_request('zstd', 'gzip' or 'deflate', default None),
+    compress_request_min_bytes(smaller requests are sent as is,
+    default 16384),
+    result_cache_size(cached responses of read only queries, default 0 off),
+    result_cache_ttl_sec(default 60),
+    result_cache(a radio_duck.cache.ResultCache to share between connections),
+    listeners(callables taking the radio_duck.metrics.QueryMetrics of every
+    execute, ex: a MetricsRegistry or StatsdExporter),
+    slow_query_sec(queries taking at least as long are recorded to
+    conn.slow_log, see radio_duck.slowlog), slow_query_sample_rate(fraction
+    of the other queries recorded, default 0), slow_query_log(rotating
+    jsonl file to record to, default an in memory ring buffer),
+    tracing(True or an opentelemetry Tracer for spans around connect,
+    execute and fetch, see radio_duck.tracing, default False),
+    prepare(prepare sql executed repeatedly and send its handle instead,
+    see Cursor.prepare(), default False), prepare_api(default
+    '/v1/prepare/'), prepared_statements_size(handles kept, default 256)
     :return: Connection object
     :raise ProgrammingError on incorrect scheme
     :raise OperationalError if unable to connect to database
     """
+    if kwargs.get("shards"):
+        return FederatedConnection(*args, **kwargs)
     return Connection(*args, **kwargs)
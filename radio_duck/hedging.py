@@ -0,0 +1,114 @@
+"""
+Hedged requests, to cut the tail latency of reads.
+
+A read that got no response within the hedge delay is sent again, to
+another replica or over another socket, and the first response wins.
+The delay is a high percentile of recent response times, so only the
+slowest requests are hedged. A budget caps the extra load: every read
+earns a fraction of a hedge and a hedge is only sent when a whole one
+has been earned.
+"""
+import collections
+import threading
+from typing import Optional
+
+from radio_duck.exceptions import InterfaceError
+
+
+class Hedger(object):
+    """
+    Tracks response times of reads and decides when to hedge them.
+    """
+
+    def __init__(
+        self,
+        percentile: float = 95,
+        budget: float = 0.05,
+        min_delay_sec: float = 0.005,
+        min_samples: int = 20,
+        window: int = 1000,
+        max_burst: float = 10,
+    ):
+        """
+        :param percentile: of recent response times after which
+        a read is hedged
+        :param budget: hedges per read, ex: 0.05 adds at most 5% requests
+        :param min_delay_sec: reads are never hedged sooner
+        :param min_samples: response times measured before hedging starts
+        :param window: number of recent response times kept
+        :param max_burst: hedges that can be saved up while reads are fast
+        :raise InterfaceError on an invalid percentile or budget
+        """
+        if not 0 < percentile < 100:
+            raise InterfaceError(
+                msg=f"hedge percentile must be within (0, 100): {percentile}"
+            )
+        if not 0 <= budget <= 1:
+            raise InterfaceError(
+                msg=f"hedge budget must be within [0, 1]: {budget}"
+            )
+        self.percentile = percentile
+        self.budget = budget
+        self.min_delay_sec = min_delay_sec
+        self.min_samples = min_samples
+        self.max_burst = max_burst
+        # hedges sent and won, for monitoring
+        self.hedged = 0
+        self.won = 0
+        self._samples = collections.deque(maxlen=window)
+        self._delay_sec: Optional[float] = None
+        # samples recorded since the delay was computed
+        self._stale = 0
+        self._tokens = 0.0
+        self._lock = threading.Lock()
+
+    def record(self, elapsed_sec: float):
+        """
+        :param elapsed_sec: response time of a successful read
+        """
+        with self._lock:
+            self._samples.append(elapsed_sec)
+            self._stale = self._stale + 1
+
+    def delay(self) -> Optional[float]:
+        """
+        :return: seconds to wait for a response before hedging,
+        None until enough response times are known
+        """
+        with self._lock:
+            if len(self._samples) < self.min_samples:
+                return None
+            # sorting the window on every read would cost more than it saves
+            if self._delay_sec is None or self._stale >= self.min_samples:
+                samples = sorted(self._samples)
+                index = int(len(samples) * self.percentile / 100)
+                self._delay_sec = max(
+                    self.min_delay_sec, samples[min(index, len(samples) - 1)]
+                )
+                self._stale = 0
+            return self._delay_sec
+
+    def earn(self):
+        """
+        Called once per read that may be hedged.
+        """
+        with self._lock:
+            self._tokens = min(self.max_burst, self._tokens + self.budget)
+
+    def spend(self) -> bool:
+        """
+        :return: True if the budget allows a hedge, which is then counted
+        """
+        with self._lock:
+            if self._tokens < 1:
+                return False
+            self._tokens = self._tokens - 1
+            self.hedged = self.hedged + 1
+            return True
+
+    def win(self):
+        """
+        Called when a hedge answered before the request it hedged.
+        """
+        with self._lock:
+            self.won = self.won + 1
@@ -0,0 +1,50 @@
+import pytest
+
+from radio_duck import InterfaceError
+from radio_duck.hedging import Hedger
+
+
+def test_delay_is_a_percentile_of_response_times():
+    hedger = Hedger(percentile=90, min_samples=10)
+    for i in range(1, 10):
+        hedger.record(i / 100)
+    assert hedger.delay() is None, "too few response times"
+    hedger.record(0.1)
+    assert 0.1 == hedger.delay()
+    hedger = Hedger(percentile=50, min_samples=10, min_delay_sec=0.5)
+    for _ in range(10):
+        hedger.record(0.01)
+    assert 0.5 == hedger.delay()
+
+
+def test_budget():
+    hedger = Hedger(budget=0.25, max_burst=1)
+    for _ in range(3):
+        hedger.earn()
+    assert not hedger.spend()
+    for _ in range(9):
+        hedger.earn()
+    assert hedger.spend()
+    assert not hedger.spend(), "saved up hedges are capped"
+    assert 1 == hedger.hedged
+    with pytest.raises(InterfaceError):
+        Hedger(percentile=100)
+    with pytest.raises(InterfaceError):
+        Hedger(budget=2)
+
+
+def test_wins_of_concurrent_cursors_add_up():
+    import threading
+
+    hedger = Hedger()
+
+    def win():
+        for _ in range(10000):
+            hedger.win()
+
+    threads = [threading.Thread(target=win) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert 40000 == hedger.won
@@ -0,0 +1,202 @@
+import itertools
+import logging
+from typing import Iterator, Tuple
+
+import pyarrow as pa
+
+from radio_duck.db import check_status, new_query_id, query_id_header
+from radio_duck.exceptions import NotSupportedError, ProgrammingError
+from radio_duck.results import arrow_stream_content_type
+
+parquet_content_type = "application/vnd.apache.parquet"
+ingest_table_header = "X-Radio-Duck-Table"
+
+# statuses of a radio_duck without an ingest endpoint
+_unsupported_statuses = (404, 405, 415, 501)
+
+
+def to_record_batches(data) -> Tuple[pa.Schema, Iterator[pa.RecordBatch]]:
+    """
+    :param data: pyarrow Table, RecordBatch, RecordBatchReader,
+    iterable of RecordBatch or pandas DataFrame
+    :return: schema and iterator of record batches
+    :raise ProgrammingError if data is none of the above or empty
+    """
+    if isinstance(data, pa.Table):
+        return data.schema, iter(data.to_batches())
+    if isinstance(data, pa.RecordBatch):
+        return data.schema, iter([data])
+    if isinstance(data, pa.RecordBatchReader):
+        return data.schema, iter(data)
+    if type(data).__module__.startswith("pandas"):
+        table = pa.Table.from_pandas(data, preserve_index=False)
+        return table.schema, iter(table.to_batches())
+    try:
+        batches = iter(data)
+    except TypeError:
+        raise ProgrammingError(
+            msg=f"cannot ingest data of type {type(data).__name__}"
+        ) from None
+    first = next(batches, None)
+    if not isinstance(first, pa.RecordBatch):
+        raise ProgrammingError(
+            msg="expected an iterable of pyarrow RecordBatch to ingest"
+        )
+    return first.schema, itertools.chain([first], batches)
+
+
+class _ChunkSink(object):
+    """
+    File like object collecting what an arrow writer emits,
+    so that it can be sent as chunks of a request body.
+    """
+
+    closed = False
+
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def take(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+
+class Ingestion(object):
+    """
+    Upload of record batches to one table.
+    Counts rows as batches are sent.
+    """
+
+    def __init__(self, table: str, data):
+        self.table = table
+        self.schema, self._batches = to_record_batches(data)
+        self.rows = 0
+
+    def batches(self) -> Iterator[pa.RecordBatch]:
+        for batch in self._batches:
+            self.rows = self.rows + batch.num_rows
+            yield batch
+
+    def arrow_ipc_chunks(self) -> Iterator[bytes]:
+        """
+        :return: arrow ipc stream, one chunk per record batch
+        """
+        sink = _ChunkSink()
+        with pa.ipc.new_stream(sink, self.schema) as writer:
+            yield sink.take()
+            for batch in self.batches():
+                writer.write_batch(batch)
+                yield sink.take()
+        yield sink.take()
+
+    def parquet_bytes(self) -> bytes:
+        # parquet has its footer at the end, it cannot be streamed
+        import pyarrow.parquet as pq
+
+        sink = pa.BufferOutputStream()
+        with pq.ParquetWriter(sink, self.schema) as writer:
+            for batch in self.batches():
+                writer.write_batch(batch)
+        return sink.getvalue().to_pybytes()
+
+    def insert_statement(self) -> str:
+        columns = ", ".join(_quote(name) for name in self.schema.names)
+        placeholders = ", ".join("?" for _ in self.schema.names)
+        return f"INSERT INTO {self.table} ({columns}) VALUES ({placeholders})"
+
+
+def ingest(cursor, table: str, data, file_format: str = "arrow") -> int:
+    """
+    Bulk load data into a table.
+
+    The data is uploaded to the connection's ingest_api as an arrow ipc
+    stream (or parquet file) and inserted server side. If radio_duck
+    has no ingest endpoint, rows are inserted with batched executemany.
+    :return: number of rows ingested
+    """
+    if file_format not in ("arrow", "parquet"):
+        raise NotSupportedError(msg=f"cannot ingest format {file_format}")
+    connection = cursor.connection
+    ingestion = Ingestion(table, data)
+    if connection.ingest_supported is None:
+        connection.ingest_supported = _probe(cursor, ingestion)
+    if not connection.ingest_supported:
+        return _insert(cursor, ingestion)
+
+    if file_format == "parquet":
+        content_type, body = parquet_content_type, ingestion.parquet_bytes()
+    else:
+        content_type = arrow_stream_content_type
+        body = ingestion.arrow_ipc_chunks()
+    status, payload = _upload(cursor, body, content_type, table)
+    check_status(status, payload)
+    if connection.result_cache is not None:
+        connection.result_cache.invalidate()
+    logging.info("ingested {} rows into {}".format(ingestion.rows, table))
+    return ingestion.rows
+
+
+def _probe(cursor, ingestion: Ingestion) -> bool:
+    """
+    Send a schema only (zero row) arrow stream to find out if
+    radio_duck accepts uploads, without consuming the data.
+    """
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, ingestion.schema):
+        pass
+    status, payload = _upload(
+        cursor,
+        sink.getvalue().to_pybytes(),
+        arrow_stream_content_type,
+        ingestion.table,
+    )
+    if status in _unsupported_statuses:
+        logging.info(
+            "radio_duck has no ingest endpoint, ingesting with inserts"
+        )
+        return False
+    check_status(status, payload)
+    return True
+
+
+def _upload(cursor, body, content_type: str, table: str):
+    """
+    Post to the ingest api like a write query, never sent twice.
+    :return: response status and payload
+    :raise OperationalError if the connection drops or on timeout
+    """
+    query_id = new_query_id()
+    connection = cursor.connection
+    _, status, _, payload = cursor._send(
+        body,
+        {
+            "Content-Type": content_type,
+            ingest_table_header: table,
+            query_id_header: query_id,
+        },
+        query_id,
+        connection.timeout_sec,
+        False,
+        api=connection.ingest_api,
+    )
+    return status, payload
+
+
+def _insert(cursor, ingestion: Ingestion) -> int:
+    statement = ingestion.insert_statement()
+    for batch in ingestion.batches():
+        columns = [column.to_pylist() for column in batch.columns]
+        cursor.executemany(statement, zip(*columns))  # noqa: B905
+    return ingestion.rows
+
+
+def _quote(identifier: str) -> str:
+    return '"' + identifier.replace('"', '""') + '"'
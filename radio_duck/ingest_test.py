@@ -0,0 +1,107 @@
+import flask
+import pyarrow as pa
+import pytest
+
+from radio_duck import ProgrammingError, connect
+from radio_duck.ingest import ingest_table_header, to_record_batches
+
+http_server_port = 9013
+
+ducks = pa.table(
+    {"duck_type": ["mallard", "teal", "eider"], "total": [1, 2, 3]}
+)
+
+
+def test_to_record_batches():
+    schema, batches = to_record_batches(ducks)
+    assert ducks.schema == schema
+    assert 3 == sum(b.num_rows for b in batches)
+    schema, batches = to_record_batches(iter(ducks.to_batches(1)))
+    assert 3 == len(list(batches))
+    with pytest.raises(ProgrammingError):
+        to_record_batches(42)
+    with pytest.raises(ProgrammingError):
+        to_record_batches([])
+
+
+def test_ingest_arrow_upload():
+    from http_server_mock import HttpServerMock
+
+    app = HttpServerMock(__name__)
+    uploads = []
+
+    @app.route("/v1/ingest/", methods=["POST"])
+    def upload():
+        uploads.append(
+            (
+                flask.request.headers[ingest_table_header],
+                pa.ipc.open_stream(flask.request.get_data()).read_all(),
+            )
+        )
+        return "{}"
+
+    with app.run("localhost", http_server_port):
+        with connect(
+            host="localhost",
+            port=http_server_port,
+            api="/v1/sql/",
+            scheme="http",
+        ) as conn:
+            assert 3 == conn.ingest("pond", ducks.to_batches(max_chunksize=1))
+            assert conn.ingest_supported
+            # probe with the schema, then the data
+            assert 2 == len(uploads)
+            assert 0 == uploads[0][1].num_rows
+            table, received = uploads[1]
+            assert "pond" == table
+            assert ducks.equals(received)
+
+
+def test_ingest_falls_back_to_inserts():
+    from http_server_mock import HttpServerMock
+
+    app = HttpServerMock(__name__)
+    statements = []
+
+    @app.route("/v1/sql/", methods=["POST"])
+    def index():
+        statements.append(flask.request.json)
+        return '{"schema": ["NUMBER"], "columns": ["Count"], "rows": [[3]]}'
+
+    with app.run("localhost", http_server_port):
+        with connect(
+            host="localhost",
+            port=http_server_port,
+            api="/v1/sql/",
+            scheme="http",
+        ) as conn:
+            assert 3 == conn.ingest("pond", ducks)
+            assert conn.ingest_supported is False
+            assert 1 == len(statements)
+            assert (
+                'INSERT INTO pond ("duck_type", "total") VALUES (?, ?), (?,'
+                " ?), (?, ?)"
+                == statements[0]["sql"]  # noqa: W503
+            )
+            assert ["mallard", 1, "teal", 2, "eider", 3] == statements[0][
+                "parameters"
+            ]
+
+
+def test_dropped_connection_raises_operational_error():
+    from radio_duck import OperationalError
+    from radio_duck.cursor_test import _DroppingServer
+    from radio_duck.db import connect_stale_socket_msg
+
+    server = _DroppingServer(drops=1)
+    try:
+        with connect(
+            host="localhost", port=server.port, api="/v1/sql/", scheme="http"
+        ) as conn:
+            with pytest.raises(OperationalError) as e:
+                conn.ingest("pond", pa.table({"total": [1]}))
+            assert connect_stale_socket_msg in e.value.msg
+            # uploads are writes, not sent again
+            assert 1 == server.requests
+    finally:
+        server.close()
@@ -0,0 +1,119 @@
+import codecs
+import json
+from typing import Any, Iterator, Tuple
+
+_whitespace = " \t\n\r"
+_decoder = json.JSONDecoder()
+
+
+class IncrementalJsonReader(object):
+    """
+    Pull parser over a json document read from a file like object
+    in chunks, so that huge arrays can be consumed value by value
+    without holding the whole document in memory.
+    """
+
+    def __init__(self, source, chunk_size: int = 64 * 1024):
+        """
+        :param source: object with read(amt) -> bytes
+        :param chunk_size: bytes read from source at a time
+        """
+        self._source = source
+        self._chunk_size = chunk_size
+        self._utf8 = codecs.getincrementaldecoder("utf-8")()
+        self._buf = ""
+        self._pos = 0
+        self._eof = False
+
+    def object_items(self) -> Iterator[Tuple[str, "IncrementalJsonReader"]]:
+        """
+        Iterate over the keys of a json object.
+        For each key the caller must consume the value,
+        with either value() or array_items(), before asking for the next.
+        """
+        self._expect("{")
+        if self._peek() == "}":
+            self._pos = self._pos + 1
+            return
+        while True:
+            key = self.value()
+            if not isinstance(key, str):
+                raise ValueError(f"expected object key, got {key!r}")
+            self._expect(":")
+            yield key, self
+            separator = self._next_char()
+            if separator == "}":
+                return
+            if separator != ",":
+                raise ValueError(f"expected ',' or '}}', got {separator!r}")
+
+    def array_items(self) -> Iterator[Any]:
+        """
+        Iterate over the values of a json array, decoding one at a time.
+        """
+        self._expect("[")
+        if self._peek() == "]":
+            self._pos = self._pos + 1
+            return
+        while True:
+            yield self.value()
+            separator = self._next_char()
+            if separator == "]":
+                return
+            if separator != ",":
+                raise ValueError(f"expected ',' or ']', got {separator!r}")
+
+    def value(self) -> Any:
+        """
+        Decode the next complete json value.
+        """
+        self._peek()
+        while True:
+            try:
+                value, end = _decoder.raw_decode(self._buf, self._pos)
+            except json.JSONDecodeError:
+                if self._eof:
+                    raise
+                self._fill()
+                continue
+            # a number at the end of the buffer may be cut short
+            if end == len(self._buf) and not self._eof:
+                self._fill()
+                continue
+            self._pos = end
+            return value
+
+    def _peek(self) -> str:
+        """
+        :return: next non whitespace char without consuming it
+        """
+        while True:
+            while self._pos < len(self._buf):
+                if self._buf[self._pos] not in _whitespace:
+                    return self._buf[self._pos]
+                self._pos = self._pos + 1
+            if self._eof:
+                raise ValueError("unexpected end of json document")
+            self._fill()
+
+    def _next_char(self) -> str:
+        char = self._peek()
+        self._pos = self._pos + 1
+        return char
+
+    def _expect(self, expected: str):
+        char = self._next_char()
+        if char != expected:
+            raise ValueError(f"expected {expected!r}, got {char!r}")
+
+    def _fill(self):
+        chunk = self._source.read(self._chunk_size)
+        if not chunk:
+            self._eof = True
+            self._buf = self._buf + self._utf8.decode(b"", final=True)
+            return
+        # drop what has been consumed so memory stays bounded
+        self._buf = self._buf[self._pos :] + self._utf8.decode(  # noqa: E203
+            chunk
+        )
+        self._pos = 0
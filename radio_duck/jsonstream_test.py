@@ -0,0 +1,42 @@
+import io
+
+import pytest
+
+from radio_duck.jsonstream import IncrementalJsonReader
+
+
+def test_reads_values_across_chunk_boundaries():
+    document = (
+        b'{"schema": ["NUMBER", "STRING"], "columns": ["n", "s"],'
+        b' "rows": [[12345, "caf\xc3\xa9"], [678.5, "x"], [9, null]]}'
+    )
+    # 1 byte chunks split numbers and multi byte utf-8 chars
+    reader = IncrementalJsonReader(io.BytesIO(document), chunk_size=1)
+    seen = {}
+    for key, value_reader in reader.object_items():
+        if key == "rows":
+            seen[key] = list(value_reader.array_items())
+        else:
+            seen[key] = value_reader.value()
+    assert ["NUMBER", "STRING"] == seen["schema"]
+    assert ["n", "s"] == seen["columns"]
+    assert [[12345, "café"], [678.5, "x"], [9, None]] == seen["rows"]
+
+
+def test_empty_containers():
+    reader = IncrementalJsonReader(io.BytesIO(b' { "rows" : [ ] } '))
+    items = reader.object_items()
+    key, value_reader = next(items)
+    assert "rows" == key
+    assert [] == list(value_reader.array_items())
+    assert [] == list(items)
+    assert [] == list(IncrementalJsonReader(io.BytesIO(b"{}")).object_items())
+
+
+def test_truncated_document():
+    reader = IncrementalJsonReader(io.BytesIO(b'{"rows": [[1], [2'))
+    _, value_reader = next(reader.object_items())
+    rows = value_reader.array_items()
+    assert [1] == next(rows)
+    with pytest.raises(ValueError):
+        next(rows)
@@ -0,0 +1,261 @@
+"""
+Per query timings and counters, for listeners and metrics exporters.
+
+A listener is any callable taking a QueryMetrics. Listeners of a
+connection, see Connection.add_listener(), are called after each
+execute() with where its time went:
+
+encode: building and compressing the request body.
+round_trip: sending the request until the response headers arrived,
+which includes the server executing the query.
+read: reading and decompressing the response body.
+decode: parsing the body into a result.
+prepare: registering the query's statement with radio_duck, only for
+the execute() preparing it, see Cursor.prepare().
+
+Streamed results (stream=True) are read and decoded while fetching,
+so they have no read and decode phases.
+
+MetricsRegistry aggregates queries for a Prometheus scrape and
+StatsdExporter sends each query to a StatsD daemon.
+"""
+import logging
+import socket
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+phases = ("encode", "round_trip", "read", "decode")
+
+# upper bounds of the phase duration histogram buckets, in seconds
+default_buckets = (
+    0.001,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+    30.0,
+)
+
+
+class QueryMetrics(object):
+    """
+    What one execute() cost.
+    """
+
+    __slots__ = (
+        "query",
+        "parameters",
+        "query_id",
+        "phases",
+        "request_bytes",
+        "response_bytes",
+        "rows",
+        "retries",
+        "status",
+        "cached",
+        "error",
+        "total_sec",
+        "timeline",
+    )
+
+    def __init__(self, query, parameters=None):
+        self.query = query
+        self.parameters = parameters
+        self.query_id: Optional[str] = None
+        # seconds per phase, phases that did not happen are missing
+        self.phases: Dict[str, float] = {}
+        self.request_bytes = 0
+        # compressed size if compressed, None if streamed
+        self.response_bytes: Optional[int] = None
+        # None if not known before fetching, ex: streamed results
+        self.rows: Optional[int] = None
+        # requests sent again to another replica or on a fresh socket
+        self.retries = 0
+        # http status of the response, None if there was none
+        self.status: Optional[int] = None
+        # answered by the connection's result cache
+        self.cached = False
+        # class name of the error execute() raised, if any
+        self.error: Optional[str] = None
+        # wall time of execute(), including waits outside the phases,
+        # ex: between retries
+        self.total_sec: Optional[float] = None
+        # (phase, time.time_ns() it ended, seconds) of every add(),
+        # only kept when set to a list, ex: for tracing
+        self.timeline: Optional[List[Tuple[str, int, float]]] = None
+
+    def add(self, phase: str, elapsed_sec: float):
+        self.phases[phase] = self.phases.get(phase, 0.0) + elapsed_sec
+        if self.timeline is not None:
+            self.timeline.append((phase, time.time_ns(), elapsed_sec))
+
+    @property
+    def elapsed_sec(self) -> float:
+        return sum(self.phases.values())
+
+    def __repr__(self):
+        return "QueryMetrics(query_id={}, phases={}, rows={})".format(
+            self.query_id, self.phases, self.rows
+        )
+
+
+def notify(listeners: List, metrics: QueryMetrics):
+    """
+    Call every listener. A failing listener is logged, it must
+    not fail the query.
+    """
+    for listener in listeners:
+        try:
+            listener(metrics)
+        except Exception as e:
+            logging.warning(
+                "radio_duck metrics listener {} failed: {!r}".format(
+                    listener, e
+                )
+            )
+
+
+class MetricsRegistry(object):
+    """
+    A listener aggregating counters and phase duration histograms
+    of all queries, exposed in the Prometheus text format.
+    """
+
+    def __init__(self, prefix: str = "radio_duck", buckets=default_buckets):
+        self.prefix = prefix
+        self.buckets = tuple(sorted(buckets))
+        self.queries = 0
+        self.cached = 0
+        self.retries = 0
+        self.request_bytes = 0
+        self.response_bytes = 0
+        self.rows = 0
+        self.errors: Dict[str, int] = {}
+        # phase: (count per bucket, count, sum)
+        self._phases: Dict[str, Tuple[List[int], int, float]] = {}
+        self._lock = threading.Lock()
+
+    def __call__(self, metrics: QueryMetrics):
+        with self._lock:
+            self.queries = self.queries + 1
+            self.cached = self.cached + int(metrics.cached)
+            self.retries = self.retries + metrics.retries
+            self.request_bytes = self.request_bytes + metrics.request_bytes
+            self.response_bytes = self.response_bytes + (
+                metrics.response_bytes or 0
+            )
+            self.rows = self.rows + (metrics.rows or 0)
+            if metrics.error is not None:
+                self.errors[metrics.error] = (
+                    self.errors.get(metrics.error, 0) + 1
+                )
+            for phase, elapsed_sec in metrics.phases.items():
+                counts, count, total = self._phases.get(
+                    phase, ([0] * len(self.buckets), 0, 0.0)
+                )
+                for index, bound in enumerate(self.buckets):
+                    if elapsed_sec <= bound:
+                        counts[index] = counts[index] + 1
+                self._phases[phase] = (counts, count + 1, total + elapsed_sec)
+
+    def phase(self, name: str) -> Tuple[int, float]:
+        """
+        :return: number of queries that went through the phase
+        and the seconds they spent in it
+        """
+        with self._lock:
+            _, count, total = self._phases.get(name, ([], 0, 0.0))
+            return count, total
+
+    def to_prometheus(self) -> str:
+        """
+        :return: the metrics in the Prometheus text exposition format
+        """
+        prefix = self.prefix
+        with self._lock:
+            lines = []
+            for name, value, description in (
+                ("queries_total", self.queries, "Queries executed."),
+                ("cached_total", self.cached, "Queries answered by cache."),
+                ("retries_total", self.retries, "Requests sent again."),
+                ("request_bytes_total", self.request_bytes, "Bytes sent."),
+                ("response_bytes_total", self.response_bytes, "Bytes read."),
+                ("rows_total", self.rows, "Rows returned."),
+            ):
+                lines.append(f"# HELP {prefix}_{name} {description}")
+                lines.append(f"# TYPE {prefix}_{name} counter")
+                lines.append(f"{prefix}_{name} {value}")
+            lines.append(f"# HELP {prefix}_errors_total Failed queries.")
+            lines.append(f"# TYPE {prefix}_errors_total counter")
+            for error, count in sorted(self.errors.items()):
+                lines.append(
+                    f"{prefix}_errors_total{_labels(error=error)} {count}"
+                )
+            name = f"{prefix}_phase_seconds"
+            lines.append(f"# HELP {name} Time spent per phase of a query.")
+            lines.append(f"# TYPE {name} histogram")
+            for phase, (counts, count, total) in sorted(self._phases.items()):
+                for index, bound in enumerate(self.buckets):
+                    labels = _labels(phase=phase, le=bound)
+                    lines.append(f"{name}_bucket{labels} {counts[index]}")
+                labels = _labels(phase=phase, le="+Inf")
+                lines.append(f"{name}_bucket{labels} {count}")
+                lines.append(f"{name}_sum{_labels(phase=phase)} {total}")
+                lines.append(f"{name}_count{_labels(phase=phase)} {count}")
+        return "\n".join(lines) + "\n"
+
+
+def _labels(**labels) -> str:
+    # label values are quoted as in {phase="read",le="0.5"}
+    pairs = ['{}="{}"'.format(key, value) for key, value in labels.items()]
+    return "{" + ",".join(pairs) + "}"
+
+
+class StatsdExporter(object):
+    """
+    A listener sending each query's metrics to a StatsD daemon over udp,
+    as one datagram of timers (ms) and counters (c).
+    """
+
+    def __init__(
+        self,
+        host: str = "localhost",
+        port: int = 8125,
+        prefix: str = "radio_duck",
+    ):
+        self.address = (host, int(port))
+        self.prefix = prefix
+        self._socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+
+    def __call__(self, metrics: QueryMetrics):
+        prefix = self.prefix
+        lines = [f"{prefix}.queries:1|c"]
+        for phase, elapsed_sec in metrics.phases.items():
+            lines.append(f"{prefix}.{phase}:{elapsed_sec * 1000:.3f}|ms")
+        lines.append(f"{prefix}.request_bytes:{metrics.request_bytes}|c")
+        if metrics.response_bytes is not None:
+            lines.append(f"{prefix}.response_bytes:{metrics.response_bytes}|c")
+        if metrics.rows is not None:
+            lines.append(f"{prefix}.rows:{metrics.rows}|c")
+        if metrics.retries:
+            lines.append(f"{prefix}.retries:{metrics.retries}|c")
+        if metrics.cached:
+            lines.append(f"{prefix}.cached:1|c")
+        if metrics.error is not None:
+            lines.append(f"{prefix}.errors:1|c")
+        try:
+            self._socket.sendto("\n".join(lines).encode(), self.address)
+        except OSError as e:
+            # metrics are best effort
+            logging.debug("could not send metrics to statsd: {!r}".format(e))
+
+    def close(self):
+        self._socket.close()
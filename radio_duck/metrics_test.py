@@ -0,0 +1,94 @@
+import socket
+
+import pytest
+
+from radio_duck import ProgrammingError, connect
+from radio_duck.connection_test import http_server_port
+from radio_duck.metrics import MetricsRegistry, QueryMetrics, StatsdExporter
+
+ducks = (
+    '{"schema": ["STRING", "NUMBER"], "columns": ["duck_type", "total"],'
+    ' "rows": [["mallard", 1], ["marbled_duck", 2]]}'
+)
+
+
+def test_listeners_get_phase_timings_and_counters():
+    from flask import request
+    from http_server_mock import HttpServerMock
+
+    app = HttpServerMock(__name__)
+
+    @app.route("/v1/sql/", methods=["POST"])
+    def index():
+        if b"pond" not in request.data:
+            return "table not found", 400
+        return ducks
+
+    def broken(metrics):
+        raise ValueError("listeners must not fail queries")
+
+    registry = MetricsRegistry()
+    queries = []
+    with app.run("localhost", http_server_port):
+        with connect(
+            host="localhost",
+            port=http_server_port,
+            api="/v1/sql/",
+            scheme="http",
+            listeners=[registry, broken],
+        ) as conn:
+            conn.add_listener(queries.append)
+            with conn.cursor() as cursor:
+                cursor.execute("select * from pond where total > ?", [0])
+                assert 2 == len(cursor.fetchall())
+                with pytest.raises(ProgrammingError):
+                    cursor.execute("select * from lake")
+
+    metrics = queries[0]
+    assert set(metrics.phases) == {"encode", "round_trip", "read", "decode"}
+    assert metrics.request_bytes > 0
+    assert len(ducks) == metrics.response_bytes
+    assert 2 == metrics.rows
+    assert 200 == metrics.status
+    assert metrics.query_id is not None
+    assert "ProgrammingError" == queries[1].error
+    assert 400 == queries[1].status
+
+    assert 2 == registry.queries
+    assert 2 == registry.rows
+    assert 2 == registry.phase("round_trip")[0]
+    assert 1 == registry.phase("decode")[0]
+    text = registry.to_prometheus()
+    assert "radio_duck_queries_total 2\n" in text
+    assert 'radio_duck_errors_total{error="ProgrammingError"} 1\n' in text
+    assert 'radio_duck_phase_seconds_count{phase="encode"} 2\n' in text
+    assert 'radio_duck_phase_seconds_bucket{phase="read",le="+Inf"} 2\n' in (
+        text
+    )
+
+
+def test_statsd_exporter():
+    sink = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sink.bind(("127.0.0.1", 0))
+    sink.settimeout(5)
+    exporter = StatsdExporter("127.0.0.1", sink.getsockname()[1], "ducks")
+    metrics = QueryMetrics("select 1")
+    metrics.add("encode", 0.002)
+    metrics.add("round_trip", 0.25)
+    metrics.request_bytes = 40
+    metrics.rows = 3
+    metrics.retries = 1
+    try:
+        exporter(metrics)
+        lines = sink.recv(65535).decode().split("\n")
+    finally:
+        exporter.close()
+        sink.close()
+    assert [
+        "ducks.queries:1|c",
+        "ducks.encode:2.000|ms",
+        "ducks.round_trip:250.000|ms",
+        "ducks.request_bytes:40|c",
+        "ducks.rows:3|c",
+        "ducks.retries:1|c",
+    ] == lines
@@ -0,0 +1,241 @@
+import collections
+import http.client
+import logging
+import select
+import socket
+import threading
+import time
+from contextlib import contextmanager
+from typing import Optional
+
+from radio_duck.exceptions import InterfaceError, OperationalError
+
+
+class HttpConnectionPool(object):
+    """
+    A bounded, thread safe pool of keep-alive http connections
+    to a single radio_duck endpoint.
+
+    Idle connections are evicted after idle_timeout_sec and every
+    connection is health checked before it is handed out.
+    """
+
+    def __init__(
+        self,
+        host: str,
+        port: int,
+        timeout_sec: float = 10,
+        max_size: int = 8,
+        idle_timeout_sec: float = 60,
+        checkout_timeout_sec: Optional[float] = None,
+    ):
+        if max_size < 1:
+            raise InterfaceError(msg="pool size must be at least 1")
+        self.host = host
+        self.port = port
+        self.timeout_sec = timeout_sec
+        self.max_size = max_size
+        self.idle_timeout_sec = idle_timeout_sec
+        self.checkout_timeout_sec = (
+            timeout_sec
+            if checkout_timeout_sec is None
+            else checkout_timeout_sec
+        )
+        self.closed = False
+        # most recently used connection is at the right.
+        self._idle = collections.deque()
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(max_size)
+
+    @property
+    def idle_count(self) -> int:
+        return len(self._idle)
+
+    def acquire(self, fresh=False) -> http.client.HTTPConnection:
+        """
+        Check out a connection, opening a new one if none are idle.
+        :param fresh: skip idle connections and open a new one
+        :raise OperationalError if the pool is exhausted or
+        unable to connect
+        """
+        if self.closed:
+            raise InterfaceError(msg="connection pool already closed")
+        if not self._slots.acquire(timeout=self.checkout_timeout_sec):
+            raise OperationalError(
+                msg=(
+                    "timed out waiting for a free connection in pool of size"
+                    f" {self.max_size}"
+                )
+            )
+        try:
+            while True:
+                http_connection = None if fresh else self._pop_idle()
+                if http_connection is None:
+                    return self._new_connection()
+                if _is_dropped(http_connection):
+                    logging.debug("discarding dropped pooled connection")
+                    http_connection.close()
+                    continue
+                return http_connection
+        except BaseException:
+            self._slots.release()
+            raise
+
+    def release(
+        self, http_connection: http.client.HTTPConnection, discard=False
+    ):
+        """
+        Return a connection to the pool.
+        :param discard: close the connection instead of keeping it
+        """
+        try:
+            if discard or self.closed or http_connection.sock is None:
+                http_connection.close()
+            else:
+                # undo a per request timeout
+                http_connection.sock.settimeout(self.timeout_sec)
+                with self._lock:
+                    self._idle.append((http_connection, time.monotonic()))
+            self._evict_idle()
+        finally:
+            self._slots.release()
+
+    @contextmanager
+    def connection(self, fresh=False):
+        """
+        Check out a connection for the duration of the with block.
+        The connection is discarded if the block raises.
+        """
+        http_connection = self.acquire(fresh=fresh)
+        try:
+            yield http_connection
+        except BaseException:
+            self.release(http_connection, discard=True)
+            raise
+        self.release(http_connection)
+
+    def close(self):
+        self.closed = True
+        with self._lock:
+            idle, self._idle = self._idle, collections.deque()
+        for http_connection, _ in idle:
+            http_connection.close()
+
+    def _new_connection(self) -> http.client.HTTPConnection:
+        http_connection = http.client.HTTPConnection(
+            self.host, self.port, timeout=self.timeout_sec
+        )
+        try:
+            http_connection.connect()
+        except Exception as e:
+            http_connection.close()
+            raise OperationalError(
+                msg=f"unable to connect to database: {e}"
+            ) from e
+        return http_connection
+
+    def _pop_idle(self):
+        now = time.monotonic()
+        with self._lock:
+            while self._idle:
+                http_connection, last_used = self._idle.pop()
+                if now - last_used <= self.idle_timeout_sec:
+                    return http_connection
+                http_connection.close()
+        return None
+
+    def _evict_idle(self):
+        expiry = time.monotonic() - self.idle_timeout_sec
+        with self._lock:
+            # oldest connections are at the left
+            while self._idle and self._idle[0][1] < expiry:
+                http_connection, _ = self._idle.popleft()
+                http_connection.close()
+
+
+def _is_dropped(http_connection: http.client.HTTPConnection) -> bool:
+    """
+    An idle keep-alive socket should have nothing to read. If it is
+    readable and at EOF, or fails, the peer has closed it.
+    """
+    sock = http_connection.sock
+    if sock is None:
+        return True
+    try:
+        if not _is_readable(sock):
+            return False
+        # readable, so this does not block
+        return sock.recv(1, socket.MSG_PEEK) == b""
+    except OSError:
+        return True
+
+
+def _is_readable(sock: socket.socket) -> bool:
+    # select.select() cannot watch file descriptors >= 1024,
+    # which busy processes have
+    if hasattr(select, "poll"):
+        poller = select.poll()
+        poller.register(sock, select.POLLIN)
+        return bool(poller.poll(0))
+    # windows has no poll and its select takes any socket
+    readable, _, _ = select.select([sock], [], [], 0)
+    return bool(readable)
+
+
+class PooledResponse(object):
+    """
+    A response body read incrementally from a pooled connection.
+    The connection goes back to the pool once the body is fully read,
+    or is discarded if the response is closed early.
+    """
+
+    def __init__(
+        self,
+        pool: HttpConnectionPool,
+        http_connection: http.client.HTTPConnection,
+        http_response: http.client.HTTPResponse,
+    ):
+        self._pool = pool
+        self._http_connection = http_connection
+        self._http_response = http_response
+        self.closed = False
+
+    def read(self, amt: Optional[int] = None) -> bytes:
+        data = self._guarded(self._http_response.read, amt)
+        if not data or self._http_response.isclosed():
+            self.close()
+        return data
+
+    def readline(self) -> bytes:
+        data = self._guarded(self._http_response.readline)
+        if not data:
+            self.close()
+        return data
+
+    def close(self, drain=False):
+        """
+        :param drain: read what is left of the body so the
+        connection can be reused
+        """
+        if self.closed:
+            return
+        self.closed = True
+        try:
+            if drain and not self._http_response.isclosed():
+                self._http_response.read()
+            reusable = self._http_response.isclosed()
+        except Exception:
+            reusable = False
+        self._http_response.close()
+        self._pool.release(self._http_connection, discard=not reusable)
+
+    def _guarded(self, read, *args):
+        if self.closed:
+            return b""
+        try:
+            return read(*args)
+        except Exception as e:
+            self.close()
+            raise OperationalError(
+                msg=f"failed to read response from database: {e}"
+            ) from e
@@ -0,0 +1,153 @@
+import http.client
+import socket
+import threading
+import time
+
+import pytest
+
+from radio_duck import OperationalError, connect, threadsafety
+from radio_duck.pool import HttpConnectionPool, _is_dropped
+
+http_server_port = 9012
+
+
+def test_threadsafety_level():
+    assert 2 == threadsafety
+
+
+def test_dropped_socket_detection():
+    ours, theirs = socket.socketpair()
+    http_connection = http.client.HTTPConnection("localhost", 1)
+    http_connection.sock = ours
+    try:
+        assert not _is_dropped(http_connection)
+        theirs.close()
+        assert _is_dropped(http_connection)
+    finally:
+        http_connection.close()
+    http_connection.sock = None
+    assert _is_dropped(http_connection)
+
+
+def test_readable_socket_is_dropped_only_at_eof():
+    ours, theirs = socket.socketpair()
+    http_connection = http.client.HTTPConnection("localhost", 1)
+    http_connection.sock = ours
+    try:
+        theirs.sendall(b"x")
+        assert not _is_dropped(http_connection)
+        assert b"x" == ours.recv(1), "checking must not consume data"
+    finally:
+        theirs.close()
+        http_connection.close()
+
+
+def test_dropped_socket_detection_of_high_file_descriptors():
+    import os
+    import resource
+
+    high = 1500
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if soft <= high:
+        if hard != resource.RLIM_INFINITY and hard <= high:
+            pytest.skip(f"open file limit {hard} is too low")
+        resource.setrlimit(resource.RLIMIT_NOFILE, (high + 1, hard))
+    ours, theirs = socket.socketpair()
+    http_connection = http.client.HTTPConnection("localhost", 1)
+    http_connection.sock = socket.socket(fileno=os.dup2(ours.fileno(), high))
+    ours.close()
+    try:
+        assert not _is_dropped(http_connection)
+        theirs.close()
+        assert _is_dropped(http_connection)
+    finally:
+        http_connection.close()
+        resource.setrlimit(resource.RLIMIT_NOFILE, (soft, hard))
+
+
+def test_pool_is_bounded():
+    from http_server_mock import HttpServerMock
+
+    app = HttpServerMock(__name__)
+
+    @app.route("/v1/sql/", methods=["POST"])
+    def index():
+        return "{}"
+
+    with app.run("localhost", http_server_port):
+        pool = HttpConnectionPool(
+            "localhost", http_server_port, max_size=1, checkout_timeout_sec=0.1
+        )
+        first = pool.acquire()
+        with pytest.raises(OperationalError) as e:
+            pool.acquire()
+        assert "timed out waiting for a free connection" in e.value.msg
+        pool.release(first)
+        # slot is free again and idle connection is reused
+        assert first is pool.acquire()
+        pool.release(first, discard=True)
+        pool.close()
+
+
+def test_pool_evicts_idle_connections():
+    from http_server_mock import HttpServerMock
+
+    app = HttpServerMock(__name__)
+
+    @app.route("/v1/sql/", methods=["POST"])
+    def index():
+        return "{}"
+
+    with app.run("localhost", http_server_port):
+        pool = HttpConnectionPool(
+            "localhost", http_server_port, idle_timeout_sec=0.2
+        )
+        first = pool.acquire()
+        pool.release(first)
+        assert 1 == pool.idle_count
+        time.sleep(0.3)
+        second = pool.acquire()
+        assert first is not second
+        assert first.sock is None, "evicted connection should be closed"
+        pool.release(second, discard=True)
+        assert 0 == pool.idle_count
+        pool.close()
+
+
+def test_connection_shared_across_threads():
+    from http_server_mock import HttpServerMock
+
+    app = HttpServerMock(__name__)
+
+    @app.route("/v1/sql/", methods=["POST"])
+    def index():
+        time.sleep(0.05)
+        return """{"schema": ["NUMBER"], "columns": ["n"], "rows": [[1]]}"""
+
+    errors = []
+
+    with app.run("localhost", http_server_port):
+        with connect(
+            host="localhost",
+            port=http_server_port,
+            api="/v1/sql/",
+            scheme="http",
+            pool_size=4,
+        ) as conn:
+
+            def work():
+                try:
+                    for _ in range(3):
+                        with conn.cursor() as cursor:
+                            cursor.execute("select 1 as n")
+                            assert [1] == cursor.fetchone()
+                except Exception as e:
+                    errors.append(e)
+
+            threads = [threading.Thread(target=work) for _ in range(8)]
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+            assert conn.pool.idle_count <= 4
+    assert [] == errors
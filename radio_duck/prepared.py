@@ -0,0 +1,78 @@
+"""
+Prepared statements: the sql of a hot statement is sent to radio-duck
+once, later executions send only its handle and parameters, sparing the
+server parsing and planning it again.
+
+The handle is chosen by the driver, a hash of the sql, so that every
+replica agrees on it:
+
+POST prepare_api {"sql": "...", "handle": "..."} registers a statement.
+404, 405 or 501 mean the server cannot prepare statements.
+
+A query request with a "handle" and no "sql" executes the prepared
+statement. The server answers 410 if it does not know the handle, ex:
+after a restart or on another replica. The driver then sends the sql
+along with the handle, which prepares the statement again.
+"""
+import collections
+import hashlib
+import threading
+from typing import Optional
+
+# the server does not know the handle
+unknown_handle_status = 410
+
+# sql executed this often is prepared, with connect(prepare=True)
+prepare_after = 2
+
+
+def statement_handle(query: str) -> str:
+    return hashlib.sha256(query.encode()).hexdigest()[:32]
+
+
+class PreparedStatements(object):
+    """
+    Bounded lru of the handles of prepared statements by sql, and of how
+    often statements not prepared yet were executed.
+    """
+
+    def __init__(self, max_size: int = 256):
+        self.max_size = max_size
+        self._handles = collections.OrderedDict()
+        self._seen = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, query: str) -> Optional[str]:
+        with self._lock:
+            handle = self._handles.get(query)
+            if handle is not None:
+                self._handles.move_to_end(query)
+            return handle
+
+    def put(self, query: str, handle: str):
+        with self._lock:
+            self._seen.pop(query, None)
+            self._handles[query] = handle
+            self._handles.move_to_end(query)
+            while len(self._handles) > self.max_size:
+                self._handles.popitem(last=False)
+
+    def seen(self, query: str) -> int:
+        """
+        Counts an execution of a statement not prepared yet.
+        :return: executions so far, this one included
+        """
+        with self._lock:
+            count = self._seen.pop(query, 0) + 1
+            self._seen[query] = count
+            while len(self._seen) > self.max_size:
+                self._seen.popitem(last=False)
+            return count
+
+    def clear(self):
+        with self._lock:
+            self._handles.clear()
+            self._seen.clear()
+
+    def __len__(self):
+        return len(self._handles)
@@ -0,0 +1,190 @@
+import pytest
+
+from radio_duck import NotSupportedError, connect
+from radio_duck.connection_test import http_server_port
+from radio_duck.prepared import PreparedStatements, statement_handle
+
+ducks = (
+    '{"schema": ["STRING", "NUMBER"], "columns": ["duck_type", "total"],'
+    ' "rows": [["mallard", 1], ["marbled_duck", 2]]}'
+)
+query = "select * from pond where total > ?"
+
+
+def test_prepared_statements_lru():
+    prepared = PreparedStatements(max_size=2)
+    assert 1 == prepared.seen("a")
+    assert 2 == prepared.seen("a")
+    prepared.put("a", "ha")
+    prepared.put("b", "hb")
+    assert "ha" == prepared.get("a")
+    prepared.put("c", "hc")
+    # b was the least recently used
+    assert prepared.get("b") is None
+    assert 2 == len(prepared)
+    # counting starts over once forgotten
+    assert 1 == prepared.seen("b")
+
+
+def _radio_duck(app, requests, statements, prepare_api=True, prepare_sec=0):
+    import time
+
+    from flask import request
+
+    if prepare_api:
+
+        @app.route("/v1/prepare/", methods=["POST"])
+        def prepare():
+            time.sleep(prepare_sec)
+            body = request.json
+            requests.append(("prepare", body))
+            statements[body["handle"]] = body["sql"]
+            return "{}"
+
+    @app.route("/v1/sql/", methods=["POST"])
+    def index():
+        body = request.json
+        requests.append(("sql", body))
+        handle = body.get("handle")
+        if handle is not None and "sql" in body:
+            statements[handle] = body["sql"]
+        elif handle is not None and handle not in statements:
+            return "unknown statement handle", 410
+        return ducks
+
+
+def test_prepare_and_re_prepare_after_restart():
+    from http_server_mock import HttpServerMock
+
+    app = HttpServerMock(__name__)
+    requests = []
+    statements = {}
+    _radio_duck(app, requests, statements)
+
+    with app.run("localhost", http_server_port):
+        with connect(
+            host="localhost",
+            port=http_server_port,
+            api="/v1/sql/",
+            scheme="http",
+        ) as conn:
+            cursor = conn.cursor()
+            handle = cursor.prepare(query)
+            assert statement_handle(query) == handle
+            # known handles are not prepared again
+            assert handle == cursor.prepare(query)
+            assert [("prepare", {"sql": query, "handle": handle})] == requests
+
+            requests.clear()
+            cursor.execute(query, [1])
+            assert 2 == len(cursor.fetchall())
+            (body,) = [body for _, body in requests]
+            assert "sql" not in body
+            assert handle == body["handle"]
+            assert [1] == body["parameters"]
+
+            # the server restarts and forgets the statement
+            statements.clear()
+            requests.clear()
+            cursor.execute(query, [2])
+            assert 2 == len(cursor.fetchall())
+            assert ["handle only", "with sql"] == [
+                "with sql" if "sql" in body else "handle only"
+                for _, body in requests
+            ]
+            assert query == statements[handle]
+
+            requests.clear()
+            cursor.execute(query, [3])
+            assert "sql" not in requests[0][1]
+
+
+def test_prepare_repeated_sql():
+    from http_server_mock import HttpServerMock
+
+    app = HttpServerMock(__name__)
+    requests = []
+    _radio_duck(app, requests, {})
+
+    with app.run("localhost", http_server_port):
+        with connect(
+            host="localhost",
+            port=http_server_port,
+            api="/v1/sql/",
+            scheme="http",
+            prepare="true",
+        ) as conn:
+            cursor = conn.cursor()
+            for total in range(3):
+                cursor.execute(query, [total])
+                assert 2 == len(cursor.fetchall())
+            # one off queries are not prepared
+            cursor.execute("select 42")
+
+    assert [
+        ("sql", "sql"),
+        ("prepare", "sql"),
+        ("sql", "handle"),
+        ("sql", "handle"),
+        ("sql", "sql"),
+    ] == [
+        (kind, "sql" if "sql" in body else "handle") for kind, body in requests
+    ]
+
+
+def test_prepare_is_not_the_query_round_trip():
+    from http_server_mock import HttpServerMock
+
+    app = HttpServerMock(__name__)
+    requests = []
+    _radio_duck(app, requests, {}, prepare_sec=0.3)
+    executed = []
+
+    with app.run("localhost", http_server_port):
+        with connect(
+            host="localhost",
+            port=http_server_port,
+            api="/v1/sql/",
+            scheme="http",
+            prepare="true",
+        ) as conn:
+            conn.add_listener(executed.append)
+            cursor = conn.cursor()
+            for total in range(3):
+                cursor.execute(query, [total])
+
+    assert ["sql", "prepare", "sql"] == [kind for kind, _ in requests[:3]]
+    # the second execute prepared its statement
+    assert "prepare" not in executed[0].phases
+    assert "prepare" not in executed[2].phases
+    assert 0.3 <= executed[1].phases["prepare"]
+    assert 0.3 > executed[1].phases["round_trip"]
+    assert 0 == executed[1].retries
+
+
+def test_prepare_not_supported():
+    from http_server_mock import HttpServerMock
+
+    app = HttpServerMock(__name__)
+    requests = []
+    _radio_duck(app, requests, {}, prepare_api=False)
+
+    with app.run("localhost", http_server_port):
+        with connect(
+            host="localhost",
+            port=http_server_port,
+            api="/v1/sql/",
+            scheme="http",
+            prepare=True,
+        ) as conn:
+            cursor = conn.cursor()
+            for total in range(3):
+                cursor.execute(query, [total])
+                assert 2 == len(cursor.fetchall())
+            assert conn.prepare_supported is False
+            with pytest.raises(NotSupportedError):
+                cursor.prepare(query)
+
+    # the missing prepare api was asked once
+    assert 3 == len(requests)
+    assert all("sql" in body for _, body in requests)
@@ -8,10 +8,13 @@ get_tables = (
 get_schemas = "SELECT schema_name FROM information_schema.schemata where catalog_name not in ('system','temp')"  # noqa: E501,B950
 get_views = "select view_name from duckdb_views where schema_name = ?"  # noqa: E501,B950
 get_view_sql = "select sql from duckdb_views where schema_name = ? and view_name= ?"  # noqa: E501,B950
-get_constraints = "select constraint_text as name,constraint_column_names as column_names from duckdb_constraints where schema_name = ? and table_name = ? and constraint_type = ?"  # noqa: E501,B950
 get_temp_views = "select view_name from duckdb_views where temporary = true;"  # noqa: E501,B950
 get_temp_tables = "select table_name from information_schema.tables where table_schema = ? and table_type like '%TEMPORARY%';"  # noqa: E501,B950
 get_sequences = "select sequencename from pg_sequences where schemaname = ?"  # noqa: E501,B950
-get_indexes = "select index_name, sql, is_unique from duckdb_indexes where schema_name = ? and table_name = ?"  # noqa: E501,B950
 get_columns = "SET schema '{}'; PRAGMA table_info('{}')"
 get_check_constraint = "select constraint_text as name,expression as sqltext from duckdb_constraints where schema_name = ? and table_name = ? and constraint_type = 'CHECK'"  # noqa: E501,B950
+# one query per schema for reflection of all its tables. attached databases
+# may have schemas of the same name, temporary objects live in 'temp'
+get_multi_columns = "select c.table_name, c.column_index, c.column_name, c.data_type, not c.is_nullable as notnull, c.column_default, coalesce(list_contains(pk.constraint_column_names, c.column_name), false) as pk from duckdb_columns() c left join (select database_name, table_name, constraint_column_names from duckdb_constraints() where schema_name = ? and constraint_type = 'PRIMARY KEY') pk on pk.database_name = c.database_name and pk.table_name = c.table_name where c.schema_name = ? and c.database_name in (current_database(), 'temp') order by c.table_name, c.column_index"  # noqa: E501,B950
+get_multi_constraints = "select table_name, constraint_text as name, constraint_column_names as column_names from duckdb_constraints() where schema_name = ? and constraint_type = ? and database_name in (current_database(), 'temp')"  # noqa: E501,B950
+get_multi_indexes = "select table_name, index_name, sql, is_unique from duckdb_indexes() where schema_name = ? and database_name in (current_database(), 'temp')"  # noqa: E501,B950
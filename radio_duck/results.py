@@ -0,0 +1,409 @@
+import importlib
+from typing import Iterator, List, Optional
+
+import pyarrow as pa
+
+from radio_duck.codec import JsonCodec
+from radio_duck.converters import column_converters, lazy_rows
+from radio_duck.db_types import get_arrow_type, get_arrow_type_name
+from radio_duck.exceptions import NotSupportedError, OperationalError
+from radio_duck.jsonstream import IncrementalJsonReader
+
+json_content_type = "application/json"
+ndjson_content_type = "application/x-ndjson"
+arrow_stream_content_type = "application/vnd.apache.arrow.stream"
+
+
+class Result(object):
+    """
+    Rows returned by radio_duck for one executed query.
+    Cursor fetch methods delegate to this object.
+    """
+
+    # True or names of the columns whose json values are converted
+    # to python types, see converters.get_converter
+    decode_types = False
+    _converters = None
+
+    @property
+    def columns(self) -> List[str]:
+        raise NotImplementedError()
+
+    @property
+    def schema(self) -> List[str]:
+        raise NotImplementedError()
+
+    @property
+    def rowcount(self) -> int:
+        """
+        :return: total number of rows or -1 if not yet known
+        """
+        raise NotImplementedError()
+
+    def fetch(self, size: Optional[int] = None) -> List:
+        """
+        :param size: max rows to return. None for all remaining rows
+        :return: list of rows, empty when exhausted
+        """
+        raise NotImplementedError()
+
+    def fetch_record_batches(self) -> Iterator[pa.RecordBatch]:
+        """
+        :return: iterator over the remaining rows as arrow record batches
+        """
+        raise NotImplementedError()
+
+    def fetch_arrow_table(self) -> pa.Table:
+        """
+        :return: the remaining rows as an arrow table
+        """
+        batches = list(self.fetch_record_batches())
+        if not batches:
+            return self._empty_table()
+        return pa.Table.from_batches(batches)
+
+    def fetch_numpy(self) -> dict:
+        """
+        :return: the remaining rows as {column name: numpy array}
+        """
+        _import_optional("numpy", "fetch_numpy")
+        table = self.fetch_arrow_table()
+        return {
+            name: table.column(name).to_numpy() for name in table.column_names
+        }
+
+    def fetch_df(self):
+        """
+        :return: the remaining rows as a pandas DataFrame
+        """
+        _import_optional("pandas", "fetch_df")
+        return self.fetch_arrow_table().to_pandas()
+
+    def close(self):
+        pass
+
+    def _decode(self, rows: List[list]) -> List:
+        if not self.decode_types or not rows:
+            return rows
+        if self._converters is None:
+            self._converters = column_converters(
+                self.schema, self.columns, self.decode_types
+            )
+        if not any(self._converters):
+            return rows
+        return lazy_rows(rows, self._converters)
+
+    def _empty_table(self) -> pa.Table:
+        return pa.Table.from_batches(
+            [_to_record_batch([], self.columns, self.schema)]
+        )
+
+
+class JsonResult(Result):
+    """
+    A fully materialized json response of the form
+    {"schema": [...], "columns": [...], "rows": [[...], ...]}
+    """
+
+    def __init__(self, payload: dict):
+        self._payload = payload
+        self._rows = payload.get("rows", [])
+        self._index = 0
+
+    @property
+    def columns(self) -> List[str]:
+        return self._payload.get("columns", [])
+
+    @property
+    def schema(self) -> List[str]:
+        return self._payload.get("schema", [])
+
+    @property
+    def rowcount(self) -> int:
+        return len(self._rows)
+
+    def fetch(self, size: Optional[int] = None) -> List:
+        return self._decode(self._fetch_json(size))
+
+    def fetch_record_batches(self) -> Iterator[pa.RecordBatch]:
+        # arrow columns are built from the json values, never converted
+        rows = self._fetch_json()
+        if not rows:
+            return iter([])
+        return iter([_to_record_batch(rows, self.columns, self.schema)])
+
+    def close(self):
+        self._rows = []
+        self._index = 0
+
+    def _fetch_json(self, size: Optional[int] = None) -> List[list]:
+        if size is None:
+            rows = self._rows[self._index :]  # noqa: E203
+        else:
+            rows = self._rows[self._index : self._index + size]  # noqa: E203
+        self._index = self._index + len(rows)
+        return rows
+
+
+class ArrowResult(Result):
+    """
+    An arrow ipc stream response.
+    Record batches are decoded one at a time; rows are only
+    boxed into python objects when fetched through fetch().
+    """
+
+    def __init__(self, source):
+        """
+        :param source: bytes or file like object of an arrow ipc stream
+        """
+        self._source = source
+        self._reader = pa.ipc.open_stream(source)
+        self._columns = list(self._reader.schema.names)
+        self._schema = [
+            get_arrow_type_name(field.type) for field in self._reader.schema
+        ]
+        # known before fetching for a body read in full
+        self._rowcount = -1
+        if isinstance(source, bytes):
+            # batches of a buffer are read without copying their data
+            batches = list(self._reader)
+            self._rowcount = sum(batch.num_rows for batch in batches)
+            self._batches = iter(batches)
+        else:
+            self._batches = iter(self._reader)
+        self._pending = None  # current batch, not yet boxed fully
+        self._pending_offset = 0
+        self._rows_seen = 0
+        self._exhausted = False
+
+    @property
+    def columns(self) -> List[str]:
+        return self._columns
+
+    @property
+    def schema(self) -> List[str]:
+        return self._schema
+
+    @property
+    def rowcount(self) -> int:
+        if self._rowcount >= 0:
+            return self._rowcount
+        return self._rows_seen if self._exhausted else -1
+
+    def fetch(self, size: Optional[int] = None) -> List:
+        rows = []
+        while size is None or len(rows) < size:
+            batch = self._current_batch()
+            if batch is None:
+                break
+            take = batch.num_rows - self._pending_offset
+            if size is not None:
+                take = min(take, size - len(rows))
+            rows.extend(_to_rows(batch.slice(self._pending_offset, take)))
+            self._pending_offset = self._pending_offset + take
+        return rows
+
+    def fetch_record_batches(self) -> Iterator[pa.RecordBatch]:
+        while True:
+            batch = self._current_batch()
+            if batch is None:
+                return
+            remaining = batch.slice(self._pending_offset)
+            self._pending_offset = batch.num_rows
+            yield remaining
+
+    def fetch_arrow_table(self) -> pa.Table:
+        batches = list(self.fetch_record_batches())
+        return pa.Table.from_batches(batches, schema=self._reader.schema)
+
+    def close(self):
+        self._batches = iter([])
+        self._pending = None
+        _close_source(self._source, drain=self._exhausted)
+        self._exhausted = True
+
+    def _current_batch(self) -> Optional[pa.RecordBatch]:
+        """
+        :return: batch with rows left to fetch or None when exhausted
+        """
+        while (
+            self._pending is None
+            or self._pending_offset >= self._pending.num_rows  # noqa: W503
+        ):
+            batch = next(self._batches, None)
+            if batch is None:
+                self._pending = None
+                self._exhausted = True
+                _close_source(self._source, drain=True)
+                return None
+            self._pending = batch
+            self._pending_offset = 0
+            self._rows_seen = self._rows_seen + batch.num_rows
+        return self._pending
+
+
+class _StreamingResult(Result):
+    """
+    Rows decoded incrementally from the response as they are fetched.
+    At most one fetch worth of rows is held in memory.
+    """
+
+    def __init__(self, source):
+        self._source = source
+        self._columns = []
+        self._schema = []
+        self._rows = iter([])
+        self._rows_seen = 0
+        self._exhausted = False
+
+    @property
+    def columns(self) -> List[str]:
+        return self._columns
+
+    @property
+    def schema(self) -> List[str]:
+        return self._schema
+
+    @property
+    def rowcount(self) -> int:
+        return self._rows_seen if self._exhausted else -1
+
+    def fetch(self, size: Optional[int] = None) -> List:
+        return self._decode(self._fetch_json(size))
+
+    def fetch_record_batches(self) -> Iterator[pa.RecordBatch]:
+        while True:
+            rows = self._fetch_json(64 * 1024)
+            if not rows:
+                return
+            yield _to_record_batch(rows, self.columns, self.schema)
+
+    def _fetch_json(self, size: Optional[int] = None) -> List[list]:
+        rows = []
+        try:
+            while size is None or len(rows) < size:
+                row = next(self._rows, None)
+                if row is None:
+                    self._finish()
+                    break
+                rows.append(row)
+        except ValueError as e:
+            self.close()
+            raise OperationalError(
+                msg=f"could not deserialize streamed response: {e}."
+            ) from e
+        self._rows_seen = self._rows_seen + len(rows)
+        return rows
+
+    def close(self):
+        self._rows = iter([])
+        _close_source(self._source, drain=self._exhausted)
+        self._exhausted = True
+
+    def _finish(self):
+        if not self._exhausted:
+            self._exhausted = True
+            _close_source(self._source, drain=True)
+
+
+class StreamingJsonResult(_StreamingResult):
+    """
+    The regular json response, {"schema", "columns", "rows"},
+    parsed incrementally. radio_duck sends "rows" last, so metadata
+    is known before the first row is decoded.
+    """
+
+    def __init__(self, source):
+        super().__init__(source)
+        self._reader = IncrementalJsonReader(source)
+        self._items = self._reader.object_items()
+        self._rows = self._read_rows()
+        # read metadata up to the start of the rows
+        self._pending_rows = self._read_until_rows()
+
+    def _read_until_rows(self) -> bool:
+        for key, reader in self._items:
+            if key == "rows":
+                return True
+            self._set_metadata(key, reader.value())
+        return False
+
+    def _read_rows(self) -> Iterator[list]:
+        if self._pending_rows:
+            yield from self._reader.array_items()
+        # any metadata sent after the rows
+        while self._read_until_rows():
+            yield from self._reader.array_items()
+
+    def _set_metadata(self, key, value):
+        if key == "columns":
+            self._columns = value
+        elif key == "schema":
+            self._schema = value
+
+
+class NdjsonResult(_StreamingResult):
+    """
+    A newline delimited json response. The first line is an object
+    with "schema" and "columns", every following line is one row.
+    """
+
+    def __init__(self, source, codec: Optional[JsonCodec] = None):
+        super().__init__(source)
+        self._loads = (codec or JsonCodec()).loads
+        header = self._loads(source.readline() or b"{}")
+        self._columns = header.get("columns", [])
+        self._schema = header.get("schema", [])
+        self._rows = self._read_rows()
+
+    def _read_rows(self) -> Iterator[list]:
+        while True:
+            line = self._source.readline()
+            if not line:
+                return
+            if line.strip():
+                yield self._loads(line)
+
+
+def _close_source(source, drain):
+    close = getattr(source, "close", None)
+    if close is None:
+        return
+    try:
+        close(drain=drain)
+    except TypeError:
+        close()
+
+
+def _to_record_batch(
+    rows: List[list], columns: List[str], schema: List[str]
+) -> pa.RecordBatch:
+    """
+    Transpose json rows straight into typed arrow columns,
+    typed by the result's schema where it names a single arrow type.
+    """
+    values = list(zip(*rows)) if rows else [[] for _ in columns]  # noqa: B905
+    arrays = []
+    for index, column in enumerate(values):
+        type_name = schema[index] if index < len(schema) else None
+        arrow_type = get_arrow_type(type_name)
+        try:
+            arrays.append(pa.array(column, type=arrow_type))
+        except (pa.ArrowInvalid, pa.ArrowTypeError, TypeError):
+            # values do not match the schema, ex: NUMBER holding decimals
+            arrays.append(pa.array(column))
+    return pa.RecordBatch.from_arrays(arrays, names=columns)
+
+
+def _import_optional(module: str, feature: str):
+    try:
+        return importlib.import_module(module)
+    except ImportError:
+        raise NotSupportedError(
+            msg=f"{feature} requires {module}. pip install {module}"
+        ) from None
+
+
+def _to_rows(batch: pa.RecordBatch) -> List[list]:
+    columns = [column.to_pylist() for column in batch.columns]
+    return [list(row) for row in zip(*columns)]  # noqa: B905
@@ -0,0 +1,255 @@
+"""
+Slow query log and sampled query profiler.
+
+SlowQueryLog is a metrics listener, see radio_duck.metrics, recording
+queries slower than a threshold and a sampled fraction of all others.
+An entry has the normalized sql, the types of its parameters, the phase
+timings, payload sizes and the stack of the caller outside radio_duck,
+ex: the sqlalchemy or superset code issuing the query. Entries go to a
+RingBuffer to query from python or to a rotating JsonlFile.
+
+The caller stack is only captured for recorded queries, the others cost
+one comparison.
+"""
+import collections
+import json
+import os
+import random
+import re
+import threading
+import time
+import traceback
+from typing import Callable, Dict, List, Optional
+
+from radio_duck.exceptions import InterfaceError
+from radio_duck.metrics import QueryMetrics
+from radio_duck.statements import normalize
+
+_numbers = re.compile(r"\b\d+(?:\.\d+)?(?:e[+-]?\d+)?\b", re.IGNORECASE)
+_package = os.path.dirname(os.path.abspath(__file__))
+
+
+def normalize_query(query) -> str:
+    """
+    :return: query without comments, with whitespace collapsed and
+    string and number literals replaced by ?, so that queries differing
+    only in literals look the same
+    """
+    if isinstance(query, bytes):
+        return f"<{len(query)} bytes substrait plan>"
+
+    def replace(literal):
+        # double quotes are identifiers
+        return literal if literal.startswith('"') else "?"
+
+    query = normalize(query, replace)
+    return _numbers.sub("?", query)
+
+
+def parameter_shape(parameters):
+    """
+    :return: type names of the parameters, not their values,
+    ex: ['int', 'str'] or {'name': 'str'}
+    """
+    if parameters is None:
+        return None
+    if isinstance(parameters, dict):
+        return {key: type(value).__name__ for key, value in parameters.items()}
+    return [type(value).__name__ for value in parameters]
+
+
+def caller_stack(depth: int = 20) -> List[str]:
+    """
+    :return: innermost frames first, the frames within radio_duck left out
+    """
+    frames = [
+        frame
+        for frame in traceback.extract_stack()
+        if not _in_driver(os.path.abspath(frame.filename))
+    ]
+    return [
+        f"{frame.filename}:{frame.lineno} {frame.name}"
+        for frame in reversed(frames[-depth:])
+    ]
+
+
+def _in_driver(filename: str) -> bool:
+    # tests live next to the modules, they are callers
+    return filename.startswith(_package) and not filename.endswith("_test.py")
+
+
+def query_origin(stack: List[str]) -> str:
+    """
+    :return: 'superset', 'sqlalchemy' or 'application'
+    """
+    for origin in ("superset", "sqlalchemy"):
+        for frame in stack:
+            if f"{os.sep}{origin}{os.sep}" in frame:
+                return origin
+    return "application"
+
+
+class RingBuffer(object):
+    """
+    Keeps the last entries in memory.
+    """
+
+    def __init__(self, size: int = 1000):
+        self._entries = collections.deque(maxlen=size)
+        self._lock = threading.Lock()
+
+    def write(self, entry: Dict):
+        with self._lock:
+            self._entries.append(entry)
+
+    def entries(
+        self,
+        min_elapsed_ms: Optional[float] = None,
+        where: Optional[Callable[[Dict], bool]] = None,
+    ) -> List[Dict]:
+        """
+        :param min_elapsed_ms: only entries taking at least as long
+        :param where: only entries it returns True for,
+        ex: lambda entry: entry['origin'] == 'superset'
+        :return: oldest first
+        """
+        with self._lock:
+            entries = list(self._entries)
+        if min_elapsed_ms is not None:
+            entries = [e for e in entries if e["elapsed_ms"] >= min_elapsed_ms]
+        if where is not None:
+            entries = [e for e in entries if where(e)]
+        return entries
+
+    def slowest(self, n: int = 10) -> List[Dict]:
+        with self._lock:
+            entries = list(self._entries)
+        return sorted(entries, key=lambda e: e["elapsed_ms"], reverse=True)[:n]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def close(self):
+        pass
+
+
+class JsonlFile(object):
+    """
+    Appends entries as json lines to a file, rotated when it grows past
+    max_bytes into path.1 ... path.<backups>.
+    """
+
+    def __init__(
+        self, path: str, max_bytes: int = 10 * 1024 * 1024, backups: int = 3
+    ):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self._lock = threading.Lock()
+        self._file = open(path, "a", encoding="utf-8")
+
+    def write(self, entry: Dict):
+        line = json.dumps(entry, default=str) + "\n"
+        with self._lock:
+            if self._file.closed:
+                return
+            if self._file.tell() + len(line) > self.max_bytes:
+                self._rotate()
+            self._file.write(line)
+            self._file.flush()
+
+    def _rotate(self):
+        self._file.close()
+        for index in range(self.backups - 1, 0, -1):
+            older = f"{self.path}.{index}"
+            if os.path.exists(older):
+                os.replace(older, f"{self.path}.{index + 1}")
+        if self.backups > 0:
+            os.replace(self.path, f"{self.path}.1")
+        else:
+            os.remove(self.path)
+        self._file = open(self.path, "a", encoding="utf-8")
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+
+class SlowQueryLog(object):
+    """
+    A listener recording slow and sampled queries to a sink.
+    """
+
+    def __init__(
+        self,
+        threshold_sec: Optional[float] = 1.0,
+        sample_rate: float = 0.0,
+        sink=None,
+        stack_depth: int = 20,
+    ):
+        """
+        :param threshold_sec: queries taking at least as long are recorded,
+        None to only sample
+        :param sample_rate: fraction of the other queries recorded,
+        ex: 0.01 profiles 1% of them
+        :param sink: RingBuffer (default), JsonlFile or any object with
+        write(entry: dict)
+        :param stack_depth: frames of the caller stack kept
+        :raise InterfaceError on a sample rate outside [0, 1]
+        """
+        if not 0 <= sample_rate <= 1:
+            raise InterfaceError(
+                msg=f"sample rate must be within [0, 1]: {sample_rate}"
+            )
+        self.threshold_sec = threshold_sec
+        self.sample_rate = sample_rate
+        self.sink = RingBuffer() if sink is None else sink
+        self.stack_depth = stack_depth
+
+    def __call__(self, metrics: QueryMetrics):
+        elapsed_sec = metrics.total_sec
+        if elapsed_sec is None:
+            elapsed_sec = metrics.elapsed_sec
+        threshold_sec = self.threshold_sec
+        if threshold_sec is not None and elapsed_sec >= threshold_sec:
+            reason = "slow"
+        elif self.sample_rate and random.random() < self.sample_rate:
+            reason = "sampled"
+        else:
+            return
+        stack = caller_stack(self.stack_depth)
+        self.sink.write(
+            {
+                "time": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+                "reason": reason,
+                "query_id": metrics.query_id,
+                "sql": normalize_query(metrics.query),
+                "parameters": parameter_shape(metrics.parameters),
+                "elapsed_ms": elapsed_sec * 1000,
+                "phases_ms": {
+                    phase: sec * 1000 for phase, sec in metrics.phases.items()
+                },
+                "request_bytes": metrics.request_bytes,
+                "response_bytes": metrics.response_bytes,
+                "rows": metrics.rows,
+                "retries": metrics.retries,
+                "status": metrics.status,
+                "cached": metrics.cached,
+                "error": metrics.error,
+                "origin": query_origin(stack),
+                "stack": stack,
+            }
+        )
+
+    def entries(self, *args, **kwargs) -> List[Dict]:
+        """
+        See RingBuffer.entries, only for a ring buffer sink.
+        """
+        return self.sink.entries(*args, **kwargs)
+
+    def close(self):
+        self.sink.close()
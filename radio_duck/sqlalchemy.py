@@ -1,12 +1,18 @@
 from __future__ import annotations
 
+import collections
+import copy
+import functools
 import logging
 import re
-from typing import TYPE_CHECKING, Tuple
+from typing import TYPE_CHECKING, Hashable, Tuple
 
 import sqlalchemy
+from sqlalchemy import pool, util
+from sqlalchemy.util.concurrency import await_fallback, await_only
 
 from radio_duck.reserved_keywords import keyword_list
+from radio_duck.statements import is_ddl
 
 if TYPE_CHECKING:
     from _typeshed import DBAPIConnection
@@ -15,17 +21,24 @@ from typing import Any, Callable, List
 
 # https://docs.sqlalchemy.org/en/20/core/internals.html#sqlalchemy.engine.Dialect.do_terminate
 # from sqlalchemy.engine import default, interfaces
-from sqlalchemy.engine import default
+from sqlalchemy.engine import AdaptedConnection, default
 from sqlalchemy.sql import compiler
 
 import radio_duck
-from radio_duck import db_types
-from radio_duck.db import connect_close_resource_msg
+from radio_duck import aio, db_types, exceptions
+from radio_duck.cache import TtlLruCache
+from radio_duck.db import (
+    connect_close_resource_msg,
+    connect_stale_socket_msg,
+    disconnect_errors,
+)
 from radio_duck.exceptions import NotSupportedError
+from radio_duck.federated import FederatedCursor
 from radio_duck.queries import (
     get_columns,
-    get_constraints,
-    get_indexes,
+    get_multi_columns,
+    get_multi_constraints,
+    get_multi_indexes,
     get_schemas,
     get_sequences,
     get_tables,
@@ -64,12 +77,158 @@ class RadioDuckDialectTypeCompiler(compiler.GenericTypeCompiler):
     visit_TEXT = compiler.GenericTypeCompiler.visit_VARCHAR
 
 
+class RadioDuckExecutionContext(default.DefaultExecutionContext):
+    def create_server_side_cursor(self):
+        """
+        stream_results / yield_per map onto a streaming cursor:
+        rows are decoded from the chunked response as sqlalchemy
+        asks for them, so client memory stays constant.
+        """
+        cursor = self._dbapi_connection.cursor(stream=True)
+        yield_per = self.execution_options.get("yield_per")
+        if yield_per:
+            cursor.arraysize = yield_per
+        return cursor
+
+
+def _schema_or_default(schema: str | None) -> str:
+    if schema is None or "" == schema.strip():
+        return RadioDuckDialect.default_schema_name
+    return schema
+
+
+def _has_flag(value, name: str) -> bool:
+    # sqlalchemy 2.0's ObjectKind and ObjectScope are enum.Flag,
+    # absent from older sqlalchemy
+    flag = type(value).__members__.get(name)
+    return flag is not None and bool(value & flag)
+
+
+def _reflection_key(method: str, args: tuple, kw: dict) -> tuple:
+    return (
+        method,
+        args,
+        tuple(
+            sorted(
+                (k, v)
+                for k, v in kw.items()
+                if k != "info_cache" and isinstance(v, Hashable)
+            )
+        ),
+    )
+
+
+def _reflection_cached(fn):
+    """
+    Reuse what a reflection method returns: within one inspector through
+    sqlalchemy's info_cache and, if the dialect has a reflection ttl,
+    across all inspectors of the engine.
+    """
+
+    @functools.wraps(fn)
+    def wrapper(self, connection, *args, **kw):
+        info_cache = kw.get("info_cache")
+        key = _reflection_key(fn.__name__, args, kw)
+        if info_cache is not None and key in info_cache:
+            return info_cache[key]
+        cache = self._reflection_cache
+        value = None if cache is None else cache.get(key)
+        if value is None:
+            value = fn(self, connection, *args, **kw)
+            if cache is not None:
+                # callers may modify what they get
+                cache.put(key, copy.deepcopy(value))
+        else:
+            value = copy.deepcopy(value)
+        if info_cache is not None:
+            info_cache[key] = value
+        return value
+
+    return wrapper
+
+
+def _column(row) -> dict:
+    # a row of PRAGMA table_info: cid, name, type, notnull, dflt_value, pk
+    # not sending 'autoincrement' & 'sequence'
+    # duckdb does not have these, hence not in result
+    return {
+        "name": row[1],
+        "type": db_types.get_alchemy_type(row[2]),
+        "nullable": not row[3],  # outputcolumn is 'notnull'
+        "default": row[4],
+        "primary_key": row[5],
+    }
+
+
+def _pk_constraint(rows) -> dict:
+    if len(rows) == 0 or rows[0] is None:
+        return {"name": None, "constrained_columns": []}
+    row = rows[0]
+    return {"name": row[0], "constrained_columns": row[1]}
+
+
+def _unique_constraint(row) -> dict:
+    return {"name": row[0], "column_names": row[1]}
+
+
+def _index(row) -> dict:
+    # index_name, sql, is_unique. column names are parsed from the sql
+    index = {"name": row[0], "unique": row[2], "column_names": []}
+    match = re.search(r"\((.*?)\)", row[1] or "")
+    if match:
+        columns = match.group(1).split(",")
+        index["column_names"] = [column.strip() for column in columns]
+    return index
+
+
+def _bypass_result_cache(context) -> bool:
+    """
+    conn.execution_options(radio_duck_cache=False) sends the query to
+    radio_duck even if the connection's result cache has its response.
+    """
+    if context is None:
+        return False
+    return not context.execution_options.get("radio_duck_cache", True)
+
+
+def _execute_kwargs(context, cursor=None) -> dict:
+    """
+    Cursor.execute() kwargs from execution options, ex:
+    conn.execution_options(radio_duck_timeout_sec=30) limits
+    the statements of conn to 30 seconds and radio_duck_submit=True
+    submits them and polls for their results. With shards,
+    radio_duck_merge, radio_duck_order_by and radio_duck_aggregate
+    choose how their rows are merged, see FederatedCursor.execute().
+    """
+    kwargs = {}
+    if _bypass_result_cache(context):
+        kwargs["cache"] = False
+    if context is not None:
+        timeout_sec = context.execution_options.get("radio_duck_timeout_sec")
+        if timeout_sec is not None:
+            kwargs["timeout_sec"] = float(timeout_sec)
+        submit = context.execution_options.get("radio_duck_submit")
+        if submit is not None:
+            kwargs["submit"] = bool(submit)
+        if isinstance(cursor, FederatedCursor):
+            for option in _merge_options:
+                value = context.execution_options.get("radio_duck_" + option)
+                if value is not None:
+                    kwargs[option] = value
+    return kwargs
+
+
+_merge_options = ("merge", "order_by", "aggregate")
+
+
 class RadioDuckDialect(default.DefaultDialect):
     #  https://docs.sqlalchemy.org/en/13/core/reflection.html#sqlalchemy.engine.reflection.Inspector.get_pk_constraint
     type_compiler = RadioDuckDialectTypeCompiler
     preparer = RadioDuckDialectPreparer
+    execution_ctx_cls = RadioDuckExecutionContext
 
     supports_sequences = True
+    supports_server_side_cursors = True
     supports_native_enum = True
     supports_native_boolean = True
 
@@ -115,8 +274,19 @@ class RadioDuckDialect(default.DefaultDialect):
         # the direct reference to the "NO_LINTING" object
         compiler_linting=int(compiler.NO_LINTING),  # noqa: B008
         server_side_cursors=False,
+        reflection_cache_ttl_sec=0,
+        reflection_cache_size=1024,
         **kwargs,
     ):
+        """
+        :param reflection_cache_ttl_sec: seconds for which reflected
+        metadata is reused across inspectors of the engine. 0 (default)
+        only uses sqlalchemy's per inspector info_cache. Also settable
+        as a url query parameter.
+        """
+        self.reflection_cache_size = reflection_cache_size
+        self._reflection_cache: TtlLruCache | None = None
+        self._configure_reflection_cache(reflection_cache_ttl_sec)
         super().__init__(
             convert_unicode=convert_unicode,
             encoding=encoding,
@@ -134,6 +304,16 @@ class RadioDuckDialect(default.DefaultDialect):
 
     # do methods
 
+    def do_execute(self, cursor, statement, parameters, context=None):
+        self._invalidate_reflection_cache(statement)
+        cursor.execute(
+            statement, parameters, **_execute_kwargs(context, cursor)
+        )
+
+    def do_execute_no_params(self, cursor, statement, context=None):
+        self._invalidate_reflection_cache(statement)
+        cursor.execute(statement, **_execute_kwargs(context, cursor))
+
     def do_savepoint(self, connection, name):
         raise NotImplementedError()
 
@@ -181,10 +361,26 @@ class RadioDuckDialect(default.DefaultDialect):
 
         opts = url.translate_connect_args()
         opts.update(url.query)
+        if "reflection_cache_ttl_sec" in opts:
+            self._configure_reflection_cache(
+                opts.pop("reflection_cache_ttl_sec")
+            )
         # todo: default impl returns [[], opts]..
         # this is a bug as pydoc says return tuple! not list
         return [], opts
 
+    def _configure_reflection_cache(self, ttl_sec):
+        ttl_sec = float(ttl_sec)
+        self._reflection_cache = (
+            TtlLruCache(self.reflection_cache_size, ttl_sec)
+            if ttl_sec > 0
+            else None
+        )
+
+    def _invalidate_reflection_cache(self, statement):
+        if self._reflection_cache is not None and is_ddl(statement):
+            self._reflection_cache.invalidate()
+
     def create_xid(self):
         raise NotSupportedError("transactions not supported over http yet")
 
@@ -228,14 +424,21 @@ class RadioDuckDialect(default.DefaultDialect):
         :param cursor:
         :return:
         """
-        # return all(
-        #     e is not None,
-        #     radio_duck.db.connect_close_resource_msg in str(e)
-        # )
-        return False if e is None else connect_close_resource_msg in str(e)
+        if e is None:
+            return False
+        if isinstance(e, disconnect_errors) or isinstance(
+            e.__cause__, disconnect_errors
+        ):
+            return True
+        msg = str(e)
+        return (
+            connect_close_resource_msg in msg
+            or connect_stale_socket_msg in msg  # noqa: W503
+        )
 
     # ----has methods
 
+    @_reflection_cached
     def has_index(self, connection, table_name, index_name, schema=None):
         if schema is None or "" == schema.strip():
             schema = RadioDuckDialect.default_schema_name
@@ -244,6 +447,7 @@ class RadioDuckDialect(default.DefaultDialect):
         )
         return len(rows) == 1
 
+    @_reflection_cached
     def has_table(self, connection, table_name, schema=None, **kw) -> None:
         if schema is None or "" == schema.strip():
             schema = RadioDuckDialect.default_schema_name
@@ -252,6 +456,7 @@ class RadioDuckDialect(default.DefaultDialect):
         )
         return len(rows) == 1
 
+    @_reflection_cached
     def has_sequence(
         self, connection, sequence_name, schema=None, **kw
     ) -> bool:
@@ -264,6 +469,7 @@ class RadioDuckDialect(default.DefaultDialect):
 
     # ----get methods
 
+    @_reflection_cached
     def get_table_names(
         self, connection, schema=None, **kw
     ) -> List[str] | None:
@@ -276,6 +482,7 @@ class RadioDuckDialect(default.DefaultDialect):
         table_names = [col_val for row in rows for col_val in row]
         return table_names
 
+    @_reflection_cached
     def get_view_names(self, connection, schema=None, **kw):
         if schema is None or "" == schema.strip():
             schema = RadioDuckDialect.default_schema_name
@@ -285,6 +492,7 @@ class RadioDuckDialect(default.DefaultDialect):
         views = [col_val for row in rows for col_val in row]
         return views
 
+    @_reflection_cached
     def get_view_definition(
         self, connection, view_name, schema=None, **kw
     ) -> None:
@@ -296,19 +504,12 @@ class RadioDuckDialect(default.DefaultDialect):
         row = rows[0]
         return row[0]  # return sql
 
+    @_reflection_cached
     def get_unique_constraints(
         self, connection, table_name, schema=None, **kw
     ) -> list[dict[str, Any]]:
-        if schema is None or "" == schema.strip():
-            schema = RadioDuckDialect.default_schema_name
-
-        rows = self._execute_query(
-            connection, get_constraints, schema, table_name, "UNIQUE"
-        )  # list of list
-        list_of_maps = [
-            {"name": row[0], "column_names": row[1]} for row in rows
-        ]
-        return list_of_maps
+        rows = self._constraints(connection, schema, "UNIQUE", kw)
+        return [_unique_constraint(row) for row in rows.get(table_name, [])]
 
     def get_temp_view_names(self, connection, schema=None, **kw):
         # Temporary views exist in a special schema, so a schema name
@@ -333,6 +534,7 @@ class RadioDuckDialect(default.DefaultDialect):
     def get_table_comment(self, connection, table_name, schema=None, **kw):
         raise NotImplementedError()
 
+    @_reflection_cached
     def get_sequence_names(self, connection, schema=None, **kw) -> list[Any]:
         if schema is None or "" == schema.strip():
             schema = RadioDuckDialect.default_schema_name
@@ -342,103 +544,244 @@ class RadioDuckDialect(default.DefaultDialect):
         seq_names = [col_val for row in rows for col_val in row]
         return seq_names
 
+    @_reflection_cached
     def get_pk_constraint(self, connection, table_name, schema=None, **kw):
         # https://docs.sqlalchemy.org/en/13/core/reflection.html#sqlalchemy.engine.reflection.Inspector.get_pk_constraint
-        if schema is None or "" == schema.strip():
-            schema = RadioDuckDialect.default_schema_name
-
-        rows = self._execute_query(
-            connection, get_constraints, schema, table_name, "PRIMARY KEY"
-        )  # list of list
-        if len(rows) == 0 or rows[0] is None:
-            return {"name": None, "constrained_columns": []}
-        row = rows[0]
-        return {"name": row[0], "constrained_columns": row[1]}
+        rows = self._constraints(connection, schema, "PRIMARY KEY", kw)
+        return _pk_constraint(rows.get(table_name, []))
 
+    @_reflection_cached
     def get_indexes(self, connection, table_name, schema=None, **kw):
-        if schema is None or "" == schema.strip():
-            schema = RadioDuckDialect.default_schema_name
-
-        rows = self._execute_query(
-            connection, get_indexes, schema, table_name
-        )  # list of list
-        list_of_maps = [
-            {"name": row[0], "sql": row[1], "unique": row[2]} for row in rows
-        ]
-        for mp in list_of_maps:
-            # add column names
-            mp["column_names"] = []
-            # parse sql for column names
-            sql = mp["sql"]
-            match = re.search(r"\((.*?)\)", sql)
-            if match:
-                columns = match.group(1).split(",")
-                columns = [column.strip() for column in columns]
-                mp["column_names"] = columns
-            del mp["sql"]
-
-        return list_of_maps
+        rows = self._schema_rows(
+            connection, kw, get_multi_indexes, _schema_or_default(schema)
+        )
+        return [_index(row) for row in rows.get(table_name, [])]
 
+    @_reflection_cached
     def get_foreign_keys(self, connection, table_name, schema=None, **kw):
-        if schema is None or "" == schema.strip():
-            schema = RadioDuckDialect.default_schema_name
-
-        rows = self._execute_query(
-            connection, get_constraints, schema, table_name, "FOREIGN KEY"
-        )  # list of list
+        rows = self._constraints(connection, schema, "FOREIGN KEY", kw)
         # https://docs.sqlalchemy.org/en/13/core/reflection.html#sqlalchemy.engine.reflection.Inspector.get_foreign_keys
-        list_of_maps = []
-        for row in rows:
-            refered_table, refered_columns = self._get_reference_details(
-                row[0]
-            )
-            list_of_maps.append(
-                {
-                    "name": row[0],
-                    "constrained_columns": row[1],
-                    "referred_table": refered_table,
-                    "referred_columns": refered_columns,
-                }
-            )
-
-        return list_of_maps
+        return [self._foreign_key(row) for row in rows.get(table_name, [])]
 
+    @_reflection_cached
     def get_columns(self, connection, table_name, schema=None, **kw):
-        if schema is None or "" == schema.strip():
-            schema = RadioDuckDialect.default_schema_name
-
-        # query = f"SET schema '{schema}'; PRAGMA table_info('{table_name}')"
-        query = get_columns.format(schema, table_name)
-        rows = self._execute_query(connection, query)  # list of list
-        list_of_maps = [
-            {
-                "name": row[1],
-                "type": db_types.get_alchemy_type(row[2]),
-                "nullable": not row[3],  # outputcolumn is 'notnull'
-                "default": row[4],
-                # "autoincrement": "",
-                "primary_key": row[5],
-            }
-            for row in rows
-        ]
-        # not sending 'autoincrement' & 'sequence'
-        # duckdb does not have these, hence not in result
-        return list_of_maps
-
+        schema = _schema_or_default(schema)
+        rows = self._schema_rows(
+            connection, kw, get_multi_columns, schema, schema
+        ).get(table_name)
+        if rows is None:
+            # not in the current or temp database, ex: of an attached one
+            query = get_columns.format(schema, table_name)
+            rows = self._execute_query(connection, query)  # list of list
+        return [_column(row) for row in rows]
+
+    @_reflection_cached
     def get_check_constraints(
         self, connection, table_name, schema=None, **kw
     ) -> list[dict[str, Any]]:
-        if schema is None or "" == schema.strip():
-            schema = RadioDuckDialect.default_schema_name
-
-        rows = self._execute_query(
-            connection, get_constraints, schema, table_name, "CHECK"
-        )  # list of list
-        list_of_maps = [{"name": row[0], "sqltext": row[1]} for row in rows]
+        rows = self._constraints(connection, schema, "CHECK", kw)
+        list_of_maps = [
+            {"name": row[0], "sqltext": row[1]}
+            for row in rows.get(table_name, [])
+        ]
         # not including keys 'autoincrement' & 'sequence' -
         # duckdb does not have these, hence not in result
         return list_of_maps
 
+    # ----schema wide reflection
+    # reflecting a schema table by table, as MetaData.reflect() and
+    # superset do, would send a catalog query per table and method.
+    # the per table methods above instead take their table's rows from
+    # one query for all tables of the schema, which the info_cache of
+    # the inspector and the dialect's reflection cache keep. sqlalchemy
+    # 2.0 reflects through the get_multi methods, which share these
+    # queries.
+
+    @_reflection_cached
+    def _rows_by_table(self, connection, query: str, *params, **kw) -> dict:
+        """
+        :param query: catalog query of a whole schema whose first
+        column is the table name
+        :return: {table_name: [row without the table name]}
+        """
+        rows_by_table = {}
+        for row in self._execute_query(connection, query, *params):
+            rows_by_table.setdefault(row[0], []).append(tuple(row[1:]))
+        return rows_by_table
+
+    def _schema_rows(self, connection, kw: dict, query: str, *params):
+        # only the info_cache, other reflection options do not change
+        # what the catalog query returns
+        return self._rows_by_table(
+            connection, query, *params, info_cache=kw.get("info_cache")
+        )
+
+    def _constraints(
+        self, connection, schema: str | None, constraint_type: str, kw
+    ) -> dict:
+        return self._schema_rows(
+            connection,
+            kw,
+            get_multi_constraints,
+            _schema_or_default(schema),
+            constraint_type,
+        )
+
+    def get_multi_columns(
+        self, connection, schema=None, filter_names=None, **kw
+    ):
+        key_schema, schema = schema, _schema_or_default(schema)
+        # table_name, then the same columns as PRAGMA table_info
+        rows = self._schema_rows(
+            connection, kw, get_multi_columns, schema, schema
+        )
+        return self._group_by_table(
+            connection,
+            schema,
+            key_schema,
+            rows,
+            filter_names,
+            _column,
+            None,
+            **kw,
+        ).items()
+
+    def get_multi_pk_constraint(
+        self, connection, schema=None, filter_names=None, **kw
+    ):
+        key_schema, schema = schema, _schema_or_default(schema)
+        rows = self._constraints(connection, schema, "PRIMARY KEY", kw)
+        return self._group_by_table(
+            connection,
+            schema,
+            key_schema,
+            rows,
+            filter_names,
+            None,
+            _pk_constraint,
+            **kw,
+        ).items()
+
+    def get_multi_foreign_keys(
+        self, connection, schema=None, filter_names=None, **kw
+    ):
+        key_schema, schema = schema, _schema_or_default(schema)
+        rows = self._constraints(connection, schema, "FOREIGN KEY", kw)
+        return self._group_by_table(
+            connection,
+            schema,
+            key_schema,
+            rows,
+            filter_names,
+            self._foreign_key,
+            None,
+            **kw,
+        ).items()
+
+    def get_multi_indexes(
+        self, connection, schema=None, filter_names=None, **kw
+    ):
+        key_schema, schema = schema, _schema_or_default(schema)
+        rows = self._schema_rows(connection, kw, get_multi_indexes, schema)
+        return self._group_by_table(
+            connection,
+            schema,
+            key_schema,
+            rows,
+            filter_names,
+            _index,
+            None,
+            **kw,
+        ).items()
+
+    def get_multi_unique_constraints(
+        self, connection, schema=None, filter_names=None, **kw
+    ):
+        key_schema, schema = schema, _schema_or_default(schema)
+        rows = self._constraints(connection, schema, "UNIQUE", kw)
+        return self._group_by_table(
+            connection,
+            schema,
+            key_schema,
+            rows,
+            filter_names,
+            _unique_constraint,
+            None,
+            **kw,
+        ).items()
+
+    def _group_by_table(
+        self,
+        connection,
+        schema: str,
+        key_schema: str | None,
+        rows_by_table: dict,
+        filter_names,
+        to_item: Callable | None,
+        to_value: Callable | None,
+        **kw,
+    ) -> dict:
+        """
+        :param key_schema: schema as the caller gave it, None for the
+        default schema
+        :param rows_by_table: see _rows_by_table
+        :param to_item: builds one list element of a table's value
+        from a row without its table name
+        :param to_value: builds a table's value from all its rows
+        instead, ex: its primary key
+        :return: {(key_schema, table_name): value} for every table
+        in filter_names or, if not given, every object of the schema
+        of the kind and scope in kw
+        """
+        if filter_names is None:
+            tables = self._object_names(connection, schema, **kw)
+        else:
+            tables = list(filter_names)
+        grouped = {table: rows_by_table.get(table, []) for table in tables}
+        if to_value is not None:
+            return {(key_schema, t): to_value(rs) for t, rs in grouped.items()}
+        return {
+            (key_schema, t): [to_item(r) for r in rs]
+            for t, rs in grouped.items()
+        }
+
+    def _object_names(
+        self, connection, schema: str, kind=None, scope=None, **kw
+    ) -> list:
+        """
+        :param kind: sqlalchemy 2.0 ObjectKind, tables if None
+        :param scope: sqlalchemy 2.0 ObjectScope, default scope if None
+        :return: names of the schema's tables and views of the kind
+        and scope
+        """
+        default = scope is None or _has_flag(scope, "DEFAULT")
+        temporary = scope is not None and _has_flag(scope, "TEMPORARY")
+        names = []
+        if kind is None or _has_flag(kind, "TABLE"):
+            if default:
+                names.extend(self.get_table_names(connection, schema, **kw))
+            if temporary:
+                names.extend(
+                    self.get_temp_table_names(connection, schema, **kw)
+                )
+        if kind is not None and (
+            _has_flag(kind, "VIEW") or _has_flag(kind, "MATERIALIZED_VIEW")
+        ):
+            if default:
+                names.extend(self.get_view_names(connection, schema, **kw))
+            if temporary:
+                names.extend(self.get_temp_view_names(connection, **kw))
+        return names
+
+    def _foreign_key(self, row) -> dict:
+        refered_table, refered_columns = self._get_reference_details(row[0])
+        return {
+            "name": row[0],
+            "constrained_columns": row[1],
+            "referred_table": refered_table,
+            "referred_columns": refered_columns,
+        }
+
     def get_isolation_level(self, dbapi_conn) -> str | None:
         return self.isolation_level
 
@@ -446,6 +789,7 @@ class RadioDuckDialect(default.DefaultDialect):
         # we have only snapshot
         return self.isolation_level
 
+    @_reflection_cached
     def get_schema_names(
         self, connection: sqlalchemy.engine.base.Connection, **kw
     ):
@@ -506,3 +850,152 @@ class RadioDuckDialect(default.DefaultDialect):
             return (refered_table, refered_table_columns)
         else:
             return (None, [])
+
+
+class AsyncAdaptRadioDuckCursor(object):
+    """
+    Sync DB-API facade over radio_duck.aio.AsyncCursor.
+    execute() is awaited from sqlalchemy's greenlet and reads all rows,
+    so fetching needs no awaiting and works outside the greenlet too.
+    """
+
+    def __init__(self, adapt_connection: AsyncAdaptRadioDuckConnection):
+        self.await_ = adapt_connection.await_
+        self._cursor = adapt_connection._connection.cursor()
+        self._rows = collections.deque()
+        self.description = None
+        self.rowcount = -1
+        self.arraysize = 1
+
+    def close(self):
+        self._rows.clear()
+        self.await_(self._cursor.close())
+
+    @property
+    def query_id(self):
+        return self._cursor.query_id
+
+    def reserve_query_id(self):
+        return self._cursor.reserve_query_id()
+
+    def cancel(self):
+        return self.await_(self._cursor.cancel())
+
+    def execute(self, operation, parameters=None, **kwargs):
+        self.await_(self._cursor.execute(operation, parameters, **kwargs))
+        self._read_result()
+
+    def executemany(self, operation, seq_of_parameters):
+        self.await_(self._cursor.executemany(operation, seq_of_parameters))
+        self._read_result()
+
+    def fetchone(self):
+        return self._rows.popleft() if self._rows else None
+
+    def fetchmany(self, size=None):
+        if size is None:
+            size = self.arraysize
+        return [
+            self._rows.popleft() for _ in range(min(size, len(self._rows)))
+        ]
+
+    def fetchall(self):
+        rows = list(self._rows)
+        self._rows.clear()
+        return rows
+
+    def setinputsizes(self, *inputsizes):
+        pass
+
+    def _read_result(self):
+        self.description = self._cursor.description
+        self._rows = collections.deque(
+            self.await_(self._cursor.fetchall())
+            if self.description is not None
+            else []
+        )
+        self.rowcount = self._cursor.rowcount
+
+
+class AsyncAdaptRadioDuckConnection(AdaptedConnection):
+    await_ = staticmethod(await_only)
+
+    def __init__(self, dbapi, connection):
+        self.dbapi = dbapi
+        self._connection = connection
+
+    def cursor(self, *args, **kwargs):
+        # results are read whole by the async driver, so a
+        # server side (stream=True) cursor is a regular one
+        return AsyncAdaptRadioDuckCursor(self)
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+    def cancel(self, query_id=None):
+        return self.await_(self._connection.cancel(query_id))
+
+    def close(self):
+        self.await_(self._connection.close())
+
+
+class AsyncAdaptFallbackRadioDuckConnection(AsyncAdaptRadioDuckConnection):
+    await_ = staticmethod(await_fallback)
+
+
+class AsyncAdaptRadioDuckDbapi(object):
+    """
+    DB-API module facade handing out adapted radio_duck.aio connections.
+    """
+
+    def __init__(self):
+        self.paramstyle = radio_duck.paramstyle
+        self.apilevel = radio_duck.apilevel
+        self.threadsafety = radio_duck.threadsafety
+        for name in (
+            "Warning",
+            "Error",
+            "InterfaceError",
+            "DatabaseError",
+            "InternalError",
+            "OperationalError",
+            "ProgrammingError",
+            "IntegrityError",
+            "DataError",
+            "NotSupportedError",
+        ):
+            setattr(self, name, getattr(exceptions, name))
+
+    def connect(self, *args, **kwargs):
+        if util.asbool(kwargs.pop("async_fallback", False)):
+            return AsyncAdaptFallbackRadioDuckConnection(
+                self, await_fallback(aio.connect(*args, **kwargs))
+            )
+        return AsyncAdaptRadioDuckConnection(
+            self, await_only(aio.connect(*args, **kwargs))
+        )
+
+
+class RadioDuckAsyncDialect(RadioDuckDialect):
+    """
+    asyncio variant, for create_async_engine("radio_duck+district5_async://")
+    """
+
+    driver = "district5_async"
+    is_async = True
+
+    @classmethod
+    def dbapi(cls):
+        return AsyncAdaptRadioDuckDbapi()
+
+    @classmethod
+    def get_pool_class(cls, url):
+        if util.asbool(url.query.get("async_fallback", False)):
+            return pool.FallbackAsyncAdaptedQueuePool
+        return pool.AsyncAdaptedQueuePool
+
+    def get_driver_connection(self, connection):
+        return connection._connection
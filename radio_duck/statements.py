@@ -0,0 +1,227 @@
+import re
+from typing import Callable, List, Optional, Tuple, Union
+
+# statements which only read data and are safe to send again
+_read_only_keywords = {
+    "SELECT",
+    "WITH",
+    "SHOW",
+    "DESCRIBE",
+    "DESC",
+    "EXPLAIN",
+    "SUMMARIZE",
+    "VALUES",
+    "FROM",
+    "TABLE",
+}
+
+# statements which change the catalog, so what reflection returns
+_ddl_keywords = {
+    "CREATE",
+    "ALTER",
+    "DROP",
+    "COMMENT",
+    "ATTACH",
+    "DETACH",
+    "IMPORT",
+    "USE",
+}
+
+# keywords of statements writing data, a WITH statement using any
+# of them is not a read
+_write_keywords = {
+    "INSERT",
+    "UPDATE",
+    "DELETE",
+    "MERGE",
+    "COPY",
+    "CREATE",
+    "DROP",
+    "ALTER",
+    "TRUNCATE",
+}
+
+# statements changing settings of the session, not data
+_session_keywords = {"SET", "RESET"}
+
+# PRAGMAs reading the catalog, ex: the dialect's reflection
+_read_pragmas = {
+    "TABLE_INFO",
+    "SHOW",
+    "SHOW_TABLES",
+    "SHOW_TABLES_EXPANDED",
+    "SHOW_DATABASES",
+    "DATABASE_LIST",
+    "DATABASE_SIZE",
+    "STORAGE_INFO",
+    "METADATA_INFO",
+    "FUNCTIONS",
+    "COLLATIONS",
+    "VERSION",
+    "PLATFORM",
+}
+
+# quoted literals and identifiers: E'' strings with backslash escapes,
+# '' strings, "" identifiers and $tag$ dollar quoted strings
+_literal = (
+    r"(\b[Ee]'(?:[^'\\]|\\.|'')*'|'(?:[^']|'')*'|\"(?:[^\"]|\"\")*\""
+    r"|\$([A-Za-z_]\w*|)\$.*?\$\2\$)"
+)
+# quoted literals and identifiers, kept as they are, and comments.
+# ; and keywords within them are not sql.
+_literals_and_comments = re.compile(
+    _literal + r"|--[^\n]*|/\*.*?\*/", re.DOTALL
+)
+# quoted literals and identifiers, and runs of whitespace and comments
+_literals_and_blanks = re.compile(
+    _literal + r"|(?:\s|--[^\n]*|/\*.*?\*/)+", re.DOTALL
+)
+_leading_keyword = re.compile(r"[\s(]*([A-Za-z]+)")
+_keywords = re.compile(r"[A-Za-z_]+")
+
+# INSERT INTO t (a, b) VALUES (?, ?) with a single row of placeholders
+_insert_values = re.compile(
+    r"^\s*(INSERT\s+INTO\s+.+?\s+VALUES\s*)(\(\s*\?(?:\s*,\s*\?)*\s*\))"
+    r"\s*;?\s*$",
+    re.IGNORECASE | re.DOTALL,
+)
+
+
+def strip_comments(query: str) -> str:
+    """
+    :return: query with comments outside of quoted literals blanked
+    """
+
+    def replace(match):
+        return match.group(0) if match.group(1) is not None else " "
+
+    return _literals_and_comments.sub(replace, query)
+
+
+def normalize(
+    query: str, literal: Optional[Callable[[str], str]] = None
+) -> str:
+    """
+    :param literal: returns what replaces a quoted literal or identifier,
+    they are kept as they are by default
+    :return: query without comments and trailing ; and with runs of
+    whitespace outside of quoted literals and identifiers collapsed
+    """
+
+    def replace(match):
+        quoted = match.group(1)
+        if quoted is None:
+            return " "
+        return quoted if literal is None else literal(quoted)
+
+    return _literals_and_blanks.sub(replace, query).strip().rstrip(";").strip()
+
+
+def split_statements(query: str) -> List[str]:
+    """
+    :return: the non empty statements of a query with comments dropped
+    and quoted literals and identifiers emptied, ex: 'x' becomes '', so
+    that neither ; nor keywords within them count
+    """
+
+    def replace(match):
+        literal = match.group(1)
+        if literal is None:
+            return " "
+        return '""' if literal.startswith('"') else "''"
+
+    sql = _literals_and_comments.sub(replace, query)
+    return [s for s in sql.split(";") if s.strip() != ""]
+
+
+def first_keyword(statement: str) -> str:
+    """
+    :return: the upper cased leading keyword of a statement or ''
+    """
+    match = _leading_keyword.match(statement)
+    return "" if match is None else match.group(1).upper()
+
+
+def _is_read(statement: str) -> bool:
+    keyword = first_keyword(statement)
+    if keyword not in _read_only_keywords:
+        return False
+    keywords = [k.upper() for k in _keywords.findall(statement)]
+    if keyword == "EXPLAIN":
+        # explain analyze runs the statement
+        return len(keywords) < 2 or keywords[1] not in ("ANALYZE", "ANALYSE")
+    if keyword == "WITH":
+        # with ... insert/update/delete
+        return not _write_keywords.intersection(keywords)
+    return True
+
+
+def is_read_only(query: Union[bytes, str]) -> bool:
+    """
+    Conservatively decide if a query only reads data.
+    Every statement of a multi statement query must be a read.
+    Substrait plans (bytes) are never considered read only.
+    :param query:
+    :return: True if the query can be safely retried
+    """
+    if not isinstance(query, str):
+        return False
+    statements = split_statements(query)
+    if not statements:
+        return False
+    return all(_is_read(s) for s in statements)
+
+
+def _changes_data(statement: str) -> bool:
+    if _is_read(statement):
+        return False
+    keywords = [k.upper() for k in _keywords.findall(statement)[:2]]
+    if not keywords or keywords[0] in _session_keywords:
+        return False
+    if keywords[0] == "PRAGMA":
+        return len(keywords) < 2 or keywords[1] not in _read_pragmas
+    return True
+
+
+def changes_data(query: Union[bytes, str]) -> bool:
+    """
+    Unlike is_read_only(), a query changing only session settings,
+    ex: SET schema 'main'; PRAGMA table_info('pond'), does not change
+    what other queries return, so it leaves cached results alone.
+    Substrait plans (bytes) may change data.
+    :return: True if any statement of the query may change data
+    """
+    if not isinstance(query, str):
+        return True
+    return any(_changes_data(s) for s in split_statements(query))
+
+
+def is_ddl(query: Union[bytes, str]) -> bool:
+    """
+    :return: True if any statement of the query may change the catalog.
+    Substrait plans (bytes) are never ddl.
+    """
+    if not isinstance(query, str):
+        return False
+    for statement in split_statements(query):
+        keywords = [k.upper() for k in _keywords.findall(statement)[:3]]
+        if keywords[:2] in (["EXPLAIN", "ANALYZE"], ["EXPLAIN", "ANALYSE"]):
+            keywords = keywords[2:]
+        if keywords and keywords[0] in _ddl_keywords:
+            return True
+    return False
+
+
+def split_insert_values(query: str) -> Optional[Tuple[str, str]]:
+    """
+    Split a single row 'INSERT ... VALUES (?, ?)' into the statement
+    before VALUES' row and the placeholder row, so that it can be
+    repeated for a multi row insert.
+    :return: (prefix, row) or None if the query is not such an insert
+    """
+    if not isinstance(query, str):
+        return None
+    match = _insert_values.match(query)
+    if match is None:
+        return None
+    return match.group(1), match.group(2)
@@ -0,0 +1,91 @@
+from radio_duck.statements import (  # noqa: E501
+    changes_data,
+    first_keyword,
+    is_ddl,
+    is_read_only,
+    normalize,
+    split_insert_values,
+    split_statements,
+    strip_comments,
+)
+
+
+def test_first_keyword():
+    assert "SELECT" == first_keyword("  (select 1)")
+    assert "" == first_keyword("  ")
+
+
+def test_normalize():
+    assert "select 'a  b', \"c  d\" from t" == normalize(
+        "select 'a  b',\n  \"c  d\" /* x */ from t -- y\n;"
+    )
+    assert "select E'a\\'  b', $t$ ; $t$" == normalize(
+        "select  E'a\\'  b',  $t$ ; $t$;"
+    )
+    assert "select ?, ?" == normalize("select 'a',  $$b$$", lambda _: "?")
+
+
+def test_changes_data():
+    assert not changes_data("select 1; show tables")
+    assert not changes_data("SET schema 'main'; PRAGMA table_info('pond')")
+    assert not changes_data("reset threads; pragma show('pond')")
+    assert changes_data("insert into pond values (1)")
+    assert changes_data("set schema 'main'; delete from pond")
+    assert changes_data("with t as (select 1) update pond set n = 1")
+    assert changes_data("pragma import_database('/tmp/x')")
+    assert changes_data(b"substrait plan")
+
+
+def test_is_read_only():
+    assert is_read_only("select * from pond")
+    assert is_read_only("-- comment\n WITH t AS (SELECT 1) SELECT * FROM t")
+    assert is_read_only("/* hint */ show tables; describe pond;")
+    assert not is_read_only("insert into pond values ('teal', 1)")
+    assert not is_read_only("SET schema 'main'; PRAGMA table_info('pond')")
+    assert not is_read_only("select 1; drop table pond")
+    assert not is_read_only(b"substrait plan")
+    assert not is_read_only(" ; ")
+    # ; and comment markers within literals are not sql
+    assert not is_read_only("SELECT '--'; DROP TABLE t")
+    assert not is_read_only("select '/*'; delete from t; select '*/'")
+    assert is_read_only("select 'a;b', \"c;d\" from t -- ; drop t")
+    assert is_read_only("select $$;drop table t$$, E'it\\'s;'")
+    assert not is_read_only(
+        "WITH old AS (SELECT * FROM t) DELETE FROM t WHERE id IN old"
+    )
+    assert not is_read_only("with x as (select 1) insert into t from x")
+    assert is_read_only("with x as (select 'delete') select * from x")
+    assert is_read_only("explain select * from t")
+    assert not is_read_only("EXPLAIN ANALYZE SELECT * FROM t")
+
+
+def test_is_ddl():
+    assert is_ddl("create table pond(duck_type string)")
+    assert is_ddl("insert into pond values (1); DROP TABLE pond")
+    assert is_ddl("-- x\n alter table pond add column n int")
+    assert not is_ddl("select 'create table x'")
+    assert not is_ddl("insert into pond values ('create')")
+    assert not is_ddl(b"substrait")
+    assert is_ddl("SELECT '--'; DROP TABLE t")
+    assert not is_ddl("select 'a; drop table t'")
+    assert is_ddl("explain analyze create table t as select 1")
+
+
+def test_split_insert_values():
+    prefix, row = split_insert_values(
+        "INSERT INTO pond (duck_type, total) VALUES (?, ?);"
+    )
+    assert "INSERT INTO pond (duck_type, total) VALUES " == prefix
+    assert "(?, ?)" == row
+    assert split_insert_values("insert into pond values (?,?)") is not None
+    assert split_insert_values("insert into pond select * from t") is None
+    assert split_insert_values("insert into pond values (?, 1)") is None
+    assert split_insert_values("update pond set total = ?") is None
+    assert split_insert_values(b"plan") is None
+
+
+def test_split_statements():
+    assert ["select ''", " drop table t"] == split_statements(
+        "select 'a;b'; drop table t;"
+    )
+    assert "select '--x'  \n, 1" == strip_comments("select '--x' -- c\n, 1")
@@ -0,0 +1,118 @@
+"""
+Optional OpenTelemetry spans around connect, execute and fetch.
+
+Off unless connect(tracing=True), and a no-op when opentelemetry is not
+installed. An execute span has a child span per phase (encode,
+round_trip, read, decode, see radio_duck.metrics) and the fingerprint,
+rows and bytes of the query as attributes. Its trace context is sent to
+radio-duck in a traceparent header, so that the server's spans join the
+caller's trace.
+"""
+import hashlib
+import logging
+from contextlib import contextmanager
+from typing import Optional
+
+from radio_duck.metrics import QueryMetrics
+from radio_duck.slowlog import normalize_query
+
+
+def new_tracer(tracer=None) -> Optional["Tracer"]:
+    """
+    :param tracer: an opentelemetry Tracer, default the global
+    tracer provider's
+    :return: None if opentelemetry is not installed
+    """
+    try:
+        from opentelemetry import trace
+    except ImportError:
+        logging.info("opentelemetry is not installed, radio_duck not traced")
+        return None
+    if tracer is None:
+        tracer = trace.get_tracer("radio_duck")
+    return Tracer(tracer)
+
+
+def fingerprint(statement: str) -> str:
+    """
+    :param statement: normalized query, see slowlog.normalize_query
+    """
+    return hashlib.sha1(statement.encode()).hexdigest()[:16]
+
+
+class Tracer(object):
+    """
+    Starts radio_duck's spans on an opentelemetry Tracer.
+    """
+
+    def __init__(self, tracer):
+        from opentelemetry import propagate
+        from opentelemetry.trace import SpanKind
+
+        self._tracer = tracer
+        self._propagate = propagate
+        self._client = SpanKind.CLIENT
+
+    @contextmanager
+    def span(self, name: str, **attributes):
+        with self._tracer.start_as_current_span(
+            name, kind=self._client, attributes=attributes
+        ) as span:
+            yield span
+
+    @contextmanager
+    def execute(self, metrics: QueryMetrics, host: str, port: int):
+        """
+        Span of an execute(). Its phase spans and attributes are added
+        when it ends, from the metrics execute() filled in.
+        """
+        statement = normalize_query(metrics.query)
+        metrics.timeline = []
+        with self.span(
+            "radio_duck.execute",
+            **{
+                "db.system": "duckdb",
+                "db.statement": statement,
+                "radio_duck.fingerprint": fingerprint(statement),
+                "server.address": host,
+                "server.port": port,
+            },
+        ) as span:
+            try:
+                yield span
+            finally:
+                self._end_execute(span, metrics)
+
+    def _end_execute(self, span, metrics: QueryMetrics):
+        for phase, end_ns, elapsed_sec in metrics.timeline:
+            child = self._tracer.start_span(
+                f"radio_duck.{phase}",
+                start_time=end_ns - int(elapsed_sec * 1e9),
+            )
+            child.end(end_time=end_ns)
+        for name, value in (
+            ("radio_duck.query_id", metrics.query_id),
+            ("radio_duck.rows", metrics.rows),
+            ("radio_duck.request_bytes", metrics.request_bytes),
+            ("radio_duck.response_bytes", metrics.response_bytes),
+            ("radio_duck.retries", metrics.retries),
+            ("radio_duck.cached", metrics.cached),
+            ("http.response.status_code", metrics.status),
+        ):
+            if value is not None:
+                span.set_attribute(name, value)
+
+    def fetched(self, span, value):
+        """
+        :param value: what a fetch method returned
+        """
+        if isinstance(value, list):
+            span.set_attribute("radio_duck.rows", len(value))
+        elif hasattr(value, "num_rows"):
+            span.set_attribute("radio_duck.rows", value.num_rows)
+
+    def inject(self, headers: dict):
+        """
+        Adds the traceparent header of the current span.
+        """
+        self._propagate.inject(headers)
@@ -0,0 +1,130 @@
+import sys
+
+import pytest
+
+from radio_duck import connect
+from radio_duck.connection_test import http_server_port
+from radio_duck.tracing import new_tracer
+
+ducks = (
+    '{"schema": ["STRING", "NUMBER"], "columns": ["duck_type", "total"],'
+    ' "rows": [["mallard", 1], ["marbled_duck", 2]]}'
+)
+
+
+def test_no_op_without_opentelemetry(monkeypatch):
+    # a None entry makes the import fail
+    monkeypatch.setitem(sys.modules, "opentelemetry", None)
+    assert new_tracer() is None
+
+
+def test_spans_and_traceparent():
+    pytest.importorskip("opentelemetry.sdk")
+    from flask import request
+    from http_server_mock import HttpServerMock
+    from opentelemetry.sdk.trace import TracerProvider
+    from opentelemetry.sdk.trace.export import SimpleSpanProcessor
+    from opentelemetry.sdk.trace.export.in_memory_span_exporter import (
+        InMemorySpanExporter,
+    )
+
+    exporter = InMemorySpanExporter()
+    provider = TracerProvider()
+    provider.add_span_processor(SimpleSpanProcessor(exporter))
+    tracer = provider.get_tracer("test")
+
+    app = HttpServerMock(__name__)
+    traceparents = []
+
+    @app.route("/v1/sql/", methods=["POST"])
+    def index():
+        traceparents.append(request.headers.get("traceparent"))
+        return ducks
+
+    with app.run("localhost", http_server_port):
+        with tracer.start_as_current_span("caller"):
+            with connect(
+                host="localhost",
+                port=http_server_port,
+                api="/v1/sql/",
+                scheme="http",
+                tracing=tracer,
+            ) as conn:
+                cursor = conn.cursor()
+                cursor.execute("select * from pond where total > 10")
+                assert 2 == len(cursor.fetchall())
+
+    spans = {span.name: span for span in exporter.get_finished_spans()}
+    assert {
+        "caller",
+        "radio_duck.connect",
+        "radio_duck.execute",
+        "radio_duck.encode",
+        "radio_duck.round_trip",
+        "radio_duck.read",
+        "radio_duck.decode",
+        "radio_duck.fetchall",
+    } == set(spans)
+    execute = spans["radio_duck.execute"]
+    caller = spans["caller"]
+    assert caller.context.span_id == execute.parent.span_id
+    for phase in ("encode", "round_trip", "read", "decode"):
+        child = spans[f"radio_duck.{phase}"]
+        assert execute.context.span_id == child.parent.span_id
+        assert execute.start_time <= child.start_time <= child.end_time
+        assert child.end_time <= execute.end_time
+    attributes = execute.attributes
+    assert "select * from pond where total > ?" == attributes["db.statement"]
+    assert 16 == len(attributes["radio_duck.fingerprint"])
+    assert 2 == attributes["radio_duck.rows"]
+    assert attributes["radio_duck.request_bytes"] > 0
+    assert len(ducks) == attributes["radio_duck.response_bytes"]
+    assert 2 == spans["radio_duck.fetchall"].attributes["radio_duck.rows"]
+
+    # the server joins the execute span's trace
+    trace_id = "{:032x}".format(execute.context.trace_id)
+    span_id = "{:016x}".format(execute.context.span_id)
+    assert 1 == len(traceparents)
+    assert traceparents[0].startswith(f"00-{trace_id}-{span_id}-")
+
+
+def test_failed_execute_span():
+    pytest.importorskip("opentelemetry.sdk")
+    from http_server_mock import HttpServerMock
+    from opentelemetry.sdk.trace import TracerProvider
+    from opentelemetry.sdk.trace.export import SimpleSpanProcessor
+    from opentelemetry.sdk.trace.export.in_memory_span_exporter import (
+        InMemorySpanExporter,
+    )
+    from opentelemetry.trace import StatusCode
+
+    from radio_duck import ProgrammingError
+
+    exporter = InMemorySpanExporter()
+    provider = TracerProvider()
+    provider.add_span_processor(SimpleSpanProcessor(exporter))
+
+    app = HttpServerMock(__name__)
+
+    @app.route("/v1/sql/", methods=["POST"])
+    def index():
+        return "table not found", 400
+
+    with app.run("localhost", http_server_port):
+        with connect(
+            host="localhost",
+            port=http_server_port,
+            api="/v1/sql/",
+            scheme="http",
+            tracing=provider.get_tracer("test"),
+        ) as conn:
+            with pytest.raises(ProgrammingError):
+                conn.cursor().execute("select * from lake")
+
+    (execute,) = [
+        span
+        for span in exporter.get_finished_spans()
+        if span.name == "radio_duck.execute"
+    ]
+    assert StatusCode.ERROR == execute.status.status_code
+    assert 400 == execute.attributes["http.response.status_code"]
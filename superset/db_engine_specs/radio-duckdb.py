@@ -1,5 +1,7 @@
 from __future__ import annotations
 
+from typing import Any
+
 from sqlalchemy.dialects import registry
 
 from superset.db_engine_specs.duckdb import DuckDBEngineSpec
@@ -13,3 +15,40 @@ class RadioDuckEngineSpec(DuckDBEngineSpec):
     registry.register(
         "radio_duck.district5", "radio_duck.sqlalchemy", "RadioDuckDialect"
     )
+
+    @classmethod
+    def handle_cursor(cls, cursor: Any, query: Any, *args: Any) -> None:
+        """
+        With submit=true in the uri, execute only submits the query.
+        Poll it here so sql lab shows its progress while it runs.
+        """
+        if not getattr(cursor, "submit", False):
+            return
+        from superset import db  # pylint: disable=import-outside-toplevel
+
+        while True:
+            status = cursor.poll(wait_sec=cursor.connection.poll_wait_sec)
+            if status.get("state") != "running":
+                return
+            progress = status.get("progress")
+            if progress is not None and progress > (query.progress or 0):
+                query.progress = progress
+                db.session.commit()
+
+    @classmethod
+    def has_implicit_cancel(cls) -> bool:
+        return False
+
+    @classmethod
+    def get_cancel_query_id(cls, cursor: Any, query: Any) -> str | None:
+        # called before the query runs, the id is sent along with it
+        return cursor.reserve_query_id()
+
+    @classmethod
+    def cancel_query(
+        cls, cursor: Any, query: Any, cancel_query_id: str
+    ) -> bool:
+        try:
+            return cursor.connection.cancel(cancel_query_id)
+        except Exception:  # pylint: disable=broad-except
+            return False